@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+"""
+Benchmarks the stages of the analysis pipeline on a synthetic project.
+
+    $ python -m benchmarks.run --files 200 --issue-density 0.2 --output results.json
+    $ python -m benchmarks.run --git --history 20 --compare results.json
+
+Each stage is timed separately, results are written as JSON so that they can be
+compared between versions with `--compare`.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+import datetime
+import contextlib
+import logging
+
+from collections import OrderedDict
+
+from blitzdb import FileBackend
+
+import checkmate.settings as settings
+from checkmate.lib.backends.sqlite import SqliteBackend
+from checkmate.lib.code import CodeEnvironment
+from checkmate.lib.models import DiskProject
+from checkmate.lib.analysis.occurences import count_occurences
+from checkmate.management.commands.analyze import Command as AnalyzeCommand
+
+from .synthetic import generate_disk_project,generate_git_project,modify_files
+
+logger = logging.getLogger(__name__)
+
+class Timer(object):
+
+    def __init__(self):
+        self.timings = OrderedDict()
+
+    @contextlib.contextmanager
+    def time(self,stage):
+        start = time.time()
+        yield
+        self.timings[stage] = time.time()-start
+        logger.info("%-40s %.3f s" % (stage,self.timings[stage]))
+
+def get_parser():
+    parser = argparse.ArgumentParser(description = "Benchmarks the checkmate analysis pipeline.")
+    parser.add_argument('--files',type = int,default = 100,
+                        help = 'The number of files in the project.')
+    parser.add_argument('--issue-density',dest = 'issue_density',type = float,default = 0.1,
+                        help = 'The probability that a function contains an issue.')
+    parser.add_argument('--directory-depth',dest = 'directory_depth',type = int,default = 2,
+                        help = 'The maximum directory depth of the project.')
+    parser.add_argument('--modified',type = float,default = 0.1,
+                        help = 'The fraction of files modified between snapshots.')
+    parser.add_argument('--git',action = 'store_true',default = False,
+                        help = 'Benchmark a git project instead of a disk project.')
+    parser.add_argument('--history',type = int,default = 10,
+                        help = 'The number of commits in the git project.')
+    parser.add_argument('--analyzers',type = str,default = '',
+                        help = 'A comma-separated list of analyzers to run (default: all).')
+    parser.add_argument('--backend',type = str,default = 'file',choices = ['file','sqlite'],
+                        help = 'The backend to store the results in.')
+    parser.add_argument('--seed',type = int,default = 0)
+    parser.add_argument('--output',type = str,default = None,
+                        help = 'Write the results to this JSON file.')
+    parser.add_argument('--compare',type = str,default = None,
+                        help = 'Compare the results with a previous JSON file.')
+    return parser
+
+def get_settings(args):
+    if not args.analyzers:
+        return {}
+    return {'analyzers' : {'enable' : args.analyzers.split(",")}}
+
+class Benchmark(object):
+
+    def __init__(self,args,project_path,backend):
+        self.args = args
+        self.project_path = project_path
+        self.backend = backend
+        self.timer = Timer()
+        self.counts = OrderedDict()
+
+    def create_project(self):
+        if self.args.git:
+            from checkmate.contrib.plugins.git.models import GitProject
+            generate_git_project(self.project_path,
+                                 n_files = self.args.files,
+                                 history_depth = max(2,self.args.history),
+                                 issue_density = self.args.issue_density,
+                                 modified_fraction = self.args.modified,
+                                 directory_depth = self.args.directory_depth,
+                                 seed = self.args.seed)
+            project = GitProject({'pk' : uuid.uuid4().hex,'path' : self.project_path})
+        else:
+            self.paths = generate_disk_project(self.project_path,
+                                               n_files = self.args.files,
+                                               issue_density = self.args.issue_density,
+                                               directory_depth = self.args.directory_depth,
+                                               seed = self.args.seed)
+            project = DiskProject({'pk' : uuid.uuid4().hex,'path' : self.project_path})
+        self.backend.save(project)
+        self.backend.commit()
+        return project
+
+    def get_snapshots(self,project):
+        """
+        Returns the two snapshots to analyze, together with a function that returns
+        the file revisions of each of them.
+        """
+        if self.args.git:
+            snapshot_a,snapshot_b = project.get_git_snapshots(branch = 'master',limit = 2)
+            return [(snapshot_a,snapshot_a.get_git_file_revisions),
+                    (snapshot_b,snapshot_b.get_git_file_revisions)]
+        else:
+            def modify_and_scan():
+                modify_files(self.project_path,self.paths,
+                             fraction = self.args.modified,
+                             issue_density = self.args.issue_density,
+                             seed = self.args.seed+1)
+                return project.get_disk_file_revisions()
+            return [(project.DiskSnapshot({'created_at' : time.time()}),
+                     project.get_disk_file_revisions),
+                    (project.DiskSnapshot({'created_at' : time.time()}),
+                     modify_and_scan)]
+
+    def run(self):
+        timer = self.timer
+        project = self.create_project()
+        command = AnalyzeCommand(project,self.backend)
+        (snapshot_a,get_file_revisions_a),(snapshot_b,get_file_revisions_b) = \
+            self.get_snapshots(project)
+
+        with timer.time('scan'):
+            file_revisions = get_file_revisions_a()
+
+        code_environment = CodeEnvironment(file_revisions,settings = get_settings(self.args))
+
+        with timer.time('filter'):
+            file_revisions = code_environment.filter_file_revisions(file_revisions)
+
+        with timer.time('init_analyzers'):
+            for analyzer_name,analyzer_params in code_environment.analyzers.items():
+                code_environment.init_analyzer(analyzer_name,analyzer_params)
+
+        for file_revision in file_revisions:
+            file_revision.language = code_environment.get_language(file_revision)
+            file_revision.results = {'analysis_time' : {}}
+
+        for analyzer_name,analyzer_params in code_environment.analyzers.items():
+            with timer.time('analyze.%s' % analyzer_name):
+                for file_revision in file_revisions:
+                    if file_revision.language != analyzer_params['language']:
+                        continue
+                    results = code_environment.analyze_file_revision(file_revision,
+                                                        {analyzer_name : analyzer_params})
+                    file_revision.results[analyzer_name] = results[analyzer_name]
+                    file_revision.results['analysis_time'].update(results['analysis_time'])
+
+        with timer.time('annotate_file_revisions'):
+            annotations = command.annotate_file_revisions(snapshot_a,file_revisions)
+
+        with timer.time('persist'):
+            for file_revision in file_revisions:
+                self.backend.save(file_revision)
+            self.backend.commit()
+            for issue in annotations['issues']:
+                self.backend.save(issue)
+            self.backend.commit()
+
+        with timer.time('summarize'):
+            snapshot_a.summary = code_environment.summarize(file_revisions).serialize()
+
+        with timer.time('summarize_issues'):
+            snapshot_a.issues_summary = code_environment.summarize_issues(annotations['issues'])
+
+        snapshot_a.project = project
+        snapshot_a.file_revisions = [fr.pk for fr in file_revisions]
+        snapshot_a.analyzed = True
+        self.backend.save(snapshot_a)
+        self.backend.commit()
+
+        self.counts['file_revisions'] = len(file_revisions)
+        self.counts['issues'] = len(annotations['issues'])
+        self.counts['occurences'] = sum([count_occurences(issue.get('occurences',[]))
+                                         for issue in annotations['issues']])
+
+        file_revisions_b = get_file_revisions_b()
+        code_environment_b = CodeEnvironment(file_revisions_b,settings = get_settings(self.args))
+
+        with timer.time('analyze_snapshot (incremental)'):
+            snapshot_b = command.analyze_snapshot(snapshot_b,code_environment_b)
+
+        with timer.time('diff_snapshots'):
+            command.diff_snapshots(code_environment_b,snapshot_a,snapshot_b)
+
+        return self.timer.timings
+
+def compare(results,previous_results):
+    print "%-40s %10s %10s %8s" % ("stage","before","after","change")
+    for stage,duration in results['timings'].items():
+        if not stage in previous_results['timings']:
+            continue
+        previous_duration = previous_results['timings'][stage]
+        change = (duration-previous_duration)/previous_duration*100 if previous_duration else 0
+        print "%-40s %9.3fs %9.3fs %+7.1f%%" % (stage,previous_duration,duration,change)
+
+def main(argv = None):
+    args = get_parser().parse_args(argv)
+
+    logging.basicConfig(level = logging.INFO,format = '%(message)s')
+    logging.getLogger('checkmate').setLevel(logging.WARNING)
+
+    settings.load_plugins()
+
+    project_path = tempfile.mkdtemp()
+    backend_path = tempfile.mkdtemp()
+
+    try:
+        if args.backend == 'sqlite':
+            backend = SqliteBackend(os.path.join(backend_path,'checkmate.sqlite'),
+                                    autoload_embedded = False)
+        else:
+            backend = FileBackend(backend_path,autoload_embedded = False)
+        benchmark = Benchmark(args,project_path,backend)
+        timings = benchmark.run()
+    finally:
+        shutil.rmtree(project_path)
+        shutil.rmtree(backend_path)
+
+    results = {
+        'created_at' : datetime.datetime.now().isoformat(),
+        'python' : sys.version,
+        'params' : vars(args),
+        'counts' : benchmark.counts,
+        'timings' : timings,
+    }
+
+    if args.output:
+        with open(args.output,"w") as output_file:
+            output_file.write(json.dumps(results,indent = 2))
+
+    if args.compare:
+        with open(args.compare,"r") as input_file:
+            compare(results,json.loads(input_file.read()))
+
+    return results
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+"""
+Generators for synthetic disk and git projects of configurable size, used by the benchmarks.
+"""
+
+import os
+import random
+import subprocess
+
+def generate_module(rng,n_functions = 10,issue_density = 0.1):
+    """
+    Generates the source of a Python module. `issue_density` is the probability that
+    a given function contains code that analyzers will complain about.
+    """
+    lines = ["import os","import sys",""]
+    for i in range(n_functions):
+        lines.append("def function_%d(a,b):" % i)
+        lines.append("    c = a+b*%d" % rng.randint(0,1000))
+        if rng.random() < issue_density:
+            lines.append("    d = undefined_name_%d+c" % i)
+        if rng.random() < issue_density:
+            lines.append("    return os.path.join(str(a),str(b),str(c),'%s')" % ("x"*80))
+        lines.append("    return c")
+        lines.append("")
+    return "\n".join(lines)+"\n"
+
+def generate_path(rng,index,directory_depth = 2,directory_width = 4):
+    directories = ["dir_%d" % rng.randint(0,directory_width-1)
+                   for i in range(rng.randint(0,directory_depth))]
+    return os.path.join(*(directories+["module_%d.py" % index]))
+
+def write_file(path,content):
+    directory = os.path.dirname(path)
+    if not os.path.exists(directory):
+        os.makedirs(directory)
+    with open(path,"wb") as output_file:
+        output_file.write(content.encode("utf-8"))
+
+def generate_disk_project(path,
+                          n_files = 100,
+                          issue_density = 0.1,
+                          directory_depth = 2,
+                          seed = 0):
+    """
+    Writes `n_files` Python modules to `path` and returns their relative paths.
+    """
+    rng = random.Random(seed)
+    paths = [generate_path(rng,i,directory_depth = directory_depth) for i in range(n_files)]
+    for rel_path in paths:
+        write_file(os.path.join(path,rel_path),generate_module(rng,issue_density = issue_density))
+    return paths
+
+def modify_files(path,paths,fraction = 0.1,issue_density = 0.1,seed = 1):
+    """
+    Rewrites a fraction of the given files and returns the paths of the modified files.
+
+    Modification times are moved into the future, since file revisions of disk projects
+    are identified by their (integer) modification time.
+    """
+    rng = random.Random(seed)
+    modified_paths = rng.sample(paths,max(1,int(len(paths)*fraction)))
+    for rel_path in modified_paths:
+        full_path = os.path.join(path,rel_path)
+        write_file(full_path,generate_module(rng,issue_density = issue_density))
+        stat = os.stat(full_path)
+        os.utime(full_path,(stat.st_atime,stat.st_mtime+10))
+    return modified_paths
+
+def git(path,*args,**kwargs):
+    env = dict(os.environ)
+    env.update({'GIT_AUTHOR_NAME' : 'checkmate',
+                'GIT_AUTHOR_EMAIL' : 'checkmate@localhost',
+                'GIT_COMMITTER_NAME' : 'checkmate',
+                'GIT_COMMITTER_EMAIL' : 'checkmate@localhost'})
+    if 'timestamp' in kwargs:
+        #commits need distinct dates, since checkmate orders snapshots by commit date
+        env['GIT_AUTHOR_DATE'] = env['GIT_COMMITTER_DATE'] = "%d +0000" % kwargs['timestamp']
+    with open(os.devnull,"w") as devnull:
+        subprocess.check_call(["git"]+list(args),cwd = path,env = env,stdout = devnull)
+
+def generate_git_project(path,
+                         n_files = 100,
+                         history_depth = 10,
+                         issue_density = 0.1,
+                         modified_fraction = 0.1,
+                         directory_depth = 2,
+                         seed = 0,
+                         start_timestamp = 1420070400):
+    """
+    Creates a git repository in `path` with `history_depth` commits on the `master` branch.
+    Each commit after the first one modifies a fraction of the files.
+    """
+    paths = generate_disk_project(path,
+                                  n_files = n_files,
+                                  issue_density = issue_density,
+                                  directory_depth = directory_depth,
+                                  seed = seed)
+    git(path,"init","-q")
+    git(path,"checkout","-q","-b","master")
+    git(path,"add","-A")
+    git(path,"commit","-q","-m","Initial commit",timestamp = start_timestamp)
+    for i in range(1,history_depth):
+        modify_files(path,paths,
+                     fraction = modified_fraction,
+                     issue_density = issue_density,
+                     seed = seed+i)
+        git(path,"add","-A")
+        git(path,"commit","-q","-m","Commit %d" % i,timestamp = start_timestamp+i*3600)
+    return paths
@@ -20,16 +20,23 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 from __future__ import unicode_literals
-from checkmate.management.commands.analyze import Command as AnalyzeCommand
+from checkmate.management.commands.analyze import (Command as AnalyzeCommand,
+                                                   diff_objects,
+                                                   get_issue_key,
+                                                   compare_issues)
 from ..lib.repository import group_snapshots_by_date,get_first_date_for_group
+from ..lib.hunks import IntervalIndex
 from ..models import GitProject
 
 import time
+import uuid
 import datetime
 import traceback
 import logging
 
 from checkmate.lib.code import CodeEnvironment
+from checkmate.lib.models import get_analysis_pk
+from checkmate.lib.analysis.occurences import get_ranges
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +83,29 @@ class Command(AnalyzeCommand):
         'default'     : '',
         'help'        : 'The type of analysis (latest, monthly, weekly, daily).'
         },
+        {
+        'name'        : '--staged',
+        'action'      : 'store_true',
+        'dest'        : 'staged',
+        'default'     : False,
+        'help'        : 'Analyze the staged changes and show the issues they add to HEAD (e.g. in a pre-commit hook).'
+        },
+        {
+        'name'        : '--base',
+        'action'      : 'store',
+        'dest'        : 'base',
+        'type'        : str,
+        'default'     : '',
+        'help'        : 'Analyze the changes since the merge base with this commit and show the new issues on changed lines.'
+        },
+        {
+        'name'        : '--head',
+        'action'      : 'store',
+        'dest'        : 'head',
+        'type'        : str,
+        'default'     : 'HEAD',
+        'help'        : 'The commit to compare with --base.'
+        },
         ]
 
     def analyze_grouped_snapshots(self,branch,group,grouped_snapshots):
@@ -167,12 +197,242 @@ class Command(AnalyzeCommand):
         self.backend.save(branch)
         self.backend.commit()
 
+    def get_changed_file_revisions(self,changes):
+        """
+        Returns file revisions for the added and modified files in the given changes
+        (see `Repository.get_changes`).
+        """
+        file_revisions = []
+        for change in changes:
+            #we skip deleted files, symlinks and submodules
+            if change['status'] == 'D' or not change['mode'].startswith('100'):
+                continue
+            file_revision = self.project.GitSnapshot.FileRevision({'path' : change['path'],
+                                                                   'sha' : change['sha']})
+            file_revision.project = self.project
+            file_revision.fr_pk = file_revision.path+":"+file_revision.sha
+            file_revision.pk = uuid.uuid4().hex
+            file_revisions.append(file_revision)
+        return file_revisions
+
+    def get_analyzed_snapshot(self,sha):
+        try:
+            return self.backend.filter(self.project.GitSnapshot,{'sha' : sha,
+                                                                  'project.pk' : self.project.pk,
+                                                                  'analyzed' : True})[0]
+        except IndexError:
+            return None
+
+    def analyze_commit(self,sha,settings,file_revisions = None):
+        """
+        Analyzes and stores the snapshot of the given commit. File revisions (e.g. from
+        another snapshot) can be given instead of the ones of the commit.
+        """
+        snapshot = self.project.get_git_snapshots(shas = [sha])[0]
+        if file_revisions is None:
+            file_revisions = snapshot.get_git_file_revisions()
+        code_environment = CodeEnvironment(file_revisions,settings = settings)
+        code_environment.env['project'] = self.project
+        return self.analyze_snapshot(snapshot,code_environment,save_if_empty = True)
+
+    def get_path_issues(self,file_revisions):
+        """
+        Returns the stored issues of the given file revisions, annotated with their path
+        (issues are shared between file revisions with identical content).
+        """
+        paths = dict([(get_analysis_pk(fr),fr.path) for fr in file_revisions])
+        issues = self.get_issues(file_revisions)
+        for issue in issues:
+            issue._path = paths.get(issue.file_revision.pk,issue.file_revision.path)
+        return issues
+
+    def get_new_occurences(self,issue,file_revision,base_issue,base_file_revision,
+                           lines_by_sha = None):
+        """
+        Returns the occurences of an issue that have no counterpart (with the same
+        fingerprint) in the corresponding issue of the base version of the file.
+
+        The lines of each blob are stored in `lines_by_sha`, so that the content of a file
+        is only split once for all of its issues.
+        """
+        if lines_by_sha is None:
+            lines_by_sha = {}
+        def get_fingerprints(issue,file_revision):
+            blob_sha = file_revision.sha
+            if not blob_sha in lines_by_sha:
+                lines_by_sha[blob_sha] = self.project.repository.get_file_content_by_sha(
+                    blob_sha).splitlines()
+            lines = lines_by_sha[blob_sha]
+            return [(self.fingerprinter.fingerprint_occurence(blob_sha,lines,occurence),occurence)
+                    for occurence in issue.get_occurences()]
+        base_fingerprints = set([fingerprint for fingerprint,occurence
+                                 in get_fingerprints(base_issue,base_file_revision)])
+        return [occurence for fingerprint,occurence in get_fingerprints(issue,file_revision)
+                if not fingerprint in base_fingerprints]
+
+    def report_new_issues(self,file_revisions,issues,base_file_revisions,changed_lines = None):
+        """
+        Prints the issues of the given file revisions that are not present in the base
+        versions of the files and returns their number. If `changed_lines` are given, only
+        issues on these lines are reported.
+        """
+        base_issues = self.get_path_issues(base_file_revisions)
+        diff = diff_objects(base_issues,issues,get_issue_key,compare_issues)
+
+        #issues are grouped by code, so an issue that changed might only have a few new occurences
+        file_revisions_by_path = dict([(fr.path,fr) for fr in file_revisions])
+        base_file_revisions_by_path = dict([(fr.path,fr) for fr in base_file_revisions])
+        base_issues_by_code = dict([((issue._path,issue.analyzer,issue.code),issue)
+                                    for issue in base_issues])
+        changed_lines_by_path = {}
+        lines_by_sha = {}
+
+        n_issues = 0
+        for issue in sorted(diff['added'],key = lambda issue:(issue._path,issue.analyzer,issue.code)):
+            key = (issue._path,issue.analyzer,issue.code)
+            if key in base_issues_by_code:
+                occurences = self.get_new_occurences(issue,file_revisions_by_path[issue._path],
+                                                     base_issues_by_code[key],
+                                                     base_file_revisions_by_path[issue._path],
+                                                     lines_by_sha)
+            else:
+                occurences = issue.get_occurences()
+            if changed_lines is not None:
+                if not issue._path in changed_lines_by_path:
+                    changed_lines_by_path[issue._path] = IntervalIndex(changed_lines.get(issue._path,[]))
+                index = changed_lines_by_path[issue._path]
+                #occurences without a location are always reported
+                occurences = [occurence for occurence in occurences
+                              if not get_ranges(occurence.get('location'))
+                              or any([start_line is None or index.overlaps(start_line,end_line)
+                                      for (start_line,start_column),(end_line,end_column)
+                                      in get_ranges(occurence.get('location'))])]
+            if not occurences:
+                continue
+            lines = sorted(set([start_line
+                                for occurence in occurences
+                                for (start_line,start_column),end in get_ranges(occurence.get('location'))
+                                if start_line is not None]))
+            n_issues += len(occurences)
+            print "%(path)s\t%(analyzer)s\t%(code)s\t%(lines)s" % {'path' : issue._path,
+                                                                  'analyzer' : issue.analyzer,
+                                                                  'code' : issue.code,
+                                                                  'lines' : ",".join(map(str,lines))}
+        return n_issues
+
+    def analyze_staged(self):
+        """
+        Analyzes the staged version of all added and modified files and prints the issues
+        that are not present in the analyzed snapshot of HEAD. Nothing is stored.
+        """
+        repository = self.project.repository
+        file_revisions = self.get_changed_file_revisions(repository.get_staged_changes())
+
+        settings = self.project.get_settings(self.backend)
+        code_environment = CodeEnvironment(file_revisions,settings = settings)
+        code_environment.env['project'] = self.project
+        #only files with an analyzer for their language are analyzed
+        file_revisions = code_environment.filter_file_revisions(file_revisions)
+        if not file_revisions:
+            logger.info("No staged files to analyze.")
+            return 0
+
+        paths = set([fr.path for fr in file_revisions])
+        head = repository.get_commit_sha()
+        head_snapshot = self.get_analyzed_snapshot(head) if head is not None else None
+        if head_snapshot is not None:
+            head_file_revisions = [fr for fr in head_snapshot.get_file_revisions(self.backend)
+                                   if fr.path in paths]
+        else:
+            if head is not None:
+                logger.warning("HEAD has not been analyzed (run `checkmate git analyze`), "
+                               "showing all issues of the staged files.")
+            head_file_revisions = []
+
+        repository.prefetch_blobs([fr.sha for fr in file_revisions+head_file_revisions])
+
+        for file_revision in file_revisions:
+            file_revision.settings_hash = code_environment.settings_hash
+        #files that were analyzed before (e.g. in another branch) are not analyzed again
+        reused_file_revisions = self.reuse_analyzed_blobs(file_revisions,code_environment)
+        new_file_revisions = [fr for fr in file_revisions if not 'analysis_pk' in fr]
+
+        logger.info("Analyzing %d staged files (%d are already analyzed)" % (len(new_file_revisions),
+                                                                             len(reused_file_revisions)))
+
+        try:
+            analyzed_file_revisions = code_environment.analyze_file_revisions(new_file_revisions)
+        finally:
+            code_environment.close()
+        issues = self.annotate_file_revisions(None,analyzed_file_revisions)['issues']
+        for issue in issues:
+            issue._path = issue.file_revision.path
+        issues.extend(self.get_path_issues(reused_file_revisions))
+
+        n_issues = self.report_new_issues(file_revisions,issues,head_file_revisions)
+        logger.info("%d new issues in %d staged files" % (n_issues,len(file_revisions)))
+        return 1 if n_issues else 0
+
+    def analyze_range(self):
+        """
+        Analyzes the changes between the merge base of `--base` and `--head` and the head,
+        (e.g. of a pull request) and prints the new issues on the changed lines.
+
+        Only the changed files are analyzed, the results of all other files are taken from
+        the snapshot of the merge base. Both snapshots are stored, so they can be reused.
+        """
+        repository = self.project.repository
+        base = repository.get_commit_sha(self.opts['base'])
+        head = repository.get_commit_sha(self.opts['head'])
+        for ref,sha in ((self.opts['base'],base),(self.opts['head'],head)):
+            if sha is None:
+                logger.error("Unknown commit: %s" % ref)
+                return -1
+        merge_base = repository.get_merge_base(base,head)
+
+        settings = self.project.get_settings(self.backend)
+
+        base_snapshot = self.get_analyzed_snapshot(merge_base)
+        if base_snapshot is None:
+            logger.info("The merge base %s has not been analyzed yet, analyzing it..." % merge_base)
+            base_snapshot = self.analyze_commit(merge_base,settings)
+
+        changes = repository.get_changes(merge_base,head)
+        changed_paths = set([change['path'] for change in changes])
+        base_file_revisions = base_snapshot.get_file_revisions(self.backend)
+
+        head_snapshot = self.get_analyzed_snapshot(head)
+        if head_snapshot is None:
+            file_revisions = [fr for fr in base_file_revisions if not fr.path in changed_paths]
+            file_revisions += self.get_changed_file_revisions(changes)
+            logger.info("Analyzing %d changed files between %s and %s" % (len(changed_paths),
+                                                                          merge_base,head))
+            head_snapshot = self.analyze_commit(head,settings,file_revisions)
+
+        file_revisions = [fr for fr in head_snapshot.get_file_revisions(self.backend)
+                          if fr.path in changed_paths]
+        base_file_revisions = [fr for fr in base_file_revisions if fr.path in changed_paths]
+        repository.prefetch_blobs([fr.sha for fr in file_revisions+base_file_revisions])
+
+        n_issues = self.report_new_issues(file_revisions,
+                                          self.get_path_issues(file_revisions),
+                                          base_file_revisions,
+                                          changed_lines = repository.get_changed_lines(merge_base,head))
+        logger.info("%d new issues in %d changed files" % (n_issues,len(file_revisions)))
+        return 1 if n_issues else 0
+
     def run(self):
         
         if not isinstance(self.project,GitProject):
             logger.error("Not a git project!")
             return -1
 
+        if self.opts['staged']:
+            return self.analyze_staged()
+
+        if self.opts['base']:
+            return self.analyze_range()
+
         if not self.opts['branch']:
             branches = self.project.repository.get_branches()
             if 'default_branch' in self.project and self.project.default_branch in branches:
@@ -73,8 +73,8 @@ class Command(InitCommand):
             logger.error("Found another project with the same path, aborting.")
             return -1
 
-        if not self.opts['backend'] in ('file','mongo'):
-            logger.error("Unknown backend: %s" % args.backend)
+        if not self.opts['backend'] in ('file','mongo','sqlite'):
+            logger.error("Unknown backend: %s" % self.opts['backend'])
             return -1
 
         config = {
@@ -24,6 +24,7 @@ from checkmate.management.commands.base import BaseCommand
 from checkmate.settings import analyzers,aggregators
 from checkmate.lib.code.environment import CodeEnvironment
 from checkmate.lib.stats.helpers import directory_splitter
+from checkmate.lib.stats.tree import SummaryTree
 
 import sys
 import os
@@ -75,14 +76,9 @@ class Command(BaseCommand):
             latest_snapshot = snapshots[0]
             stats['snapshot'] = latest_snapshot.sha
             if 'summary' in latest_snapshot:
-                stats['summary'] = latest_snapshot.summary
+                stats['summary'] = SummaryTree.load(latest_snapshot.summary).to_dict()
 
-            query = {
-                'project.pk' : self.project.pk,
-                'file_revision.pk' : {'$in' : latest_snapshot['file_revisions']},
-                }
-
-            issues = list(self.backend.filter(self.project.Issue,query))
+            issues = self.get_issues(latest_snapshot.get_file_revisions(self.backend))
 
             environment = CodeEnvironment([],analyzers,aggregators = {'path' :
                 {'mapper' : 
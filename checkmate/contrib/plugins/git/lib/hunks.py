@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import re
+import bisect
+
+import six
+
+hunk_header_regex = re.compile(r'^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+escape_regex = re.compile(br'\\([0-7]{3}|.)')
+escapes = {b'a' : b'\a',b'b' : b'\b',b't' : b'\t',b'n' : b'\n',b'v' : b'\v',b'f' : b'\f',
+           b'r' : b'\r',b'"' : b'"',b'\\' : b'\\'}
+
+def unquote_path(path):
+    """
+    Git quotes paths with special characters C-style (e.g. `"b/t\\303\\251st.py"`, where
+    the octal escapes are the bytes of the UTF-8 encoded path). Returns the unquoted path.
+    """
+    if len(path) < 2 or not path.startswith('"') or not path.endswith('"'):
+        return path
+    def unescape(match):
+        code = match.group(1)
+        if len(code) == 3:
+            return six.int2byte(int(code,8))
+        return escapes.get(code,code)
+    return escape_regex.sub(unescape,path[1:-1].encode('utf-8')).decode('utf-8','ignore')
+
+def parse_changed_lines(diff):
+    """
+    Returns a dictionary with the (start,end) line ranges (1-based, inclusive) that were
+    added or modified in the new version of each file, as given by a diff without context
+    lines (`git diff -U0`) with the default `a/` and `b/` prefixes. Hunks that only remove
+    lines are ignored.
+
+    The lines of a hunk are skipped using the line counts of its header, since removed
+    and added lines can look like file headers (e.g. an added line `++ x` is `+++ x`).
+    """
+    changed_lines = {}
+    path = None
+    #lines can contain other line breaks (e.g. '\r'), which don't end a line of the diff
+    lines = diff.split('\n')
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        if line.startswith('--- ') and i < len(lines) and lines[i].startswith('+++ '):
+            target = unquote_path(lines[i][4:].rstrip('\t'))
+            i += 1
+            path = target[2:] if target.startswith('b/') else None
+            if path is not None:
+                changed_lines.setdefault(path,[])
+            continue
+        match = hunk_header_regex.match(line)
+        if not match:
+            continue
+        n_removed = int(match.group(1)) if match.group(1) is not None else 1
+        start = int(match.group(2))
+        n_added = int(match.group(3)) if match.group(3) is not None else 1
+        if path is not None and n_added > 0:
+            changed_lines[path].append((start,start+n_added-1))
+        #removed lines, added lines and context lines (which are part of both versions)
+        while i < len(lines) and (n_removed > 0 or n_added > 0 or lines[i].startswith('\\')):
+            if lines[i].startswith('-'):
+                n_removed -= 1
+            elif lines[i].startswith('+'):
+                n_added -= 1
+            elif lines[i].startswith(' '):
+                n_removed -= 1
+                n_added -= 1
+            elif not lines[i].startswith('\\'):
+                break
+            i += 1
+    return changed_lines
+
+class IntervalIndex(object):
+
+    """
+    A sorted list of non-overlapping line intervals, which answers whether a line (or a
+    range of lines) intersects any of them with a binary search.
+    """
+
+    def __init__(self,intervals):
+        self.starts = []
+        self.ends = []
+        for start,end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]+1:
+                self.ends[-1] = max(self.ends[-1],end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlaps(self,start,end = None):
+        if end is None or end < start:
+            end = start
+        i = bisect.bisect_right(self.starts,end)-1
+        return i >= 0 and self.ends[i] >= start
+
+    def __contains__(self,line):
+        return self.overlaps(line)
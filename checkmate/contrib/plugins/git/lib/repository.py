@@ -35,6 +35,9 @@ import StringIO
 import tempfile
 from collections import defaultdict
 
+from .hunks import parse_changed_lines
+from checkmate.helpers.content import ContentArena,get_bytes
+
 logger = logging.getLogger(__name__)
 
 class GitException(BaseException):
@@ -99,6 +102,9 @@ class Repository(object):
 
     def __init__(self,path):
         self._path = path
+        #prefetched blob contents, which file revisions read without copying them
+        self._blobs = ContentArena(max_size = 256*1024**2)
+        self._blob_sizes = {}
         self.devnull = open(os.devnull,"w")
         self.stderr = ''
         self.stdout = ''
@@ -484,10 +490,154 @@ class Repository(object):
             raise IOError
         return file_content
 
-    def get_file_content_by_sha(self,sha):
+    def get_commit_sha(self,ref = "HEAD"):
+        """
+        Returns the SHA of the commit the given reference points to, or `None` if there is
+        no such commit (e.g. for HEAD in a repository without commits).
+        """
+        try:
+            return self.check_output(["git","rev-parse","--verify",ref+"^{commit}"]).decode("utf-8",'ignore').strip()
+        except subprocess.CalledProcessError:
+            return None
+
+    def get_merge_base(self,commit_sha_a,commit_sha_b):
+        return self.check_output(["git","merge-base",commit_sha_a,commit_sha_b]).decode("utf-8",'ignore').strip()
+
+    def get_changes(self,commit_sha_a = None,commit_sha_b = None):
+        """
+        Returns the files that differ between two commits (or between HEAD and the index,
+        if no commits are given), with their status (A, M, D or T), path and the SHA of the
+        new blob. Renames are returned as a deletion and an addition.
+        """
+        if commit_sha_a is None:
+            args = ["--cached"]
+        else:
+            args = [commit_sha_a,commit_sha_b]
+        output = self.check_output(["git","diff","--raw","-z","--no-renames","--no-abbrev"]+args)
+        entries = output.split(b"\0")
+        changes = []
+        for meta,path in zip(entries[0::2],entries[1::2]):
+            if not meta.startswith(b":"):
+                break
+            old_mode,new_mode,old_sha,new_sha,status = meta[1:].decode("utf-8",'ignore').split()
+            changes.append({'status' : status,
+                            'path' : path.decode("utf-8",'ignore'),
+                            'mode' : new_mode,
+                            'sha' : new_sha})
+        return changes
+
+    def get_staged_changes(self):
+        return self.get_changes()
+
+    def get_changed_lines(self,commit_sha_a,commit_sha_b):
+        """
+        Returns the line ranges that were added or modified between two commits, for each file.
+        """
+        #the prefixes override the diff.noprefix and diff.mnemonicPrefix settings of the user
+        diff = self.check_output(["git","diff","-U0","--no-color","--no-ext-diff","--no-renames",
+                                  "--src-prefix=a/","--dst-prefix=b/",
+                                  commit_sha_a,commit_sha_b]).decode("utf-8",'ignore')
+        return parse_changed_lines(diff)
+
+    def read_blobs(self,shas):
+        """
+        Reads the given blobs through a single `git cat-file --batch` process and returns
+        the output together with the (sha,offset,size) range of each blob in it.
+        """
+        shas = list(set(shas))
+        if not shas:
+            return b"",[]
+        p = subprocess.Popen(["git","cat-file","--batch"],stdin = subprocess.PIPE,
+                             stdout = subprocess.PIPE,stderr = self.devnull,cwd = self.path)
+        output,stderr = p.communicate("".join([sha+"\n" for sha in shas]).encode("ascii"))
+        if p.returncode != 0:
+            raise subprocess.CalledProcessError(p.returncode,"git cat-file --batch",output)
+        ranges = []
+        position = 0
+        for sha in shas:
+            end_of_header = output.index(b"\n",position)
+            header = output[position:end_of_header].split()
+            position = end_of_header+1
+            if header[-1] == b"missing":
+                continue
+            size = int(header[2])
+            ranges.append((sha,position,size))
+            #the content is followed by a newline
+            position += size+1
+        return output,ranges
+
+    def get_blobs(self,shas):
+        """
+        Returns a dictionary with the content of the given blobs, which are read through a
+        single `git cat-file --batch` process.
+        """
+        output,ranges = self.read_blobs(shas)
+        return dict([(sha,output[offset:offset+size]) for sha,offset,size in ranges])
+
+    def prefetch_blobs(self,shas,max_size = None):
+        """
+        Reads the given blobs (that are not larger than `max_size`) in one go and keeps them
+        in memory, so that `get_file_content_by_sha` doesn't need to start a git process for
+        each of them. The blobs stay in the output of `git cat-file`, which serves as a
+        content arena.
+        """
+        shas = [sha for sha in shas if not sha in self._blobs]
+        if max_size is not None:
+            self.prefetch_blob_sizes(shas)
+            shas = [sha for sha in shas if self._blob_sizes.get(sha,0) <= max_size]
+        output,ranges = self.read_blobs(shas)
+        if ranges:
+            self._blobs.add_block(output,ranges)
+
+    def get_blob_sizes(self,shas):
+        """
+        Returns a dictionary with the sizes of the given blobs, without reading them
+        (using `git cat-file --batch-check`).
+        """
+        shas = list(set(shas))
+        if not shas:
+            return {}
+        p = subprocess.Popen(["git","cat-file","--batch-check"],stdin = subprocess.PIPE,
+                             stdout = subprocess.PIPE,stderr = self.devnull,cwd = self.path)
+        output,stderr = p.communicate("".join([sha+"\n" for sha in shas]).encode("ascii"))
+        if p.returncode != 0:
+            raise subprocess.CalledProcessError(p.returncode,"git cat-file --batch-check",output)
+        sizes = {}
+        for sha,line in zip(shas,output.splitlines()):
+            fields = line.split()
+            if fields[-1] == b"missing":
+                continue
+            sizes[sha] = int(fields[2])
+        return sizes
+
+    def prefetch_blob_sizes(self,shas):
+        self._blob_sizes.update(self.get_blob_sizes([sha for sha in shas
+                                                     if not sha in self._blob_sizes
+                                                     and not sha in self._blobs]))
+
+    def get_blob_size(self,sha):
+        if sha in self._blobs:
+            return len(self._blobs.get(sha))
+        if not sha in self._blob_sizes:
+            self.prefetch_blob_sizes([sha])
+        if not sha in self._blob_sizes:
+            raise IOError("Blob %s does not exist" % sha)
+        return self._blob_sizes[sha]
+
+    def get_content_buffer_by_sha(self,sha):
+        """
+        Returns the content of a blob as a read-only buffer (see `get_file_content_by_sha`
+        for a bytes copy).
+        """
+        content = self._blobs.get(sha)
+        if content is not None:
+            return content
         try:
             file_content = self.check_output(["git","cat-file","blob","%s" % (sha,)])
         except subprocess.CalledProcessError:
             logger.error(traceback.format_exc())
             raise IOError
         return file_content
+
+    def get_file_content_by_sha(self,sha):
+        return get_bytes(self.get_content_buffer_by_sha(sha))
@@ -25,17 +25,20 @@ import uuid
 import time
 import datetime
 import logging
+import re
 import copy
 
 logger = logging.getLogger(__name__)
 
 from .lib.repository import Repository
-from checkmate.lib.models import BaseDocument,DiskProject
-from checkmate.helpers.checkmate import parse_checkmate_settings
+from checkmate.lib.models import BaseDocument,DiskProject,FileContentMixin,Issue as BaseIssue
+from checkmate.helpers.checkmate import parse_checkmate_settings,load_class
 from checkmate.settings import analyzers,get_issues_data
 from checkmate.lib.analysis import AnalyzerSettingsError
+from checkmate.lib.code.blob_cache import parse_size
+from checkmate.lib.code.classifier import default_settings as default_classifier_settings
 
-class Issue(BaseDocument):
+class Issue(BaseIssue):
 
     class Meta(BaseDocument.Meta):
         dbref_includes = ['code',
@@ -48,7 +51,6 @@ class Issue(BaseDocument):
     An `Issue` object represents an issue or problem with the code. 
     It can be associated with one or multiple file revisions, code objects etc.
     """
-    pass
 
 class Summary(BaseDocument):
     """
@@ -56,7 +58,7 @@ class Summary(BaseDocument):
     """
     pass
 
-class GitFileRevision(BaseDocument):
+class GitFileRevision(FileContentMixin,BaseDocument):
 
     """
     issues -> list of issues associated with this file revision
@@ -66,8 +68,22 @@ class GitFileRevision(BaseDocument):
     class Meta(BaseDocument.Meta):
         dbref_includes = ['path','sha','language']
     
-    def get_file_content(self):
-        return self.project.eager.repository.get_file_content_by_sha(self.sha)
+    def read_content_buffer(self):
+        return self.project.eager.repository.get_content_buffer_by_sha(self.sha)
+
+    def get_content_size(self):
+        return self.project.eager.repository.get_blob_size(self.sha)
+
+    @classmethod
+    def prefetch_content_sizes(cls,file_revisions):
+        if file_revisions:
+            file_revisions[0].project.eager.repository.prefetch_blob_sizes([fr.sha for fr in file_revisions])
+
+    @classmethod
+    def prefetch_contents(cls,file_revisions,max_size = None):
+        if file_revisions:
+            file_revisions[0].project.eager.repository.prefetch_blobs([fr.sha for fr in file_revisions],
+                                                                      max_size = max_size)
 
 class GitSnapshot(BaseDocument):
 
@@ -131,6 +147,7 @@ class GitBranch(BaseDocument):
 class GitProject(DiskProject):
 
     GitSnapshot = GitSnapshot
+    Snapshot = GitSnapshot
     GitBranch = GitBranch
 
     class SettingsValidationError(BaseException):
@@ -203,7 +220,7 @@ class GitProject(DiskProject):
                                     'choices' : analyzers[key]['issues_data'].keys()})
                     elif sk == 'settings':
                         try:
-                            analyzers[key]['class'].validate_settings(sv)
+                            load_class(analyzers[key]['class']).validate_settings(sv)
                         except AnalyzerSettingsError as e:
                             add_to_errors([k,key,'settings'],e.errors)
                         except NotImplementedError:
@@ -219,6 +236,77 @@ class GitProject(DiskProject):
         def validate_branches_settings(k,s):
             add_to_errors([k],"Currently unsupported!")
 
+        def validate_limits_settings(k,s):
+            if not isinstance(s,dict):
+                add_to_errors([k],'must be a dictionary!')
+                return
+            for key,value in s.items():
+                if key == 'analyzers':
+                    if not isinstance(value,dict):
+                        add_to_errors([k,key],'must be a dictionary!')
+                        continue
+                    for analyzer,limits in value.items():
+                        if not isinstance(limits,dict):
+                            add_to_errors([k,key,analyzer],'must be a dictionary!')
+                elif key in ('timeout','memory_limit','max_files_per_worker'):
+                    if not isinstance(value,(int,float)):
+                        add_to_errors([k,key],'must be a number!')
+                else:
+                    add_to_errors([k,key],'invalid limits key!')
+
+        def validate_concurrency_settings(k,s):
+            if not isinstance(s,dict):
+                add_to_errors([k],'must be a dictionary!')
+                return
+            for key,value in s.items():
+                if key not in ('io_workers','cpu_workers','chunk_size'):
+                    add_to_errors([k,key],'invalid concurrency key!')
+                elif not isinstance(value,int) or value < 0:
+                    add_to_errors([k,key],'must be a non-negative integer!')
+
+        def validate_trends_settings(k,s):
+            if not isinstance(s,dict):
+                add_to_errors([k],'must be a dictionary!')
+                return
+            for key,value in s.items():
+                if key != 'max_depth':
+                    add_to_errors([k,key],'invalid trends key!')
+                elif value is not None and not isinstance(value,int):
+                    add_to_errors([k,key],'must be an integer!')
+
+        def validate_classifier_settings(k,s):
+            if not isinstance(s,dict):
+                add_to_errors([k],'must be a dictionary!')
+                return
+            for key,value in s.items():
+                if not key in default_classifier_settings:
+                    add_to_errors([k,key],'invalid classifier key!')
+                elif key == 'enabled':
+                    if not isinstance(value,bool):
+                        add_to_errors([k,key],'must be true or false!')
+                elif key == 'max_size':
+                    try:
+                        parse_size(value)
+                    except (ValueError,TypeError):
+                        add_to_errors([k,key],'must be a size (e.g. 2MB)!')
+                elif key == 'min_whitespace_ratio':
+                    if not isinstance(value,(int,float)):
+                        add_to_errors([k,key],'must be a number!')
+                elif key in ('generated_markers','comment_prefixes'):
+                    if not isinstance(value,(list,tuple)):
+                        add_to_errors([k,key],'must be a list of strings!')
+                        continue
+                    for marker in value:
+                        if not isinstance(marker,(str,unicode)):
+                            add_to_errors([k,key,str(marker)],'must be a string!')
+                        elif key == 'generated_markers':
+                            try:
+                                re.compile(marker)
+                            except re.error:
+                                add_to_errors([k,key,marker],'invalid regular expression!')
+                elif not isinstance(value,int) or value < 0:
+                    add_to_errors([k,key],'must be a non-negative integer!')
+
         for key,value in settings.items():
             if key == 'analyzers':
                 validate_analyzer_settings(key,value)
@@ -228,6 +316,14 @@ class GitProject(DiskProject):
                 validate_ignore_settings(key,value)
             elif key == 'branches':
                 validate_branches_settings(key,value)
+            elif key == 'limits':
+                validate_limits_settings(key,value)
+            elif key == 'concurrency':
+                validate_concurrency_settings(key,value)
+            elif key == 'trends':
+                validate_trends_settings(key,value)
+            elif key == 'classifier':
+                validate_classifier_settings(key,value)
             else:
                 errors[key] = 'invalid settings key!'
         if errors:
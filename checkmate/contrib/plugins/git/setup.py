@@ -16,22 +16,15 @@ GNU Affero General Public License for more details.
 You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
-from .commands.analyze import Command as AnalyzeCommand
-from .commands.diff import Command as DiffCommand
-from .commands.log import Command as LogCommand
-from .commands.init import Command as InitCommand
-from .commands.reset import Command as ResetCommand
-from .commands.update_stats import Command as UpdateStatsCommand
-
 from .models import GitProject,GitSnapshot,GitFileRevision
 
 commands = {
-    'analyze' : AnalyzeCommand,
-    'diff' : DiffCommand,
-    'init' : InitCommand,
-    'log' : LogCommand,
-    'reset' : ResetCommand,
-    'update_stats' : UpdateStatsCommand
+    'analyze' : 'checkmate.contrib.plugins.git.commands.analyze.Command',
+    'diff' : 'checkmate.contrib.plugins.git.commands.diff.Command',
+    'init' : 'checkmate.contrib.plugins.git.commands.init.Command',
+    'log' : 'checkmate.contrib.plugins.git.commands.log.Command',
+    'reset' : 'checkmate.contrib.plugins.git.commands.reset.Command',
+    'update_stats' : 'checkmate.contrib.plugins.git.commands.update_stats.Command'
 }
 
 models = {
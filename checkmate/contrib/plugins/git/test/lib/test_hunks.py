@@ -0,0 +1,87 @@
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from ...lib.hunks import parse_changed_lines,unquote_path,IntervalIndex
+
+diff = """diff --git a/a.py b/a.py
+index 193aea3..dffca52 100644
+--- a/a.py
++++ b/a.py
+@@ -25,0 +26 @@ import zlib
++import abc
+@@ -40,2 +41,0 @@ def f():
+-    pass
+-    pass
+@@ -260 +262,3 @@ class Foo(object):
+-x = 1
++x = 2
++def g( x ):
++  return 1
+diff --git a/b.py b/b.py
+deleted file mode 100644
+index 193aea3..0000000
+--- a/b.py
++++ /dev/null
+@@ -1 +0,0 @@
+-b = 1
+"""
+
+def test_parse_changed_lines():
+    assert parse_changed_lines(diff) == {'a.py' : [(26,26),(262,264)]}
+
+def test_lines_that_look_like_headers():
+    #a removed line `-- a` and an added line `++ b/c.py` look like the header of a file
+    tricky_diff = u"""diff --git a/a.py b/a.py
+--- a/a.py
++++ b/a.py
+@@ -3,2 +3,3 @@ x = 1
+--- a
+-x = 2\r
++++ b/c.py
++@@ -1 +100,5 @@
++x = 3
+\\ No newline at end of file
+@@ -10 +11 @@
+-y = 1
++y = 2
+"""
+    assert parse_changed_lines(tricky_diff) == {u'a.py' : [(3,5),(11,11)]}
+
+def test_quoted_paths():
+    assert unquote_path('b/a.py') == 'b/a.py'
+    assert unquote_path(u'"b/t\\303\\251st \\"1\\".py"') == u'b/t\xe9st "1".py'
+    quoted_diff = u"""diff --git "a/t\\303\\251st.py" "b/t\\303\\251st.py"
+--- "a/t\\303\\251st.py"
++++ "b/t\\303\\251st.py"
+@@ -1 +1 @@
+-a = 1
++a = 2
+"""
+    assert parse_changed_lines(quoted_diff) == {u't\xe9st.py' : [(1,1)]}
+
+def test_interval_index():
+    index = IntervalIndex([(262,264),(26,26),(27,30),(100,100)])
+    #adjacent intervals are merged
+    assert len(index) == 3
+    assert 26 in index and 30 in index and 263 in index
+    assert not 25 in index and not 31 in index and not 265 in index
+    assert index.overlaps(20,26)
+    assert index.overlaps(90,110)
+    assert not index.overlaps(101,261)
+    assert not IntervalIndex([]).overlaps(1)
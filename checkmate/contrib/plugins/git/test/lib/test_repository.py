@@ -110,4 +110,75 @@ def test_get_files_in_commit(initialized_repository):
                                  u'd3py/vega_template.html',
                                  u'd3py/figure.py',
                                  u'd3py/geoms/graph.py'])
-    assert set([f['path'] for f in files_in_commit]) == valid_files_in_commit
\ No newline at end of file
+    assert set([f['path'] for f in files_in_commit]) == valid_files_in_commit
+
+
+def test_get_staged_changes(blank_repository):
+
+    blank_repository.init()
+    path = blank_repository.path
+    def git(*args):
+        subprocess.check_call(["git","-c","user.name=test","-c","user.email=test@example.com"]
+                              +list(args),cwd = path)
+    for filename,content in (("a.py","a = 1\n"),("b.py","b = 1\n")):
+        with open(os.path.join(path,filename),"w") as output_file:
+            output_file.write(content)
+    git("add","a.py","b.py")
+    git("commit","-q","-m","initial commit")
+
+    with open(os.path.join(path,"a.py"),"w") as output_file:
+        output_file.write("a = 2\n")
+    with open(os.path.join(path,"c.py"),"w") as output_file:
+        output_file.write("c = 1\n")
+    git("add","a.py","c.py")
+    git("rm","-q","b.py")
+    #changes in the working tree are not staged
+    with open(os.path.join(path,"a.py"),"w") as output_file:
+        output_file.write("a = 3\n")
+
+    changes = dict([(change['path'],change) for change in blank_repository.get_staged_changes()])
+    assert sorted([(path,change['status']) for path,change in changes.items()]) == \
+        [('a.py','M'),('b.py','D'),('c.py','A')]
+
+    blobs = blank_repository.get_blobs([changes['a.py']['sha'],changes['c.py']['sha'],'0'*40])
+    assert blobs == {changes['a.py']['sha'] : b"a = 2\n",changes['c.py']['sha'] : b"c = 1\n"}
+
+def test_get_changed_lines_without_prefix(blank_repository):
+
+    blank_repository.init()
+    path = blank_repository.path
+    def git(*args):
+        subprocess.check_call(["git","-c","user.name=test","-c","user.email=test@example.com"]
+                              +list(args),cwd = path)
+    with open(os.path.join(path,"a.py"),"w") as output_file:
+        output_file.write("a = 1\n")
+    git("add","a.py")
+    git("commit","-q","-m","initial commit")
+    with open(os.path.join(path,"a.py"),"w") as output_file:
+        output_file.write("a = 2\nb = 1\n")
+    git("commit","-q","-a","-m","modify a.py")
+
+    #the diff settings of the user don't change the parsed paths
+    git("config","diff.noprefix","true")
+    assert blank_repository.get_changed_lines("HEAD~1","HEAD") == {'a.py' : [(1,2)]}
+    git("config","diff.noprefix","false")
+    git("config","diff.mnemonicPrefix","true")
+    assert blank_repository.get_changed_lines("HEAD~1","HEAD") == {'a.py' : [(1,2)]}
+
+def test_prefetch_blobs(blank_repository):
+
+    blank_repository.init()
+    path = blank_repository.path
+    blobs = {}
+    for filename,content in (("small.py","a = 1\n"),("large.py","a = 1\n"*100)):
+        with open(os.path.join(path,filename),"w") as output_file:
+            output_file.write(content)
+        blobs[filename] = subprocess.check_output(["git","hash-object","-w",filename],
+                                                  cwd = path).strip().decode("ascii")
+
+    #blobs larger than the maximum size are not read
+    blank_repository.prefetch_blobs(blobs.values(),max_size = 100)
+    assert blobs['small.py'] in blank_repository._blobs
+    assert not blobs['large.py'] in blank_repository._blobs
+    assert blank_repository.get_file_content_by_sha(blobs['small.py']) == b"a = 1\n"
+    assert blank_repository.get_file_content_by_sha(blobs['large.py']) == b"a = 1\n"*100
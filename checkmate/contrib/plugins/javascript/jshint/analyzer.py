@@ -36,6 +36,19 @@ import tempfile
 
 class JSHintAnalyzer(BaseAnalyzer):
 
+    _version = None
+
+    @classmethod
+    def get_version(cls):
+        if cls._version is None:
+            try:
+                output = subprocess.check_output(["jshint","--version"],
+                                                 stderr = subprocess.STDOUT)
+                cls._version = output.decode('utf-8','ignore').strip()
+            except (OSError,subprocess.CalledProcessError):
+                return None
+        return cls._version
+
     def summarize(self,items):
         pass
 
@@ -44,7 +57,7 @@ class JSHintAnalyzer(BaseAnalyzer):
         f = tempfile.NamedTemporaryFile(delete = False)
         try:
             with f:
-                f.write(file_revision.get_file_content())
+                f.write(file_revision.get_content_buffer())
             try:
                 result = subprocess.check_output(["jshint",
                                                   "--filename",
@@ -18,15 +18,16 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 
-from .analyzer import JSHintAnalyzer
 from .issues_data import issues_data
 
 analyzers = {
     'jshint' :
         {
             'title' : 'JSHint',
-            'class' : JSHintAnalyzer,
+            'class' : 'checkmate.contrib.plugins.javascript.jshint.analyzer.JSHintAnalyzer',
             'language' : 'javascript',
+            #jshint runs as an external process, so we can run it concurrently
+            'io_bound' : True,
             'issues_data' : issues_data,
         },
 }
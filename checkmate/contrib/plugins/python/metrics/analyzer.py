@@ -19,31 +19,87 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 from __future__ import unicode_literals
-from collections import defaultdict
 from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.helpers.content import get_bytes
+
+#UTF-8 continuation bytes (0b10xxxxxx), which don't start a new character
+continuation_bytes = bytes(bytearray(range(0x80,0xC0)))
+whitespace_bytes = b" \t\r\f\v"
+
+def get_longest_line(file_content):
+    """
+    Returns the length of the longest line. If the next `longest+1` bytes contain a newline,
+    none of the lines up to it can be longer than the longest line so far, so we skip them
+    all with a single `rfind` instead of looking at each line.
+    """
+    longest = 0
+    start = 0
+    size = len(file_content)
+    while start < size:
+        end = file_content.rfind(b"\n",start,start+longest+1)
+        if end != -1:
+            start = end+1
+            continue
+        end = file_content.find(b"\n",start+longest+1)
+        if end == -1:
+            end = size
+        longest = max(longest,end-start)
+        start = end+1
+    return longest
+
+def get_line_stats(file_content):
+    """
+    Returns line and character statistics for the given (UTF-8 encoded) bytes,
+    without decoding them or splitting them into lines.
+    """
+    #without whitespace, blank lines are empty and comment lines start with '#'. We mark the
+    #start and the end of each line with whitespace, which can't occur in the content anymore.
+    marked_lines = b"\t"+file_content.translate(None,whitespace_bytes).replace(b"\n",b" \n\t")+b" "
+    return {
+        'number_of_lines' : file_content.count(b"\n")+1,
+        'number_of_characters' : len(file_content.translate(None,continuation_bytes)),
+        'number_of_blank_lines' : marked_lines.count(b"\t "),
+        'number_of_comment_lines' : marked_lines.count(b"\t#"),
+        'longest_line' : get_longest_line(file_content),
+    }
+
+#statistics that are summed up in the summary (as total_[name])
+summed_stats = ['number_of_lines',
+                'number_of_characters',
+                'number_of_blank_lines',
+                'number_of_comment_lines',
+                'number_of_code_lines']
 
 class FormatAnalyzer(BaseAnalyzer):
 
     def diff_summary(self,summary_a,summary_b):
 
-        return {
+        diff = {
                 'd_number_of_lines' : summary_b['total_number_of_lines']-summary_a['total_number_of_lines'],
                 'd_number_of_characters' : summary_b['total_number_of_characters']-summary_a['total_number_of_characters'],
                }
+        if 'total_number_of_code_lines' in summary_a and 'total_number_of_code_lines' in summary_b:
+            diff['d_number_of_code_lines'] = summary_b['total_number_of_code_lines']-\
+                                             summary_a['total_number_of_code_lines']
+        return diff
 
     def summarize(self,items):
 
-        stats = defaultdict(lambda : {})
+        stats = {}
+
+        items = [item['stats'] for item in items if 'stats' in item
+                 and 'number_of_lines' in item['stats']
+                 and 'number_of_characters' in item['stats']]
+        cnt = len(items)
 
-        stats['total_number_of_lines'] = 0
-        stats['total_number_of_characters'] = 0
-        cnt = 0
+        #we summarize each statistic as a column (file revisions analyzed by older versions
+        #don't have all statistics, so we only sum up the ones that are present)
+        for name in summed_stats:
+            stats['total_'+name] = sum([item[name] for item in items if name in item])
 
-        for item in [item['stats'] for item in items if 'stats' in item]:
-            if 'number_of_lines' in item and 'number_of_characters' in item:
-                stats['total_number_of_lines'] += item['number_of_lines']
-                stats['total_number_of_characters'] += item['number_of_characters']
-                cnt += 1
+        longest_lines = [item['longest_line'] for item in items if 'longest_line' in item]
+        if longest_lines:
+            stats['longest_line'] = max(longest_lines)
 
         if cnt:
             stats['average_number_of_lines'] = stats['total_number_of_lines'] / float(cnt)
@@ -51,7 +107,32 @@ class FormatAnalyzer(BaseAnalyzer):
 
         stats['number_of_files'] = cnt
 
-        return dict(stats)
+        return stats
+
+    def merge_summaries(self,summaries):
+
+        summaries = [summary for summary in summaries if summary is not None]
+        if not summaries:
+            return None
+
+        stats = {}
+
+        for name in summed_stats:
+            stats['total_'+name] = sum([summary.get('total_'+name,0) for summary in summaries])
+
+        longest_lines = [summary['longest_line'] for summary in summaries
+                         if 'longest_line' in summary]
+        if longest_lines:
+            stats['longest_line'] = max(longest_lines)
+
+        cnt = sum([summary.get('number_of_files',0) for summary in summaries])
+        if cnt:
+            stats['average_number_of_lines'] = stats['total_number_of_lines'] / float(cnt)
+            stats['average_number_of_characters'] = stats['total_number_of_characters'] / float(cnt)
+
+        stats['number_of_files'] = cnt
+
+        return stats
 
     def analyze(self,file_revision):
 
@@ -59,9 +140,13 @@ class FormatAnalyzer(BaseAnalyzer):
         issues = []
 
         try:
-            file_content = file_revision.get_file_content()
-            stats['number_of_lines'] = len(file_content.decode("utf-8","ignore").split("\n"))
-            stats['number_of_characters'] = len(file_content.decode("utf-8","ignore"))
+            file_content = file_revision.get_content_buffer()
+            if isinstance(file_content,unicode):
+                file_content = file_content.encode("utf-8")
+            stats = get_line_stats(get_bytes(file_content))
+            stats['number_of_code_lines'] = stats['number_of_lines']-\
+                                            stats['number_of_blank_lines']-\
+                                            stats['number_of_comment_lines']
         except KeyboardInterrupt:
             raise
         except:
@@ -71,4 +156,3 @@ class FormatAnalyzer(BaseAnalyzer):
             'stats' : stats,
             'issues' : issues,
         }
-
@@ -17,14 +17,13 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from .analyzer import FormatAnalyzer
 from .issues_data import issues_data
 
 analyzers = {
     'metrics' : 
         {
             'title' : 'Code Metrics',
-            'class' : FormatAnalyzer,
+            'class' : 'checkmate.contrib.plugins.python.metrics.analyzer.FormatAnalyzer',
             'language' : 'python',
             'issues_data' : issues_data,
         },
@@ -48,6 +48,10 @@ error_types = {
 
 class Pep8Analyzer(BaseAnalyzer):
 
+    @classmethod
+    def get_version(cls):
+        return pep8.__version__
+
     def summarize(self,items):
 
         stats = {
@@ -66,7 +70,7 @@ class Pep8Analyzer(BaseAnalyzer):
         try:
             handle,temp_filename = tempfile.mkstemp()
             fh = os.fdopen(handle,"wb")
-            fh.write(file_revision.get_file_content())
+            fh.write(file_revision.get_content_buffer())
             fh.close()
             pep8style.init_report(Reporter)
             result = pep8style.check_files([temp_filename])
@@ -17,14 +17,14 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from .analyzer import Pep8Analyzer
 from .issues_data import issues_data
 
 analyzers = {
     'pep8' :
         {
             'title' : 'Pep-8',
-            'class' : Pep8Analyzer,
+            'class' : 'checkmate.contrib.plugins.python.pep8.analyzer.Pep8Analyzer',
+            'requires' : ['pep8'],
             'language' : 'python',
             'issues_data' : issues_data,
         },
@@ -27,11 +27,16 @@ import checkmate.settings as settings
 
 from checkmate.lib.stats.helpers import directory_splitter
 from checkmate.lib.analysis.base import BaseAnalyzer
+import pyflakes
 from pyflakes.reporter import Reporter as BaseReporter
 from pyflakes.api import check as pyflakes_check
 
 class PyFlakesAnalyzer(BaseAnalyzer):
 
+    @classmethod
+    def get_version(cls):
+        return pyflakes.__version__
+
     def summarize(self,items):
 
         stats = {
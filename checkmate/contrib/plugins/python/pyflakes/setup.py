@@ -17,7 +17,6 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from .analyzer import PyFlakesAnalyzer
 from .issues_data import issues_data
 
 analyzers = {
@@ -25,7 +24,8 @@ analyzers = {
         {
             'title' : 'PyFlakes',
             'name' : 'pyflakes',
-            'class' : PyFlakesAnalyzer,
+            'class' : 'checkmate.contrib.plugins.python.pyflakes.analyzer.PyFlakesAnalyzer',
+            'requires' : ['pyflakes'],
             'language' : 'python',
             'issues_data' : issues_data
         },
@@ -20,6 +20,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import unicode_literals
 from __future__ import absolute_import
+from pylint import __pkginfo__
 from pylint.lint import PyLinter
 from astroid import MANAGER, AstroidBuildingException
 from pylint.reporters import BaseReporter
@@ -36,6 +37,10 @@ from checkmate.lib.analysis.base import BaseAnalyzer
 
 class PyLintAnalyzer(BaseAnalyzer):
 
+    @classmethod
+    def get_version(cls):
+        return __pkginfo__.version
+
     def diff(self,results_a,results_b):
         pass
 
@@ -61,11 +66,42 @@ class PyLintAnalyzer(BaseAnalyzer):
 
         if cnt > 0:
             stats['average_global_note']/=float(cnt)
+            #the number of notes is needed to merge the averages of several summaries
+            stats['n_global_notes'] = cnt
         else:
             del stats['average_global_note']
 
         return stats
 
+    def merge_summaries(self,summaries):
+
+        summaries = [summary for summary in summaries if summary is not None]
+        if not summaries:
+            return None
+
+        stats = {
+            'n_warnings' : sum([summary.get('n_warnings',0) for summary in summaries]),
+            'n_errors' : sum([summary.get('n_errors',0) for summary in summaries]),
+        }
+        cnt = sum([summary.get('n_global_notes',0) for summary in summaries
+                   if 'average_global_note' in summary])
+        if cnt > 0:
+            stats['average_global_note'] = sum([summary['average_global_note']*summary['n_global_notes']
+                                                for summary in summaries
+                                                if 'average_global_note' in summary
+                                                and 'n_global_notes' in summary])/float(cnt)
+            stats['n_global_notes'] = cnt
+
+        return stats
+
+    def warm_up(self):
+        #the first linter imports all checker modules, which takes a while
+        Linter(reporter = Reporter()).load_default_plugins()
+
+    def teardown(self):
+        #the astroid cache holds the parsed modules (e.g. of the standard library)
+        MANAGER.astroid_cache.clear()
+
     def analyze(self,file_revision):
         try:
             reporter = Reporter()
@@ -171,3 +207,17 @@ class Linter(PyLinter):
             return super(Linter,self).check([f.name])
         finally:
             os.unlink(f.name)
+            self.forget_module(f.name)
+
+    def forget_module(self,filename):
+        """
+        Removes the (temporary) module from the astroid cache, which is kept between
+        analyses, so that it does not grow with every analyzed file.
+        """
+        modname = os.path.splitext(os.path.basename(filename))[0]
+        for key,module in MANAGER.astroid_cache.items():
+            if getattr(module,'file',None) == filename:
+                del MANAGER.astroid_cache[key]
+        for key in MANAGER._mod_file_cache.keys():
+            if key[0] == modname or key[0].startswith(modname+'.'):
+                del MANAGER._mod_file_cache[key]
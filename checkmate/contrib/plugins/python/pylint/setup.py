@@ -17,7 +17,6 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from .analyzer import PyLintAnalyzer
 from .issues_data import issues_data
 
 analyzers = {
@@ -25,7 +24,8 @@ analyzers = {
         {
             'name' : 'pylint',
             'title' : 'PyLint',
-            'class' : PyLintAnalyzer,
+            'class' : 'checkmate.contrib.plugins.python.pylint.analyzer.PyLintAnalyzer',
+            'requires' : ['pylint','astroid'],
             'language' : 'python',
             'issues_data' : issues_data,
         },
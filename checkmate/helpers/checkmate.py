@@ -1,8 +1,24 @@
-import yaml
+import six
+import importlib
 
 def parse_checkmate_settings(content):
     """
     Currently we only parse the YAML file. In the future we might perform additional checks.
     """
+    #yaml is slow to import, so we only load it when we actually parse settings
+    import yaml
     output = yaml.load(content)
-    return output
\ No newline at end of file
+    return output
+
+def load_class(class_str):
+    """
+    Returns the class referenced by a dotted path (e.g. `package.module.Class`).
+
+    Plugins register analyzers and commands by path, so that their modules only get
+    imported when they are actually used. Classes are returned unchanged.
+    """
+    if not isinstance(class_str,six.string_types):
+        return class_str
+    module_name,class_name = class_str.rsplit(".",1)
+    module = importlib.import_module(module_name)
+    return getattr(module,class_name)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+import os
+import mmap
+import logging
+
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+#files of at least this size are memory-mapped instead of read
+mmap_threshold = 1024**2
+
+def read_file_buffer(file_path,threshold = None):
+    """
+    Returns the content of the given file as a read-only buffer. Files that are larger
+    than `threshold` bytes are memory-mapped, so their content isn't copied into the
+    memory of the process. Smaller files are returned as bytes.
+
+    The buffer supports `len`, slicing (which returns bytes), `hashlib`, `numpy.frombuffer`
+    and `file.write`. Use `get_bytes` if you need a bytes object.
+    """
+    if threshold is None:
+        threshold = mmap_threshold
+    with open(file_path,"rb") as input_file:
+        size = os.fstat(input_file.fileno()).st_size
+        #empty files can't be mapped
+        if size and size >= threshold:
+            try:
+                return mmap.mmap(input_file.fileno(),0,access = mmap.ACCESS_READ)
+            except (mmap.error,ValueError,OverflowError) as e:
+                logger.warning("Cannot map %s into memory, reading it instead: %s" % (file_path,e))
+        return input_file.read()
+
+def get_bytes(content):
+    """
+    Returns a bytes copy of a content buffer (or the content itself if it is bytes).
+    """
+    if isinstance(content,bytes):
+        return content
+    return content[:]
+
+class ContentArena(object):
+
+    """
+    Stores file contents in a few large blocks (e.g. the output of `git cat-file --batch`)
+    and hands out read-only buffers into them, so that contents aren't copied once per
+    blob. If `max_size` is given, the oldest blocks are dropped when the arena grows beyond
+    it (buffers that are still in use keep their block alive).
+    """
+
+    def __init__(self,max_size = None):
+        self.max_size = max_size
+        self.size = 0
+        self._blocks = OrderedDict()
+        self._buffers = {}
+        self._n_blocks = 0
+
+    def __contains__(self,key):
+        return key in self._buffers
+
+    def __len__(self):
+        return len(self._buffers)
+
+    def get(self,key,default = None):
+        if not key in self._buffers:
+            return default
+        block_id,buf = self._buffers[key]
+        return buf
+
+    def add_block(self,block,ranges):
+        """
+        Adds a block and returns a dictionary with a buffer for each (key,offset,size) range.
+        """
+        block_id = self._n_blocks
+        self._n_blocks += 1
+        buffers = {}
+        for key,offset,size in ranges:
+            buffers[key] = buffer(block,offset,size)
+            self._buffers[key] = (block_id,buffers[key])
+        self._blocks[block_id] = (len(block),list(buffers.keys()))
+        self.size += len(block)
+        self.evict()
+        return buffers
+
+    def add(self,key,content):
+        return self.add_block(content,[(key,0,len(content))])[key]
+
+    def evict(self):
+        while self.max_size is not None and self.size > self.max_size and len(self._blocks) > 1:
+            block_id,(size,keys) = self._blocks.popitem(last = False)
+            self.size -= size
+            for key in keys:
+                #the key might have been added again with a newer block
+                if key in self._buffers and self._buffers[key][0] == block_id:
+                    del self._buffers[key]
+
+    def clear(self):
+        self._blocks.clear()
+        self._buffers.clear()
+        self.size = 0
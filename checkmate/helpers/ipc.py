@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+import os
+import json
+import socket
+import hashlib
+import tempfile
+
+"""
+The protocol spoken between `checkmate serve` and its clients: each connection carries
+a single request and a single response, each of which is a JSON object on one line.
+
+Requests contain the name of a `command` and its arguments:
+
+{"command" : "analyze", "paths" : ["foo/bar.py"]}
+
+Responses contain a `status` (`ok` or `error`) and either the results or an `error` message.
+
+This module only depends on the standard library, so that clients start quickly.
+"""
+
+#the maximum length of a Unix socket path is about 100 characters on most platforms
+max_socket_path_length = 100
+
+def get_socket_path(project_path):
+    """
+    Returns the path of the socket that `checkmate serve` listens on for the given project.
+    """
+    socket_path = os.path.join(project_path,'.checkmate','serve.sock')
+    if len(socket_path) > max_socket_path_length:
+        socket_path = os.path.join(tempfile.gettempdir(),'checkmate-%s.sock' %
+                                   hashlib.sha1(project_path.encode('utf-8')).hexdigest()[:16])
+    return socket_path
+
+def send_message(connection,message):
+    connection.sendall(json.dumps(message).encode('utf-8')+b'\n')
+
+def receive_message(connection):
+    """
+    Reads a single message from the connection. Returns `None` if the connection
+    was closed before a complete message arrived.
+    """
+    data = connection.makefile('rb').readline()
+    if not data.endswith(b'\n'):
+        return None
+    return json.loads(data.decode('utf-8'))
+
+def send_request(socket_path,request,timeout = None):
+    """
+    Sends a request to a server and returns its response. Raises a `socket.error`
+    if no server is listening on the socket.
+    """
+    connection = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+    try:
+        connection.connect(socket_path)
+        send_message(connection,request)
+        response = receive_message(connection)
+    finally:
+        connection.close()
+    if response is None:
+        raise socket.error("The server closed the connection.")
+    return response
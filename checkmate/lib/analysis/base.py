@@ -20,6 +20,30 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import unicode_literals
 import abc
+import sys
+import hashlib
+
+#source code hashes of the modules that define analyzers
+_module_hashes = {}
+
+def get_module_hash(module_name):
+    """
+    Returns the SHA1 hash of the source code of the given (imported) module, or `None`
+    if the source file can't be read.
+    """
+    if not module_name in _module_hashes:
+        module_hash = None
+        filename = getattr(sys.modules.get(module_name),'__file__',None)
+        if filename is not None:
+            if filename.endswith(('.pyc','.pyo')):
+                filename = filename[:-1]
+            try:
+                with open(filename,'rb') as source_file:
+                    module_hash = hashlib.sha1(source_file.read()).hexdigest()
+            except (IOError,OSError):
+                pass
+        _module_hashes[module_name] = module_hash
+    return _module_hashes[module_name]
 
 class AnalyzerSettingsError(BaseException):
     
@@ -45,6 +69,31 @@ class BaseAnalyzer(object):
             for code in ignore:
                 self.ignore[code] = True
 
+    def warm_up(self):
+        """
+        Called once after the analyzer was created, before it analyzes the first file.
+        Analyzers can do expensive initialization here, since instances are kept alive
+        across code environments (see `checkmate.lib.analysis.pool`).
+        """
+        pass
+
+    def teardown(self):
+        """
+        Called when the analyzer is dropped from the analyzer pool, to release resources.
+        """
+        pass
+
+    @classmethod
+    def get_version(cls):
+        """
+        Returns the version of the analyzer or of the tool it runs (or `None`). Cached
+        results are only reused by an analyzer with the same class and version.
+
+        By default, this is the hash of the module that defines the analyzer, so that the
+        results of an older version of the analyzer are not reused after an upgrade.
+        """
+        return get_module_hash(cls.__module__)
+
     @classmethod
     def validate_settings(cls,settings):
         #should raise AnalyzerSettingsError if the settings are not valid
@@ -78,3 +127,22 @@ class BaseAnalyzer(object):
         """
         pass
 
+    def merge_summaries(self,summaries):
+        """
+        Merges summaries of disjoint sets of items into the summary of all of them, so that
+        a snapshot can be summarized chunk by chunk. By default, numerical values are added
+        up, analyzers that calculate averages or maxima need to override this.
+        """
+        merged = None
+        for summary in summaries:
+            if summary is None:
+                continue
+            if merged is None:
+                merged = {}
+            for key,value in summary.items():
+                if isinstance(value,(int,long,float)) and not isinstance(value,bool):
+                    merged[key] = merged.get(key,0)+value
+                elif not key in merged:
+                    merged[key] = value
+        return merged
+
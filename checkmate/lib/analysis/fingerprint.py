@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import hashlib
+import logging
+
+from collections import OrderedDict
+
+from checkmate.lib.analysis.occurences import decode_occurences
+
+logger = logging.getLogger(__name__)
+
+def normalize_line(line):
+    """
+    Normalizes a line of code so that fingerprints are not affected by changes in
+    indentation or whitespace.
+    """
+    if isinstance(line,bytes):
+        line = line.decode("utf-8","ignore")
+    return " ".join(line.split())
+
+def get_line_range(location):
+    """
+    Returns the (start,end) line numbers (1-based, inclusive) of a location of the form
+    ((start_line,start_column),(end_line,end_column)), or None if the location does not
+    point to a line in the file.
+    """
+    try:
+        (start_line,start_column),(end_line,end_column) = location
+    except (TypeError,ValueError):
+        return None
+    if start_line is None:
+        return None
+    if end_line is None or end_line < start_line:
+        end_line = start_line
+    return start_line,end_line
+
+class IssueFingerprinter(object):
+
+    """
+    Calculates location-independent fingerprints for issues, so that issues can be matched
+    between file revisions even if the code around them moved.
+
+    The fingerprint of a single location is the hash of the normalized lines it spans,
+    including `context` lines before and after it. Fingerprints are cached by blob hash
+    and location, so identical content is only hashed once (the `cache_size` most
+    recently used fingerprints are kept).
+    """
+
+    def __init__(self,context = 1,cache_size = 100000):
+        self.context = context
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def get_blob_hash(self,file_revision,content):
+        if 'sha' in file_revision and file_revision.sha:
+            return file_revision.sha
+        return hashlib.sha1(content).hexdigest()
+
+    def fingerprint_lines(self,lines,line_range):
+        if line_range is None:
+            return ''
+        start_line,end_line = line_range
+        window = lines[max(0,start_line-1-self.context):end_line+self.context]
+        sha = hashlib.sha1()
+        sha.update("\n".join([normalize_line(line) for line in window]).encode("utf-8"))
+        return sha.hexdigest()
+
+    def fingerprint_occurence(self,blob_hash,lines,occurence):
+        """
+        Returns the fingerprint of a single issue occurence.
+
+        An occurence may span several locations, which are fingerprinted separately.
+        """
+        if not 'location' in occurence or not occurence['location']:
+            return ''
+        fingerprints = []
+        for location in occurence['location']:
+            line_range = get_line_range(location)
+            key = (blob_hash,line_range)
+            if key in self._cache:
+                fingerprint = self._cache.pop(key)
+            else:
+                fingerprint = self.fingerprint_lines(lines,line_range)
+            self._cache[key] = fingerprint
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last = False)
+            fingerprints.append(fingerprint)
+        return ":".join(fingerprints)
+
+    def fingerprint_issues(self,file_revision,issues):
+        """
+        Adds a `fingerprint` to each issue, calculated from the fingerprints of all its
+        occurences. The file content is retrieved and split into lines only once.
+        """
+        if not issues:
+            return
+        try:
+            content = file_revision.get_file_content()
+        except IOError:
+            logger.warning("Cannot fingerprint issues, content of %s is not available"
+                           % file_revision.path)
+            return
+        blob_hash = self.get_blob_hash(file_revision,content)
+        lines = content.splitlines()
+        for issue in issues:
+            occurences = decode_occurences(issue['occurences']) if 'occurences' in issue else []
+            sha = hashlib.sha1()
+            for fingerprint in sorted([self.fingerprint_occurence(blob_hash,lines,occurence)
+                                       for occurence in occurences]):
+                sha.update(fingerprint.encode("utf-8"))
+                sha.update(b"\n")
+            issue.fingerprint = sha.hexdigest()
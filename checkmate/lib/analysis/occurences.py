@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import sys
+import json
+import zlib
+import base64
+import array
+import logging
+
+logger = logging.getLogger(__name__)
+
+ENCODING_VERSION = 1
+
+#markers for the number of ranges in a location
+SINGLE_RANGE = -1
+NO_LOCATION = -2
+
+#we only compress the string table if it is larger than this (in bytes)
+COMPRESSION_THRESHOLD = 1024
+
+def pack_ints(values):
+    a = array.array(str('i'),values)
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return base64.b64encode(a.tostring()).decode('ascii')
+
+def unpack_ints(s):
+    a = array.array(str('i'))
+    a.fromstring(base64.b64decode(s))
+    if sys.byteorder == 'big':
+        a.byteswap()
+    return a
+
+def pack_value(value):
+    return -1 if value is None else int(value)
+
+def unpack_value(value):
+    return None if value == -1 else value
+
+def is_single_range(location):
+    return len(location) == 2 and not isinstance(location[0][0],(list,tuple))
+
+def get_ranges(location):
+    """
+    Returns the list of ((start_line,start_column),(end_line,end_column)) ranges of a
+    location, which can be either a single range or a list of ranges.
+    """
+    if not location:
+        return []
+    if is_single_range(location):
+        return [location]
+    return list(location)
+
+def is_encoded(occurences):
+    return isinstance(occurences,dict) and 'encoding' in occurences
+
+def encode_occurences(occurences,compress = None):
+    """
+    Encodes a list of issue occurences in a compact, columnar form:
+
+    * `locations` is a packed integer array containing, for each occurence, the number
+      of ranges followed by the start line, start column, end line and end column of
+      each range (`None` is stored as -1)
+    * `data` is a packed integer array containing, for each occurence, the index of
+      its data in the `strings` table (or -1)
+    * `strings` is the table of distinct data values (serialized as JSON), so that data
+      that repeats between occurences (e.g. descriptions) is only stored once. If
+      `compress` is true (or `None` and the table is large), it is stored zlib-compressed
+      in `strings_z` instead.
+
+    Returns the occurences unchanged if they cannot be encoded.
+    """
+    locations = []
+    data_indexes = []
+    strings = []
+    string_indexes = {}
+    try:
+        for occurence in occurences:
+            location = occurence.get('location')
+            if not location:
+                locations.append(NO_LOCATION)
+            elif is_single_range(location):
+                #a single range of the form ((start_line,start_column),(end_line,end_column))
+                (start_line,start_column),(end_line,end_column) = location
+                locations.extend([SINGLE_RANGE,
+                                  pack_value(start_line),pack_value(start_column),
+                                  pack_value(end_line),pack_value(end_column)])
+            else:
+                locations.append(len(location))
+                for (start_line,start_column),(end_line,end_column) in location:
+                    locations.extend([pack_value(start_line),pack_value(start_column),
+                                      pack_value(end_line),pack_value(end_column)])
+            if 'data' in occurence:
+                s = json.dumps(occurence['data'],sort_keys = True)
+                if not s in string_indexes:
+                    string_indexes[s] = len(strings)
+                    strings.append(s)
+                data_indexes.append(string_indexes[s])
+            else:
+                data_indexes.append(-1)
+        encoded = {
+            'encoding' : ENCODING_VERSION,
+            'count' : len(occurences),
+            'locations' : pack_ints(locations),
+            'data' : pack_ints(data_indexes),
+        }
+    except (TypeError,ValueError,IndexError,OverflowError):
+        logger.debug("Cannot encode occurences, storing them as they are")
+        return occurences
+
+    strings_json = json.dumps(strings)
+    if compress is None:
+        compress = len(strings_json) > COMPRESSION_THRESHOLD
+    if compress:
+        encoded['strings_z'] = base64.b64encode(zlib.compress(strings_json.encode('utf-8')))\
+                                     .decode('ascii')
+    else:
+        encoded['strings'] = strings
+    return encoded
+
+def decode_occurences(encoded):
+    """
+    Decodes occurences encoded with `encode_occurences`. Plain lists are returned unchanged.
+    """
+    if not is_encoded(encoded):
+        return encoded
+    if 'strings_z' in encoded:
+        strings = json.loads(zlib.decompress(base64.b64decode(encoded['strings_z']))
+                                 .decode('utf-8'))
+    else:
+        strings = encoded['strings']
+    data = {}
+    locations = unpack_ints(encoded['locations'])
+    occurences = []
+    i = 0
+    for data_index in unpack_ints(encoded['data']):
+        occurence = {}
+        n_ranges = locations[i]
+        i += 1
+        if n_ranges == SINGLE_RANGE:
+            values = [unpack_value(v) for v in locations[i:i+4]]
+            occurence['location'] = ((values[0],values[1]),(values[2],values[3]))
+            i += 4
+        elif n_ranges >= 0:
+            ranges = []
+            for j in range(n_ranges):
+                values = [unpack_value(v) for v in locations[i:i+4]]
+                ranges.append(((values[0],values[1]),(values[2],values[3])))
+                i += 4
+            occurence['location'] = tuple(ranges)
+        if data_index != -1:
+            if not data_index in data:
+                data[data_index] = json.loads(strings[data_index])
+            #occurences with the same data share the same (decoded) dictionary
+            occurence['data'] = data[data_index]
+        occurences.append(occurence)
+    return occurences
+
+def count_occurences(occurences):
+    """
+    Returns the number of occurences without decoding them.
+    """
+    if is_encoded(occurences):
+        return occurences['count']
+    return len(occurences)
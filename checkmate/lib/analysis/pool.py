@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+import copy
+import json
+import atexit
+import hashlib
+import logging
+import threading
+import traceback
+
+import six
+
+from collections import OrderedDict
+
+from checkmate.helpers.checkmate import load_class
+
+logger = logging.getLogger(__name__)
+
+def get_class_path(class_str):
+    if isinstance(class_str,six.string_types):
+        return class_str
+    return "%s.%s" % (class_str.__module__,class_str.__name__)
+
+def get_settings_hash(kwargs):
+    return hashlib.sha1(json.dumps(kwargs,sort_keys = True,default = six.text_type)
+                        .encode('utf-8')).hexdigest()
+
+class AnalyzerPool(object):
+
+    """
+    Keeps analyzer instances alive across code environments (e.g. for all snapshots that
+    `git analyze` analyzes), so that expensive analyzers are only initialized once per
+    process. Instances are keyed by their class and a hash of their settings, so analyzers
+    of the same class with different settings don't share an instance.
+
+    An analyzer's `warm_up` method is called when it is created and its `teardown` method
+    when it is dropped from the pool (the least recently used instances are dropped if the
+    pool holds more than `max_size` of them).
+    """
+
+    def __init__(self,max_size = 32):
+        self.max_size = max_size
+        self._analyzers = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._analyzers)
+
+    def get_key(self,class_str,kwargs):
+        return (get_class_path(class_str),get_settings_hash(kwargs))
+
+    def get(self,class_str,kwargs,code_environment,key = None):
+        """
+        Returns an analyzer of the given class with the given settings, which is bound to
+        the given code environment. Callers that need the same analyzer repeatedly can pass
+        the key (as returned by `get_key`), which saves hashing the settings on each call.
+        """
+        if key is None:
+            key = self.get_key(class_str,kwargs)
+        with self._lock:
+            if key in self._analyzers:
+                analyzer = self._analyzers.pop(key)
+            else:
+                analyzer_class = load_class(class_str)
+                #analyzers may modify their keyword arguments, so they get a copy
+                analyzer = analyzer_class(code_environment,**copy.deepcopy(kwargs))
+                analyzer.warm_up()
+            analyzer.code_environment = code_environment
+            self._analyzers[key] = analyzer
+            while len(self._analyzers) > self.max_size:
+                self.teardown(self._analyzers.popitem(last = False)[1])
+        return analyzer
+
+    def teardown(self,analyzer):
+        try:
+            analyzer.teardown()
+        except Exception:
+            logger.warning("Cannot tear down analyzer %s:\n%s" % (analyzer.__class__.__name__,
+                                                                  traceback.format_exc()))
+
+    def clear(self):
+        with self._lock:
+            while self._analyzers:
+                self.teardown(self._analyzers.popitem(last = False)[1])
+
+#the pool of the current process
+analyzer_pool = AnalyzerPool()
+atexit.register(analyzer_pool.clear)
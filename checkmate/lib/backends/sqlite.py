@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+import os
+import re
+import json
+import sqlite3
+import logging
+
+import six
+
+from blitzdb.backends.base import Backend
+from blitzdb.backends.file.utils import JsonEncoder
+from blitzdb.queryset import QuerySet as BaseQuerySet
+
+logger = logging.getLogger(__name__)
+
+"""
+A blitzdb backend that stores documents in an SQLite database.
+
+Each collection is a table with the JSON-encoded document and a few indexed columns for the
+fields that checkmate queries most. Queries on these fields (and on the primary key) with
+plain values, `$in` lists or document references are executed by SQLite, all other parts of
+a query are matched against the documents in Python, with the same semantics as the
+blitzdb FileBackend.
+"""
+
+#fields that get their own, indexed column (the column name replaces `.` with `_`)
+indexed_fields = ['project.pk','file_revision.pk','fr_pk','analyzer','code','sha']
+
+#sentinel for values that are missing in a document
+undefined = object()
+
+def get_column(key):
+    return key.replace('.','_')
+
+def get_value(attributes,key):
+    value = attributes
+    for fragment in key.split('.'):
+        if isinstance(value,dict):
+            if not fragment in value:
+                return undefined
+            value = value[fragment]
+        elif isinstance(value,(list,tuple)):
+            try:
+                value = value[int(fragment)]
+            except (ValueError,IndexError):
+                return undefined
+        else:
+            return undefined
+    return value
+
+def is_scalar(value):
+    return value is None or isinstance(value,six.string_types+six.integer_types+(float,bool))
+
+def values_equal(value,expression):
+    #document references are equal if they point to the same document
+    if isinstance(value,dict) and isinstance(expression,dict) \
+      and '__collection__' in value and '__collection__' in expression:
+        return value.get('pk') == expression.get('pk') and \
+               value['__collection__'] == expression['__collection__']
+    return value == expression
+
+def match_value(value,expression):
+    """
+    Matches a (serialized) document value against a query expression.
+    """
+    if isinstance(expression,dict) and expression and \
+      all([key.startswith('$') for key in expression]):
+        return all([match_operator(value,operator,argument)
+                    for operator,argument in expression.items()])
+    if value is undefined:
+        return False
+    if isinstance(value,(list,tuple)) and not isinstance(expression,(list,tuple)):
+        return any([values_equal(v,expression) for v in value])
+    return values_equal(value,expression)
+
+def match_operator(value,operator,argument):
+    if operator == '$exists':
+        return (value is not undefined) == bool(argument)
+    if operator == '$not':
+        return not match_value(value,argument)
+    if operator == '$ne':
+        return not match_value(value,argument)
+    if operator == '$in':
+        return any([match_value(value,v) for v in argument])
+    if operator == '$nin':
+        return not any([match_value(value,v) for v in argument])
+    if operator == '$all':
+        return all([match_value(value,v) for v in argument])
+    if value is undefined:
+        return False
+    if operator == '$regex':
+        return isinstance(value,six.string_types) and re.match(argument,value) is not None
+    if operator == '$gt':
+        return value > argument
+    if operator == '$gte':
+        return value >= argument
+    if operator == '$lt':
+        return value < argument
+    if operator == '$lte':
+        return value <= argument
+    raise AttributeError("Invalid operator: %s" % operator)
+
+def match_query(attributes,query):
+    for key,expression in query.items():
+        if key == '$and':
+            if not all([match_query(attributes,q) for q in expression]):
+                return False
+        elif key == '$or':
+            if not any([match_query(attributes,q) for q in expression]):
+                return False
+        elif key.startswith('$'):
+            raise AttributeError("Invalid operator: %s" % key)
+        elif not match_value(get_value(attributes,key),expression):
+            return False
+    return True
+
+class QuerySet(BaseQuerySet):
+
+    #number of documents that we load at once when iterating over a query set
+    batch_size = 100
+
+    def __init__(self,backend,cls,keys):
+        super(QuerySet,self).__init__(backend,cls)
+        self.keys = list(keys)
+        self.objects = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        for i in range(0,len(self.keys),self.batch_size):
+            keys = [key for key in self.keys[i:i+self.batch_size] if not key in self.objects]
+            if keys:
+                self.objects.update(self.backend.get_objects(self.cls,keys))
+            for key in self.keys[i:i+self.batch_size]:
+                if key in self.objects:
+                    yield self.objects[key]
+
+    def __getitem__(self,i):
+        if isinstance(i,slice):
+            return self.__class__(self.backend,self.cls,self.keys[i])
+        key = self.keys[i]
+        if not key in self.objects:
+            objects = self.backend.get_objects(self.cls,[key])
+            if not key in objects:
+                raise self.cls.DoesNotExist
+            self.objects.update(objects)
+        return self.objects[key]
+
+    def __contains__(self,obj):
+        return obj.pk in self.keys
+
+    def __eq__(self,other):
+        if isinstance(other,QuerySet):
+            return self.cls == other.cls and set(self.keys) == set(other.keys)
+        if isinstance(other,list):
+            return list(self) == other
+        return False
+
+    def __ne__(self,other):
+        return not self.__eq__(other)
+
+    def filter(self,query):
+        return self.backend.filter(self.cls,query,initial_keys = self.keys)
+
+    def sort(self,key,order = BaseQuerySet.ASCENDING):
+        self.keys = self.backend.sort(self.cls,self.keys,key,order)
+        return self
+
+    def delete(self):
+        self.backend.delete_by_keys(self.cls,self.keys)
+        self.keys = []
+        self.objects = {}
+
+class SqliteBackend(Backend):
+
+    """
+    Stores documents in an SQLite database in WAL mode, so that several processes can read
+    while another one writes. Saved documents are buffered and inserted in bulk (when the
+    buffer is full, before queries and on `commit`).
+    """
+
+    def __init__(self,path,buffer_size = 1000,timeout = 60,**kwargs):
+        self.path = os.path.abspath(path)
+        self.buffer_size = buffer_size
+        self.connection = sqlite3.connect(self.path,timeout = timeout)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.tables = set()
+        self.pending = {}
+        self.n_pending = 0
+        super(SqliteBackend,self).__init__(**kwargs)
+
+    def get_table(self,cls_or_collection):
+        if isinstance(cls_or_collection,six.string_types):
+            collection = cls_or_collection
+        else:
+            collection = self.get_collection_for_cls(cls_or_collection)
+        if not collection in self.tables:
+            self.create_table(collection)
+        return collection
+
+    def create_table(self,collection):
+        columns = ''.join([',%s' % get_column(key) for key in indexed_fields])
+        self.connection.execute('CREATE TABLE IF NOT EXISTS "%s" (pk PRIMARY KEY,data TEXT%s)' %
+                                (collection,columns))
+        for key in indexed_fields:
+            self.connection.execute('CREATE INDEX IF NOT EXISTS "%s_%s" ON "%s" (%s)' %
+                                    (collection,get_column(key),collection,get_column(key)))
+        self.tables.add(collection)
+
+    def encode_attributes(self,attributes):
+        return json.dumps(attributes,cls = JsonEncoder)
+
+    def decode_attributes(self,data):
+        return json.loads(data)
+
+    def save(self,obj):
+        table = self.get_table(obj.__class__)
+
+        if obj.pk is None:
+            obj.autogenerate_pk()
+
+        if hasattr(obj,'pre_save') and callable(obj.pre_save):
+            obj.pre_save()
+
+        serialized_attributes = self.serialize(obj.attributes)
+        row = [obj.pk,self.encode_attributes(serialized_attributes)]
+        for key in indexed_fields:
+            value = get_value(serialized_attributes,key)
+            row.append(value if value is not undefined and is_scalar(value) else None)
+
+        if not table in self.pending:
+            self.pending[table] = {}
+        if not obj.pk in self.pending[table]:
+            self.n_pending += 1
+        self.pending[table][obj.pk] = row
+        if self.n_pending >= self.buffer_size:
+            self.flush()
+        return obj
+
+    def flush(self):
+        """
+        Writes all buffered documents to the database (without committing them).
+        """
+        for table,rows in self.pending.items():
+            self.connection.executemany('INSERT OR REPLACE INTO "%s" VALUES (%s)' %
+                                        (table,','.join(['?']*(len(indexed_fields)+2))),
+                                        rows.values())
+        self.pending = {}
+        self.n_pending = 0
+
+    def begin(self):
+        self.commit()
+
+    def commit(self):
+        self.flush()
+        self.connection.commit()
+
+    def rollback(self):
+        self.pending = {}
+        self.n_pending = 0
+        self.connection.rollback()
+
+    def delete(self,obj):
+        if hasattr(obj,'pre_delete') and callable(obj.pre_delete):
+            obj.pre_delete()
+        self.delete_by_keys(obj.__class__,[obj.pk])
+
+    def delete_by_keys(self,cls,keys):
+        table = self.get_table(cls)
+        self.flush()
+        self.connection.execute('DELETE FROM "%s" WHERE pk IN (SELECT value FROM json_each(?))' %
+                                table,(json.dumps(list(keys)),))
+
+    def get_objects(self,cls,keys):
+        """
+        Returns a dictionary with the documents for the given primary keys.
+        """
+        table = self.get_table(cls)
+        self.flush()
+        objects = {}
+        for pk,data in self.connection.execute(
+                'SELECT pk,data FROM "%s" WHERE pk IN (SELECT value FROM json_each(?))' % table,
+                (json.dumps(list(keys)),)):
+            attributes = self.deserialize(self.decode_attributes(data))
+            objects[pk] = self.create_instance(cls,attributes)
+        return objects
+
+    def get(self,cls,query):
+        objects = self.filter(cls,query)
+        if len(objects) == 0:
+            raise cls.DoesNotExist
+        elif len(objects) > 1:
+            raise cls.MultipleDocumentsReturned
+        return objects[0]
+
+    def compile_condition(self,key,expression):
+        """
+        Returns an SQL condition and its parameters for the given part of a query, or `None`
+        if it has to be matched in Python.
+        """
+        if isinstance(expression,dict) and '__collection__' in expression \
+          and key+'.pk' in indexed_fields:
+            key,expression = key+'.pk',expression.get('pk')
+        if key != 'pk' and not key in indexed_fields:
+            return None
+        column = get_column(key)
+        if isinstance(expression,dict) and list(expression.keys()) == ['$in'] \
+          and all([is_scalar(value) and value is not None for value in expression['$in']]):
+            return ('%s IN (SELECT value FROM json_each(?))' % column,
+                    [json.dumps(list(expression['$in']))])
+        if is_scalar(expression) and expression is not None:
+            return ('%s = ?' % column,[expression])
+        return None
+
+    def filter(self,cls,query,initial_keys = None):
+        if not isinstance(query,dict):
+            raise AttributeError('Query parameters must be dict!')
+
+        table = self.get_table(cls)
+        self.flush()
+        query = self.serialize(query,autosave = False,for_query = True)
+
+        conditions = []
+        params = []
+        remaining_query = {}
+        for key,expression in query.items():
+            condition = None if key.startswith('$') else self.compile_condition(key,expression)
+            if condition is None:
+                remaining_query[key] = expression
+            else:
+                conditions.append(condition[0])
+                params.extend(condition[1])
+        if initial_keys is not None:
+            conditions.append('pk IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps(list(initial_keys)))
+
+        sql = 'SELECT pk%s FROM "%s"' % (',data' if remaining_query else '',table)
+        if conditions:
+            sql += ' WHERE '+' AND '.join(conditions)
+        sql += ' ORDER BY rowid'
+
+        if not remaining_query:
+            keys = [row[0] for row in self.connection.execute(sql,params)]
+        else:
+            keys = [pk for pk,data in self.connection.execute(sql,params)
+                    if match_query(self.decode_attributes(data),remaining_query)]
+        return QuerySet(self,cls,keys)
+
+    def sort(self,cls,keys,key,order = BaseQuerySet.ASCENDING):
+        if not isinstance(key,(list,tuple)):
+            sort_keys = [(key,order)]
+        else:
+            sort_keys = key
+        table = self.get_table(cls)
+        self.flush()
+        order_by = []
+        params = [json.dumps(list(keys))]
+        for sort_key,sort_order in sort_keys:
+            order_by.append('json_extract(data,?) %s' % ('DESC' if sort_order < 0 else 'ASC'))
+            params.append('$.'+sort_key)
+        sql = 'SELECT pk FROM "%s" WHERE pk IN (SELECT value FROM json_each(?)) ORDER BY %s' % \
+              (table,','.join(order_by))
+        return [row[0] for row in self.connection.execute(sql,params)]
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+import os
+import re
+import json
+import time
+import errno
+import hashlib
+import logging
+import tempfile
+
+try:
+    import fcntl
+    locking_support = True
+except ImportError:
+    locking_support = False
+
+logger = logging.getLogger(__name__)
+
+size_units = {
+    '' : 1,
+    'B' : 1,
+    'KB' : 1024,
+    'MB' : 1024**2,
+    'GB' : 1024**3,
+    'TB' : 1024**4,
+}
+
+def parse_size(size):
+    """
+    Converts a size like `500MB` or `2GB` (or a number of bytes) to a number of bytes.
+    """
+    if isinstance(size,(int,long,float)):
+        return int(size)
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*$',size)
+    if not match or not match.group(2).upper() in size_units:
+        raise ValueError("Invalid size: %s" % size)
+    return int(float(match.group(1))*size_units[match.group(2).upper()])
+
+def get_blob_sha(content):
+    """
+    Returns the git blob sha of the given content, so that file revisions from git and
+    from disk projects share the same cache entries.
+    """
+    if isinstance(content,unicode):
+        content = content.encode('utf-8')
+    #content can also be a buffer (e.g. a memory map), which we don't copy
+    sha = hashlib.sha1(b"blob %d\0" % len(content))
+    sha.update(content)
+    return sha.hexdigest()
+
+class BlobCache(object):
+
+    """
+    A host-wide store of analysis results, shared by all projects on the same host and
+    addressed by the content of the analyzed file, its language, the settings hash of
+    the code environment and the class paths and versions of the analyzers (so that
+    upgrading an analyzer or its tool invalidates the results).
+
+    Each entry is a JSON file in a two-level directory structure. Entries are written to
+    a temporary file first and then renamed, so concurrent writers (from several processes)
+    never produce partial entries. Reading an entry updates its modification time, which
+    is used to evict the least recently used entries when the cache exceeds its quota.
+
+    It is configured in the `blob_cache` section of the `.checkmate-rc` file:
+
+    blob_cache:
+        path: ~/.cache/checkmate/blobs
+        quota: 2GB
+    """
+
+    def __init__(self,path,quota = '1GB',low_water_mark = 0.9):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.quota = parse_size(quota)
+        self.low_water_mark = low_water_mark
+        #we check the size of the cache after writing a 20th of the quota
+        self.check_interval = max(self.quota // 20,1)
+        self._written = 0
+        if not os.path.exists(self.path):
+            try:
+                os.makedirs(self.path)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    def get_key(self,blob_sha,language,settings_hash,analyzer_versions = None):
+        """
+        `analyzer_versions` is a list of (name,class path,version) tuples of the analyzers.
+        """
+        return hashlib.sha1(json.dumps([blob_sha,language,settings_hash,analyzer_versions or []])
+                            .encode('utf-8')).hexdigest()
+
+    def get_filename(self,key):
+        return os.path.join(self.path,key[:2],key[2:]+'.json')
+
+    def get(self,key):
+        """
+        Returns the results stored for the given key, or `None`.
+        """
+        filename = self.get_filename(key)
+        try:
+            with open(filename,'rb') as input_file:
+                results = json.loads(input_file.read().decode('utf-8'))
+        except (IOError,OSError):
+            return None
+        except ValueError:
+            logger.warning("Removing corrupt cache entry %s" % filename)
+            self._remove(filename)
+            return None
+        try:
+            os.utime(filename,None)
+        except OSError:
+            pass
+        return results
+
+    def put(self,key,results):
+        filename = self.get_filename(key)
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            try:
+                os.makedirs(directory)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        data = json.dumps(results).encode('utf-8')
+        fd,temp_filename = tempfile.mkstemp(dir = directory,prefix = '.tmp-')
+        try:
+            with os.fdopen(fd,'wb') as output_file:
+                output_file.write(data)
+            os.rename(temp_filename,filename)
+        except OSError:
+            #on some platforms, renaming fails if another writer was faster
+            self._remove(temp_filename)
+            return
+        self._written += len(data)
+        if self._written >= self.check_interval:
+            self._written = 0
+            self.evict()
+
+    def get_entries(self):
+        """
+        Returns (modification time, size, filename) tuples for all entries in the cache.
+        """
+        entries = []
+        for dirpath,dirnames,filenames in os.walk(self.path):
+            for filename in filenames:
+                full_filename = os.path.join(dirpath,filename)
+                try:
+                    stat = os.stat(full_filename)
+                except OSError:
+                    continue
+                if filename.startswith('.tmp-'):
+                    #leftovers from writers that were killed
+                    if stat.st_mtime < time.time()-3600:
+                        self._remove(full_filename)
+                    continue
+                if not filename.endswith('.json'):
+                    continue
+                entries.append((stat.st_mtime,stat.st_size,full_filename))
+        return entries
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache is below the low water
+        mark of its quota. Only one process evicts entries at a time, the others skip it.
+        """
+        lock_file = open(os.path.join(self.path,'.lock'),'a')
+        try:
+            if locking_support:
+                try:
+                    fcntl.flock(lock_file,fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError:
+                    return 0
+            entries = self.get_entries()
+            size = sum([entry[1] for entry in entries])
+            if size <= self.quota:
+                return 0
+            removed = 0
+            for mtime,entry_size,filename in sorted(entries):
+                if size <= self.quota*self.low_water_mark:
+                    break
+                self._remove(filename)
+                size -= entry_size
+                removed += 1
+            logger.debug("Evicted %d entries from the blob cache" % removed)
+            return removed
+        finally:
+            lock_file.close()
+
+    def _remove(self,filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+import re
+import logging
+
+from checkmate.lib.code.blob_cache import parse_size
+
+logger = logging.getLogger(__name__)
+
+default_settings = {
+    'enabled' : True,
+    'max_size' : '2MB',
+    #the number of bytes at the start of a file that are inspected
+    'sample_size' : 65536,
+    'max_line_length' : 1000,
+    'min_whitespace_ratio' : 0.05,
+    #markers are only searched in comment lines at the start of a file
+    'header_lines' : 10,
+    'comment_prefixes' : ['#','//','/*','*','--','<!--'],
+    'generated_markers' : [
+        r'@generated',
+        r'DO NOT EDIT',
+        r'[Aa]uto-?generated',
+        r'[Gg]enerated by the protocol buffer compiler',
+        r'[Gg]enerated by Django',
+    ],
+}
+
+whitespace_bytes = b" \t\r\n\f\v"
+
+class FileClassifier(object):
+
+    """
+    Decides cheaply (before any analyzer runs) if a file revision should be analyzed at all.
+    Binary, minified, generated and very large files are skipped, as analyzing them takes
+    a lot of time and only produces useless issues. The thresholds can be changed in the
+    `classifier` section of the settings:
+
+    classifier:
+        max_size: 2MB
+        max_line_length: 1000
+        min_whitespace_ratio: 0.05
+        generated_markers: ['@generated','DO NOT EDIT']
+
+    A file counts as generated if one of the first `header_lines` lines is a comment (it
+    starts with one of the `comment_prefixes`) that contains a generated marker.
+    """
+
+    def __init__(self,settings = None):
+        self.settings = dict(default_settings)
+        self.settings.update(settings or {})
+        self.max_size = parse_size(self.settings['max_size'])
+        markers = "|".join(["(?:%s)" % marker for marker in self.settings['generated_markers']])
+        prefixes = "|".join([re.escape(prefix) for prefix in self.settings['comment_prefixes']])
+        #without markers or prefixes, we use a pattern that never matches
+        if markers and prefixes:
+            pattern = r'^[ \t]*(?:%s).*?(?P<marker>%s)' % (prefixes,markers)
+        else:
+            pattern = r'(?!)'
+        self.generated_marker_regex = re.compile(pattern.encode('utf-8'),re.MULTILINE)
+
+    def classify(self,file_revision):
+        """
+        Returns a (code,data) tuple with the reason why the file revision should be skipped,
+        or `None` if it should be analyzed.
+        """
+        if not self.settings['enabled']:
+            return None
+        try:
+            size = file_revision.get_content_size()
+            if size > self.max_size:
+                return 'FileTooLarge',{'size' : size,'limit' : self.max_size}
+            #slicing a (memory-mapped) buffer only reads the sample
+            sample = file_revision.get_content_buffer()[:self.settings['sample_size']]
+        except IOError:
+            #the analyzers will report that the content is missing
+            return None
+        if isinstance(sample,unicode):
+            sample = sample.encode('utf-8')
+        return self.classify_content(sample)
+
+    def classify_content(self,sample):
+        if b"\0" in sample:
+            return 'BinaryFile',{}
+
+        header_lines = self.settings['header_lines']
+        header = b"\n".join(sample.split(b"\n",header_lines)[:header_lines])
+        match = self.generated_marker_regex.search(header)
+        if match:
+            return 'GeneratedFile',{'marker' : match.group('marker').decode('utf-8','replace')}
+
+        longest_line = max([len(line) for line in sample.split(b"\n")])
+        if longest_line > self.settings['max_line_length']:
+            n_whitespace = len(sample)-len(sample.translate(None,whitespace_bytes))
+            whitespace_ratio = n_whitespace/float(len(sample))
+            if whitespace_ratio < self.settings['min_whitespace_ratio']:
+                return 'MinifiedFile',{'longest_line' : longest_line,
+                                       'whitespace_ratio' : round(whitespace_ratio,3)}
+        return None
@@ -26,15 +26,30 @@ import traceback
 import logging
 import six
 import copy
+import resource
+import json
+import hashlib
 
 from checkmate.management.helpers import (filter_filenames_by_analyzers,
                                           filter_filenames_by_checkignore)
 from checkmate.settings import (language_patterns,
                                 analyzers as all_analyzers,
-                                aggregators as all_aggregators)
+                                aggregators as all_aggregators,
+                                blob_cache as blob_cache_settings)
 
 from checkmate.lib.stats.mapreduce import MapReducer
+from checkmate.lib.stats.tree import SummaryTree
+from checkmate.lib.code.sandbox import (AnalysisSandbox,
+                                        AnalysisTimeout,
+                                        AnalysisMemoryExceeded,
+                                        AnalysisWorkerError)
+from checkmate.lib.code.executor import AnalysisExecutor
+from checkmate.lib.code.blob_cache import BlobCache,get_blob_sha
+from checkmate.lib.code.work_queue import AnalysisWorker,get_task_key
+from checkmate.lib.code.classifier import FileClassifier
 from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.lib.analysis.pool import analyzer_pool,get_class_path
+from checkmate.helpers.checkmate import load_class
 
 from collections import defaultdict
 
@@ -52,6 +67,26 @@ class AnalysisTimeAnalyzer(BaseAnalyzer):
 
         return dict(stats)
 
+def analysis_issue(analyzer_name,code,data,traceback_str = None):
+    """
+    Returns an issue for a file revision that could not be analyzed.
+    """
+    issue = {
+        'code' : code,
+        'analyzer' : analyzer_name,
+        'data' : data,
+        'location' : (((None,None),(None,None)),),
+    }
+    if traceback_str is not None:
+        issue['traceback'] = traceback_str
+    return issue
+
+def get_max_rss():
+    """
+    Returns the peak resident set size of the current process (in kilobytes on Linux).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
 def update_analyzers(all_analyzers,settings,type_name = "analyzers"):
     disabled_by_default = False
 
@@ -103,7 +138,14 @@ class CodeEnvironment(object):
         self._analyzers = None
         self._env = env if env is not None else {}
         self._settings = settings if settings is not None else {}
-        self._analyzer_cache = {}
+        self._analyzer_keys = {}
+        self._analyzer_versions = {}
+        self._sandbox = None
+        self._executor = None
+        self._blob_cache = None
+        #if set, file revisions are analyzed by workers (see `checkmate.lib.code.work_queue`)
+        self.work_queue = None
+        self._queued_tasks = {}
 
     @property
     def env(self):
@@ -125,6 +167,162 @@ class CodeEnvironment(object):
     def file_revisions(self):
         return self._file_revisions
 
+    @property
+    def settings_hash(self):
+        """
+        A hash of the analyzers and their settings. Analysis results can be reused for
+        identical file content as long as this hash does not change.
+        """
+        if not hasattr(self,'_settings_hash'):
+            analyzers_settings = self.settings.get('analyzers',{})
+            description = [(name,
+                            six.text_type(params['class']),
+                            params.get('language'),
+                            analyzers_settings.get(name))
+                           for name,params in sorted(self.analyzers.items())]
+            #the classifier decides which files get analyzed at all
+            if 'classifier' in self.settings:
+                description.append(('classifier',self.settings['classifier']))
+            self._settings_hash = hashlib.sha1(json.dumps(description,
+                                                          sort_keys = True,
+                                                          default = six.text_type)
+                                               .encode('utf-8')).hexdigest()
+        return self._settings_hash
+
+    @property
+    def sandbox(self):
+        if self._sandbox is None:
+            limits = self.settings.get('limits',{})
+            self._sandbox = AnalysisSandbox(self,max_files = limits.get('max_files_per_worker',100))
+        return self._sandbox
+
+    @property
+    def executor(self):
+        """
+        Returns the executor that runs analyzers concurrently, as configured in the
+        `concurrency` section of the settings (`None` if `io_workers` is 0). It is only
+        used if an I/O-bound analyzer applies or `cpu_workers` is set, and its worker pools
+        are kept until `close` is called:
+
+        concurrency:
+            io_workers: 4
+            cpu_workers: 0
+            chunk_size: 32
+        """
+        if self._executor is None:
+            concurrency = self.settings.get('concurrency',{})
+            if concurrency.get('io_workers',4):
+                self._executor = AnalysisExecutor(self,**concurrency)
+        return self._executor
+
+    def close(self):
+        """
+        Stops the worker pools of the executor.
+        """
+        if self._executor is not None:
+            self._executor.close()
+
+    @property
+    def blob_cache(self):
+        """
+        Returns the host-wide result cache configured in the `.checkmate-rc` file
+        (`None` if there is none).
+        """
+        if self._blob_cache is None and blob_cache_settings.get('path'):
+            try:
+                self._blob_cache = BlobCache(**blob_cache_settings)
+            except Exception:
+                logger.error("Cannot open the blob cache:\n%s" % traceback.format_exc())
+                blob_cache_settings.clear()
+        return self._blob_cache
+
+    def get_blob_cache_key(self,file_revision):
+        if 'sha' in file_revision and file_revision.sha:
+            blob_sha = file_revision.sha
+        else:
+            blob_sha = get_blob_sha(file_revision.get_content_buffer())
+        return self.blob_cache.get_key(blob_sha,file_revision.language,self.settings_hash,
+                                       self.get_analyzer_versions(file_revision.language))
+
+    def get_analyzer_versions(self,language):
+        """
+        Returns the (name,class path,version) tuples of the analyzers for the given language.
+        """
+        if not language in self._analyzer_versions:
+            self._analyzer_versions[language] = [
+                (name,get_class_path(params['class']),load_class(params['class']).get_version())
+                for name,params in sorted(self.analyzers.items())
+                if params['language'] == language]
+        return self._analyzer_versions[language]
+
+    def load_cached_results(self,file_revisions):
+        """
+        Sets the results of file revisions that are in the blob cache and returns the
+        file revisions that still need to be analyzed.
+        """
+        uncached_file_revisions = []
+        for file_revision in file_revisions:
+            key = None
+            results = None
+            try:
+                key = self.get_blob_cache_key(file_revision)
+                results = self.blob_cache.get(key)
+            except Exception:
+                logger.warning("Cannot read from the blob cache:\n%s" % traceback.format_exc())
+            if results is None:
+                if key is not None:
+                    file_revision.blob_cache_key = key
+                uncached_file_revisions.append(file_revision)
+            else:
+                file_revision.results = results
+                #the analysis times in the results are the ones of the cached analysis
+                file_revision.from_blob_cache = True
+        return uncached_file_revisions
+
+    def store_cached_results(self,file_revisions):
+        """
+        Stores the results of the given file revisions in the blob cache, unless an analyzer
+        failed (as the failure might not occur again).
+        """
+        error_codes = ('AnalysisError','AnalysisTimeout','AnalysisMemoryExceeded')
+        for file_revision in file_revisions:
+            if not 'blob_cache_key' in file_revision or not 'results' in file_revision:
+                continue
+            key = file_revision.blob_cache_key
+            del file_revision.blob_cache_key
+            if any([issue.get('code') in error_codes
+                    for results in file_revision.results.values() if isinstance(results,dict)
+                    for issue in results.get('issues',[])]):
+                continue
+            try:
+                self.blob_cache.put(key,file_revision.results)
+            except Exception:
+                logger.warning("Cannot write to the blob cache:\n%s" % traceback.format_exc())
+
+    def get_limits(self,analyzer_name):
+        """
+        Returns the time (in seconds) and memory (in MB) limits for the given analyzer,
+        as defined in the `limits` section of the settings:
+
+        limits:
+            timeout: 60
+            memory_limit: 2048
+            max_files_per_worker: 100
+            analyzers:
+                pylint:
+                    timeout: 300
+        """
+        limits = {'timeout' : None,'memory_limit' : None}
+        settings_limits = self.settings.get('limits',{})
+        for key in limits:
+            if key in settings_limits:
+                limits[key] = settings_limits[key]
+        analyzer_limits = settings_limits.get('analyzers',{}).get(analyzer_name,{})
+        for key in limits:
+            if key in analyzer_limits:
+                limits[key] = analyzer_limits[key]
+        return limits
+
     @property
     def settings(self):
         return self._settings
@@ -147,61 +345,57 @@ class CodeEnvironment(object):
 
 
     def init_analyzer(self,name,parameters):
+        """
+        Returns the analyzer with the given name from the analyzer pool of the process, which
+        keeps one instance per analyzer class and settings.
+        """
         class_str = parameters['class']
-        
-        if class_str in self._analyzer_cache:
-            return self._analyzer_cache[class_str]
-
-        kwargs = parameters['opts'] if 'opts' in parameters else {}
-
-        #If we have settings for this analyzer, we add them to the keyword arguments
-        if 'analyzers' in self.settings and name in self.settings['analyzers']:
-            kwargs.update(self.settings['analyzers'][name])
-        if isinstance(class_str,six.string_types):
-            (module_name,separator,class_name) = class_str.rpartition(u".")
-            module = __import__(module_name,globals(),locals(),[str(class_name)],-1)
-            analyzer_class = getattr(module,class_name)
-        else:
-            analyzer_class = class_str
-        analyzer = analyzer_class(self,**kwargs)
-        self._analyzer_cache[class_str] = analyzer
-        return analyzer
+
+        #the keyword arguments and pool key of each analyzer are only calculated once
+        if not name in self._analyzer_keys:
+            kwargs = dict(parameters['opts']) if 'opts' in parameters else {}
+            #If we have settings for this analyzer, we add them to the keyword arguments
+            if 'analyzers' in self.settings and name in self.settings['analyzers']:
+                kwargs.update(self.settings['analyzers'][name])
+            self._analyzer_keys[name] = kwargs,analyzer_pool.get_key(class_str,kwargs)
+
+        kwargs,key = self._analyzer_keys[name]
+        return analyzer_pool.get(class_str,kwargs,self,key = key)
 
     def diff_summaries(self,snapshot_a,snapshot_b):
 
         summary = {}
 
-        if not hasattr(snapshot_a,'summary') or not hasattr(snapshot_b,'summary'):
+        if not 'summary' in snapshot_a or not 'summary' in snapshot_b:
             return summary
 
-        languages = set(snapshot_a.summary.keys()+snapshot_b.summary.keys())
+        summary_a = SummaryTree.load(snapshot_a.summary)
+        summary_b = SummaryTree.load(snapshot_b.summary)
+        analyzers_a = summary_a.get_analyzers()
+        analyzers_b = summary_b.get_analyzers()
 
-        for language in languages:
+        for language in set(analyzers_a.keys()+analyzers_b.keys()):
 
             summary[language] = {}
 
-            if not language in snapshot_a.summary or not language in snapshot_b.summary:
+            if not language in analyzers_a or not language in analyzers_b:
                 continue
 
-            language_summary_a = snapshot_a.summary[language]
-            language_summary_b = snapshot_b.summary[language]
-
             for analyzer_name,analyzer_params in self.analyzers.items():
 
-                if not analyzer_name in language_summary_a \
-                   or not analyzer_name in language_summary_b:
+                if not analyzer_name in analyzers_a[language] \
+                   or not analyzer_name in analyzers_b[language]:
                     continue
 
                 summary[language][analyzer_name] = {}
 
                 analyzer = self.init_analyzer(analyzer_name,analyzer_params)
 
-                for key in language_summary_a[analyzer_name]:
-                    if not key in language_summary_b[analyzer_name]:
+                values_b = summary_b.get_values(language,analyzer_name)
+                for key,value_a in summary_a.get_values(language,analyzer_name).items():
+                    if not key in values_b:
                         continue
-                    result = analyzer.diff_summary(language_summary_a[analyzer_name][key],
-                                                   language_summary_b[analyzer_name][key]
-                                                  )
+                    result = analyzer.diff_summary(value_a,values_b[key])
                     if result:
                         summary[language][analyzer_name][key] = result
 
@@ -229,8 +423,12 @@ class CodeEnvironment(object):
                 for group in group_by:
                     if not group in item:
                         return []
+                file_revision = item['file_revision']
+                #issues shared between file revisions can be annotated with their path
+                if getattr(item,'_path',None):
+                    file_revision = {'path' : item._path}
                 return [(key,item) for aggregator in aggregators 
-                        for key in aggregator['mapper'](item['file_revision'])]
+                        for key in aggregator['mapper'](file_revision)]
 
             def reduce(self,key,items):
                 grouped_issues ={}
@@ -268,18 +466,30 @@ class CodeEnvironment(object):
     def summarize(self,
                   file_revisions,
                   significance_limit = 0.01,
-                  include_analysis_time = True):
+                  include_analysis_time = True,
+                  keys = None):
+
+        """
+        Summarizes the results of the given file revisions for each aggregator key and
+        returns them as a `SummaryTree` (see `checkmate.lib.stats.tree`).
+
+        If `keys` is given, only the summaries for these keys are calculated (e.g. to
+        update the directories that contain a modified file).
+        """
+
+        results = SummaryTree()
 
         if not file_revisions:
-            return {}
+            return results
 
-        results = defaultdict(lambda : defaultdict(lambda: defaultdict(dict)))
         file_revisions_by_key = defaultdict(lambda : {})
 
         for aggregator in self.aggregators.values():
             for file_revision in file_revisions:
-                keys = aggregator['mapper'](file_revision)
-                for key in keys:
+                aggregator_keys = aggregator['mapper'](file_revision)
+                for key in aggregator_keys:
+                    if keys is not None and not key in keys:
+                        continue
                     if not file_revision['path'] in file_revisions_by_key[key]:
                         file_revisions_by_key[key][file_revision['path']] = file_revision
 
@@ -293,78 +503,332 @@ class CodeEnvironment(object):
                         if hasattr(analyzer,'summarize_all'):
                             #If the analyzer has a `summarize_all` function we call it with the 
                             #results from ALL analyzers and its own name.
-                            results[language][analyzer_name][key] = analyzer\
-                                                                    .summarize_all([f['results'] 
+                            results.set(language,analyzer_name,key,analyzer.summarize_all([
+                                f['results']
                                 for f in file_revisions_by_key[key].values() 
                                 if 'results' in f and f['language'] == language]
-                                ,analyzer_name)
+                                ,analyzer_name))
                         else:
-                            results[language][analyzer_name][key] = analyzer.summarize([
+                            results.set(language,analyzer_name,key,analyzer.summarize([
                                 f['results'][analyzer_name] 
                                 for f in file_revisions_by_key[key].values() 
                                 if 'results' in f and f['language'] == language 
-                                and analyzer_name in f['results']])
+                                and analyzer_name in f['results']]))
                 except Exception as e:
                     logger.error("Could not summarize results for analyzers %s and key %s" % 
                         (analyzer_name,key))
                     raise
                     continue
 
-            results[language] = dict(results[language])
+            if include_analysis_time:
+                analysis_time_analyzer = AnalysisTimeAnalyzer(self)
+                for key in file_revisions_by_key:
+                    results.set(language,'analysis_time',key,analysis_time_analyzer.summarize([
+                        f['results']['analysis_time']
+                        for f in file_revisions_by_key[key].values()
+                        if 'results' in f and f['language'] == language
+                        and 'analysis_time' in f['results']]))
 
-        results = dict(results)
         return results
 
+    def merge_summaries(self,summary,other):
+        """
+        Merges the summary of another set of file revisions (e.g. the next chunk of a
+        snapshot) into the given `SummaryTree`, using the `merge_summaries` function
+        of each analyzer.
+        """
+        analyzers = {'analysis_time' : AnalysisTimeAnalyzer(self)}
+        for key,node in other.items():
+            for (language,analyzer_name),value in other.get_node_values(node):
+                existing_value = summary.get(language,analyzer_name,key)
+                if existing_value is None:
+                    summary.set(language,analyzer_name,key,value)
+                    continue
+                if not analyzer_name in analyzers:
+                    analyzers[analyzer_name] = self.init_analyzer(analyzer_name,
+                                                                  self.analyzers[analyzer_name])
+                summary.set(language,analyzer_name,key,
+                    analyzers[analyzer_name].merge_summaries([existing_value,value]))
+        return summary
+
     def analyze_file_revisions(self,file_revisions):
 
         filtered_file_revisions =  self.filter_file_revisions(file_revisions)
 
+        def get_analyzers(file_revision):
+            return {analyzer_name : analyzer_params 
+                    for analyzer_name,analyzer_params in self.analyzers.items()
+                    if analyzer_params['language'] == file_revision.language}
+
         for file_revision in filtered_file_revisions:
-            logger.info("Analyzing: "+file_revision['path'])
             file_revision.language = self.get_language(file_revision)
-            file_revision.results = self.analyze_file_revision(file_revision,
-                {analyzer_name : analyzer_params 
-                    for analyzer_name,analyzer_params in self.analyzers.items()
-                    if analyzer_params['language'] == file_revision.language})
+
+        self.prefetch_file_revisions(filtered_file_revisions)
+        uncached_file_revisions = self.classify_file_revisions(filtered_file_revisions)
+        if self.blob_cache is not None:
+            n_unclassified = len(uncached_file_revisions)
+            uncached_file_revisions = self.load_cached_results(uncached_file_revisions)
+            logger.info("Found %d file revisions in the blob cache" %
+                        (n_unclassified-len(uncached_file_revisions)))
+
+        if self.work_queue is not None:
+            self.analyze_file_revisions_in_queue(uncached_file_revisions,get_analyzers)
+        elif self.executor is not None and self.executor.applies(uncached_file_revisions,
+                                                                  get_analyzers):
+            self.executor.analyze(uncached_file_revisions,get_analyzers)
+        else:
+            for file_revision in uncached_file_revisions:
+                logger.info("Analyzing: "+file_revision['path'])
+                file_revision.results = self.analyze_file_revision(file_revision,
+                                                                   get_analyzers(file_revision))
+
+        if self.blob_cache is not None:
+            self.store_cached_results(uncached_file_revisions)
 
         return filtered_file_revisions
 
+    @property
+    def classifier(self):
+        if not hasattr(self,'_classifier'):
+            self._classifier = FileClassifier(self.settings.get('classifier'))
+        return self._classifier
+
+    def prefetch_file_revisions(self,file_revisions):
+        """
+        Fetches the sizes and contents of the given file revisions in batches (e.g. the git
+        blobs of a chunk through a single `git cat-file --batch` process), skipping contents
+        that the classifier rejects as too large.
+        """
+        file_revisions_by_class = defaultdict(list)
+        for file_revision in file_revisions:
+            file_revisions_by_class[file_revision.__class__].append(file_revision)
+        for cls,class_file_revisions in file_revisions_by_class.items():
+            cls.prefetch_content_sizes(class_file_revisions)
+            cls.prefetch_contents(class_file_revisions,max_size = self.classifier.max_size
+                                  if self.classifier.settings['enabled'] else None)
+
+    def classify_file_revisions(self,file_revisions):
+        """
+        Marks binary, minified, generated and very large file revisions as `skipped` (with
+        the reason code) and returns the file revisions that should be analyzed.
+        """
+        analyzed_file_revisions = []
+        for file_revision in file_revisions:
+            reason = self.classifier.classify(file_revision)
+            if reason is None:
+                analyzed_file_revisions.append(file_revision)
+                continue
+            code,data = reason
+            logger.info("Skipping %s (%s)" % (file_revision.path,code))
+            file_revision.skipped = {'code' : code,'data' : data}
+            file_revision.results = {'analysis_time' : {},'analysis_memory' : {}}
+        return analyzed_file_revisions
+
+    def get_tasks(self,file_revision,analyzers):
+        """
+        Returns the work queue tasks for analyzing the file revision with the given analyzers.
+        """
+        content = file_revision.get_file_content()
+        if isinstance(content,unicode):
+            content = content.encode('utf-8')
+        if 'sha' in file_revision and file_revision.sha:
+            blob_sha = file_revision.sha
+        else:
+            blob_sha = get_blob_sha(content)
+        data = {
+            'path' : file_revision.path,
+            'language' : file_revision.language,
+            'sha' : blob_sha,
+            #we store the bytes losslessly in a JSON string
+            'code' : content.decode('latin-1'),
+            'settings' : self.settings,
+        }
+        return [(get_task_key(blob_sha,analyzer_name,self.settings_hash),
+                 analyzer_name,
+                 self.settings_hash,
+                 data)
+                for analyzer_name in analyzers]
+
+    def submit_file_revisions(self,file_revisions):
+        """
+        Submits the tasks for analyzing the given file revisions to the work queue, so that
+        workers can start with them before `analyze_file_revisions` gets called.
+        """
+        tasks = []
+        for file_revision in file_revisions:
+            if file_revision.path in self._queued_tasks:
+                continue
+            file_revision.language = self.get_language(file_revision)
+            #files that the classifier skips are not analyzed by anyone
+            if self.classifier.classify(file_revision) is not None:
+                continue
+            analyzers = [analyzer_name for analyzer_name,analyzer_params in self.analyzers.items()
+                         if analyzer_params['language'] == file_revision.language]
+            try:
+                file_revision_tasks = self.get_tasks(file_revision,analyzers)
+            except IOError:
+                logger.error("Cannot read %s:\n%s" % (file_revision.path,traceback.format_exc()))
+                continue
+            self._queued_tasks[file_revision.path] = [(key,analyzer_name)
+                                                      for key,analyzer_name,settings_hash,data
+                                                      in file_revision_tasks]
+            tasks.extend(file_revision_tasks)
+        if tasks:
+            self.work_queue.submit(tasks)
+
+    def analyze_file_revisions_in_queue(self,file_revisions,get_analyzers,poll_interval = 0.5):
+        """
+        Submits the file revisions to the work queue and waits until the workers analyzed
+        them. In the meantime, we run tasks of the file revisions ourselves.
+        """
+        self.submit_file_revisions(file_revisions)
+        #file revisions that we could not submit are analyzed here (producing analysis errors)
+        for file_revision in file_revisions:
+            if not file_revision.path in self._queued_tasks:
+                file_revision.results = self.analyze_file_revision(file_revision,
+                                                                   get_analyzers(file_revision))
+        file_revisions = [fr for fr in file_revisions if fr.path in self._queued_tasks]
+        keys = set([key for file_revision in file_revisions
+                    for key,analyzer_name in self._queued_tasks[file_revision.path]])
+        worker = AnalysisWorker(self.work_queue,code_environment = self)
+        task_results = {}
+        while True:
+            task_results.update(self.work_queue.get_results(keys-set(task_results.keys())))
+            if len(task_results) == len(keys):
+                break
+            if not worker.work(keys = keys-set(task_results.keys())):
+                time.sleep(poll_interval)
+        for file_revision in file_revisions:
+            file_revision.results = self.merge_task_results([
+                (analyzer_name,task_results[key])
+                for key,analyzer_name in self._queued_tasks.pop(file_revision.path)])
+
+    def merge_task_results(self,task_results):
+        """
+        Merges the (analyzer name, (state, results)) of the tasks of a file revision.
+        """
+        results = {'analysis_time' : {},'analysis_memory' : {}}
+        for analyzer_name,(state,analyzer_results) in task_results:
+            if state == 'failed':
+                error = analyzer_results.get('error') if analyzer_results else None
+                issue = analysis_issue(analyzer_name,'AnalysisError',{
+                        'exception' : 'The analysis of this file failed on all workers.',
+                        },error)
+                results[analyzer_name] = {'issues' : [issue]}
+                continue
+            #file revisions with identical content share the results of a task
+            results[analyzer_name] = copy.deepcopy(analyzer_results.get(analyzer_name,{}))
+            for key in ('analysis_time','analysis_memory'):
+                results[key].update(analyzer_results.get(key,{}))
+        return results
+
+    def run_analyzer(self,analyzer_name,analyzer_params,file_revision):
+        """
+        Runs an analyzer on a file revision and returns the results, the analysis time
+        and the increase of the peak memory usage of the process during the analysis.
+        """
+        analyzer = self.init_analyzer(analyzer_name,analyzer_params)
+
+        start = time.time()
+        start_rss = get_max_rss()
+        analyzer_results = analyzer.analyze(file_revision)
+        stop = time.time()
+
+        return analyzer_results,stop-start,get_max_rss()-start_rss
+
     def analyze_file_revision(self,file_revision,analyzers):
+        #all analyzers share one (possibly memory-mapped) buffer with the file content
+        file_revision.hold_content()
+        try:
+            return self.collect_results(file_revision,self.submit_analyzers(file_revision,analyzers))
+        finally:
+            file_revision.release_content()
+
+    def submit_analyzers(self,file_revision,analyzers,executor = None):
+        """
+        Returns a dictionary with a callable for each analyzer, which returns the results,
+        the analysis time and the increase of the peak memory usage for the file revision.
+
+        If an executor is given, it can schedule analyzers to run concurrently. Otherwise,
+        (or if the executor doesn't take the analyzer) the analyzer runs when the callable
+        gets called.
+        """
+        pending = {}
+        for analyzer_name,analyzer_params in analyzers.items():
+            limits = self.get_limits(analyzer_name)
+            if limits['timeout'] or limits['memory_limit']:
+                #We run the analyzer in a separate process to enforce the limits
+                def task(analyzer_name = analyzer_name,
+                         analyzer_params = analyzer_params,
+                         limits = limits):
+                    return self.sandbox.run_analyzer(analyzer_name,
+                                                     analyzer_params,
+                                                     file_revision,
+                                                     **limits)
+            else:
+                task = None
+                if executor is not None:
+                    try:
+                        task = executor.submit(analyzer_name,analyzer_params,file_revision)
+                    except Exception:
+                        def task(traceback_str = traceback.format_exc()):
+                            raise AnalysisWorkerError("Could not schedule the analysis.",
+                                                      traceback = traceback_str)
+                if task is None:
+                    def task(analyzer_name = analyzer_name,analyzer_params = analyzer_params):
+                        return self.run_analyzer(analyzer_name,analyzer_params,file_revision)
+            pending[analyzer_name] = task
+        return pending
+
+    def collect_results(self,file_revision,pending):
 
         analysis_time = {}
+        analysis_memory = {}
         results = {}
 
-        for analyzer_name,analyzer_params in analyzers.items():
+        for analyzer_name,task in pending.items():
             try:
-                analyzer = self.init_analyzer(analyzer_name,analyzer_params)
-                
-                start = time.time()
-                analyzer_results = analyzer.analyze(file_revision)
-                stop = time.time()
+                analyzer_results,duration,rss_delta = task()
                 
-                analysis_time[analyzer_name] = stop-start
+                analysis_time[analyzer_name] = duration
+                #increase of the peak memory usage of the process during the analysis
+                if rss_delta is not None:
+                    analysis_memory[analyzer_name] = rss_delta
 
                 if analyzer_results:
                     results[analyzer_name] = analyzer_results
                 else:
                     results[analyzer_name] = {}
 
+            except AnalysisTimeout as e:
+                if self.raise_on_analysis_error:
+                    raise
+                logger.error("Analyzer %s timed out on %s" % (analyzer_name,file_revision.path))
+                issue = analysis_issue(analyzer_name,'AnalysisTimeout',{'timeout' : e.timeout})
+                results[analyzer_name] = {'issues' :  [issue]}
+            except AnalysisMemoryExceeded as e:
+                if self.raise_on_analysis_error:
+                    raise
+                logger.error("Analyzer %s exceeded the memory limit on %s" % (analyzer_name,
+                                                                              file_revision.path))
+                issue = analysis_issue(analyzer_name,'AnalysisMemoryExceeded',
+                                       {'memory_limit' : e.memory_limit})
+                results[analyzer_name] = {'issues' :  [issue]}
             except Exception as e:
                 if self.raise_on_analysis_error:
                     raise
-                issue = {
-                    'code' : 'AnalysisError',
-                    'analyzer' : analyzer_name,
-                    'data' : {
+                traceback_str = getattr(e,'traceback',None) or traceback.format_exc()
+                issue = analysis_issue(analyzer_name,'AnalysisError',{
                         'exception' : 'An exception occured during the analysis of this file.',
-                        },
-                    'location' : (((None,None),(None,None)),),
-                    'traceback' : traceback.format_exc()
-                }
-                logger.error(traceback.format_exc())
+                        },traceback_str)
+                logger.error(traceback_str)
                 results[analyzer_name] = {'issues' :  [issue]}
 
+        if self._sandbox is not None:
+            self.sandbox.file_done()
+
         results['analysis_time'] = dict(analysis_time)
+        results['analysis_memory'] = dict(analysis_memory)
 
         return results
 
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import signal
+import traceback
+import logging
+import multiprocessing
+
+from multiprocessing.pool import ThreadPool
+
+from checkmate.lib.models import MockFileRevision
+from checkmate.lib.code.sandbox import AnalysisWorkerError
+
+logger = logging.getLogger(__name__)
+
+#the code environment of a worker process (set by the pool initializer)
+_code_environment = None
+
+def init_worker(code_environment):
+    global _code_environment
+    #CTRL-C is handled by the parent process, which terminates the pool.
+    signal.signal(signal.SIGINT,signal.SIG_IGN)
+    _code_environment = code_environment
+
+def run_in_worker(analyzer_name,file_revision_data):
+    try:
+        file_revision = MockFileRevision(file_revision_data)
+        return 'ok',_code_environment.run_analyzer(analyzer_name,
+                                                   _code_environment.analyzers[analyzer_name],
+                                                   file_revision)
+    except Exception:
+        return 'error',traceback.format_exc()
+
+def run_in_thread(code_environment,analyzer_name,analyzer_params,file_revision):
+    try:
+        analyzer_results,duration,rss_delta = code_environment.run_analyzer(analyzer_name,
+                                                                            analyzer_params,
+                                                                            file_revision)
+        #the peak memory usage is shared with all other threads, so we can't attribute it
+        return 'ok',(analyzer_results,duration,None)
+    except Exception:
+        return 'error',traceback.format_exc()
+
+def fetch_file_content(file_revision):
+    try:
+        return 'ok',file_revision.get_file_content()
+    except Exception:
+        return 'error',traceback.format_exc()
+
+class PendingResult(object):
+
+    def __init__(self,async_result):
+        self.async_result = async_result
+
+    def __call__(self):
+        status,value = self.async_result.get()
+        if status == 'error':
+            raise AnalysisWorkerError("An exception occured during the analysis.",
+                                      traceback = value)
+        return value
+
+class AnalysisExecutor(object):
+
+    """
+    Overlaps the analysis of several file revisions:
+
+    * file contents (e.g. `git cat-file` calls) are fetched concurrently in a thread pool
+    * I/O-bound analyzers (marked with `io_bound` in their plugin definition, e.g. analyzers
+      that wait on an external tool like `jshint`) run in the same thread pool
+    * CPU-bound analyzers run in a process pool if `cpu_workers` is set, and in the
+      current thread otherwise (while the I/O-bound analyzers are waiting)
+
+    At most `chunk_size` file revisions are in flight at any time.
+    """
+
+    def __init__(self,code_environment,io_workers = 4,cpu_workers = 0,chunk_size = 32):
+        self.code_environment = code_environment
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.chunk_size = chunk_size
+        self._thread_pool = None
+        self._process_pool = None
+
+    @property
+    def thread_pool(self):
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPool(self.io_workers)
+        return self._thread_pool
+
+    @property
+    def process_pool(self):
+        if self._process_pool is None and self.cpu_workers:
+            #we make sure the analyzers are initialized before forking the workers
+            self.code_environment.analyzers
+            self._process_pool = multiprocessing.Pool(self.cpu_workers,
+                                                      initializer = init_worker,
+                                                      initargs = (self.code_environment,))
+        return self._process_pool
+
+    def close(self):
+        for pool in (self._thread_pool,self._process_pool):
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        self._thread_pool = None
+        self._process_pool = None
+
+    def applies(self,file_revisions,get_analyzers):
+        """
+        Returns whether an analyzer of the given file revisions can run concurrently. If none
+        can, they are analyzed in the current thread, where the analyzers of a file revision
+        share its content and are profiled one by one.
+        """
+        if self.cpu_workers:
+            return True
+        return any([analyzer_params.get('io_bound') for file_revision in file_revisions
+                    for analyzer_params in get_analyzers(file_revision).values()])
+
+    def submit(self,analyzer_name,analyzer_params,file_revision):
+        """
+        Schedules an analyzer run and returns a callable that waits for its result.
+        Returns `None` if the analyzer should run in the current thread.
+        """
+        if analyzer_params.get('io_bound'):
+            return PendingResult(self.thread_pool.apply_async(run_in_thread,
+                (self.code_environment,analyzer_name,analyzer_params,file_revision)))
+        elif self.process_pool is not None:
+            file_revision_data = {
+                'path' : file_revision.path,
+                'language' : file_revision.language,
+                'code' : file_revision.get_file_content(),
+            }
+            return PendingResult(self.process_pool.apply_async(run_in_worker,
+                (analyzer_name,file_revision_data)))
+        return None
+
+    def fetch(self,file_revisions):
+        """
+        Fetches the contents of the given file revisions concurrently and returns
+        in-memory copies of them, so that analyzers don't fetch them again.
+        """
+        contents = self.thread_pool.map(fetch_file_content,file_revisions)
+        cached_file_revisions = []
+        for file_revision,(status,value) in zip(file_revisions,contents):
+            if status == 'error':
+                #we let the analyzers fail on this file
+                logger.error(value)
+                cached_file_revisions.append(file_revision)
+                continue
+            cached_file_revisions.append(MockFileRevision({
+                'path' : file_revision.path,
+                'language' : file_revision.language,
+                'code' : value,
+            }))
+        return cached_file_revisions
+
+    def analyze(self,file_revisions,get_analyzers):
+        """
+        Analyzes the given file revisions and stores the results in their `results` attribute.
+        `get_analyzers` returns the analyzers for a given file revision.
+        """
+        code_environment = self.code_environment
+        for i in range(0,len(file_revisions),self.chunk_size):
+            chunk = file_revisions[i:i+self.chunk_size]
+            tasks = []
+            for file_revision,cached_file_revision in zip(chunk,self.fetch(chunk)):
+                logger.info("Analyzing: "+file_revision['path'])
+                analyzers = get_analyzers(file_revision)
+                tasks.append((cached_file_revision,
+                              code_environment.submit_analyzers(cached_file_revision,
+                                                                analyzers,
+                                                                executor = self)))
+            for file_revision,(cached_file_revision,pending) in zip(chunk,tasks):
+                file_revision.results = code_environment.collect_results(cached_file_revision,
+                                                                         pending)
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import signal
+import resource
+import traceback
+import logging
+import multiprocessing
+
+from checkmate.lib.models import MockFileRevision
+
+logger = logging.getLogger(__name__)
+
+class AnalysisTimeout(Exception):
+
+    def __init__(self,timeout):
+        super(AnalysisTimeout,self).__init__("Analysis timed out after %s seconds" % timeout)
+        self.timeout = timeout
+
+class AnalysisMemoryExceeded(Exception):
+
+    def __init__(self,memory_limit):
+        super(AnalysisMemoryExceeded,self).__init__("Analysis exceeded the memory limit of %s MB" %
+                                                    memory_limit)
+        self.memory_limit = memory_limit
+
+class AnalysisWorkerError(Exception):
+
+    """
+    An exception that occured in the worker process. `traceback` contains the formatted
+    traceback from the worker.
+    """
+
+    def __init__(self,message,traceback = None):
+        super(AnalysisWorkerError,self).__init__(message)
+        self.traceback = traceback
+
+def get_vm_size():
+    """
+    Returns the virtual memory size of the current process in bytes (or 0 if it is not
+    available, e.g. on systems without `/proc`).
+    """
+    try:
+        with open("/proc/self/statm") as statm_file:
+            return int(statm_file.read().split()[0])*resource.getpagesize()
+    except (IOError,OSError,ValueError,IndexError):
+        return 0
+
+def set_memory_limit(memory_limit):
+    """
+    Limits the address space of the current process to its current size plus `memory_limit`
+    MB (the forked worker already maps the memory of the parent process and the analyzers).
+    """
+    soft,hard = resource.getrlimit(resource.RLIMIT_AS)
+    if memory_limit:
+        soft = get_vm_size()+memory_limit*1024*1024
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft,hard)
+    else:
+        soft = hard
+    resource.setrlimit(resource.RLIMIT_AS,(soft,hard))
+
+def worker_loop(connection,code_environment):
+    """
+    Runs in the worker process: receives (analyzer name, analyzer parameters, file revision,
+    memory limit) tasks and sends back the results until it receives `None`.
+    """
+    #CTRL-C is handled by the parent process, which terminates the worker.
+    signal.signal(signal.SIGINT,signal.SIG_IGN)
+    while True:
+        task = connection.recv()
+        if task is None:
+            break
+        analyzer_name,analyzer_params,file_revision_data,memory_limit = task
+        file_revision = MockFileRevision(file_revision_data)
+        try:
+            set_memory_limit(memory_limit)
+            try:
+                result = code_environment.run_analyzer(analyzer_name,
+                                                        analyzer_params,
+                                                        file_revision)
+            finally:
+                set_memory_limit(None)
+            connection.send(('ok',result))
+        except MemoryError:
+            connection.send(('memory',None))
+            break
+        except Exception:
+            connection.send(('error',traceback.format_exc()))
+
+class AnalysisSandbox(object):
+
+    """
+    Runs analyzers in a separate worker process, so that we can enforce time and memory
+    limits for each analyzer and file.
+
+    The worker is forked from the current process, so it shares the analyzers and settings
+    of the code environment. It is replaced by a new one after a limit was exceeded and
+    after `max_files` file revisions, which contains the memory growth of analyzers that
+    cache data between files (e.g. astroid).
+    """
+
+    def __init__(self,code_environment,max_files = 100):
+        self.code_environment = code_environment
+        self.max_files = max_files
+        self._process = None
+        self._connection = None
+        self._n_files = 0
+
+    def start(self):
+        #we make sure the analyzers are initialized before forking the worker
+        self.code_environment.analyzers
+        self._connection,child_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target = worker_loop,
+                                                args = (child_connection,self.code_environment))
+        self._process.daemon = True
+        self._process.start()
+        self._n_files = 0
+
+    def stop(self,kill = False):
+        if self._process is None:
+            return
+        if not kill and self._process.is_alive():
+            try:
+                self._connection.send(None)
+                self._process.join(1.0)
+            except (IOError,EOFError):
+                pass
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(1.0)
+            if self._process.is_alive():
+                os.kill(self._process.pid,signal.SIGKILL)
+                self._process.join()
+        self._connection.close()
+        self._process = None
+        self._connection = None
+
+    def run_analyzer(self,analyzer_name,analyzer_params,file_revision,
+                     timeout = None,memory_limit = None):
+        """
+        Runs the given analyzer on the file revision in the worker and returns the
+        results, the analysis time and the increase of the peak memory usage.
+
+        Raises `AnalysisTimeout` or `AnalysisMemoryExceeded` if a limit was exceeded.
+        """
+        if self._process is None:
+            self.start()
+        file_revision_data = {
+            'path' : file_revision.path,
+            'language' : file_revision.language if 'language' in file_revision else None,
+            'code' : file_revision.get_file_content(),
+        }
+        self._connection.send((analyzer_name,analyzer_params,file_revision_data,memory_limit))
+        if not self._connection.poll(timeout):
+            logger.warning("Analyzer %s timed out on %s, restarting worker" % (analyzer_name,
+                                                                               file_revision.path))
+            self.stop(kill = True)
+            raise AnalysisTimeout(timeout)
+        try:
+            status,value = self._connection.recv()
+        except EOFError:
+            self._process.join(1.0)
+            exitcode = self._process.exitcode
+            self.stop(kill = True)
+            if memory_limit:
+                #allocations that fail in C extensions often abort or crash the worker
+                logger.warning("The worker process terminated with exit code %s while analyzing "
+                               "%s with %s" % (exitcode,file_revision.path,analyzer_name))
+                raise AnalysisMemoryExceeded(memory_limit)
+            raise AnalysisWorkerError("The worker process terminated unexpectedly (exit code %s)" %
+                                      exitcode)
+        if status == 'memory':
+            self.stop(kill = True)
+            raise AnalysisMemoryExceeded(memory_limit)
+        elif status == 'error':
+            raise AnalysisWorkerError("An exception occured in the worker process.",
+                                      traceback = value)
+        return value
+
+    def file_done(self):
+        """
+        Should be called after all analyzers have been run on a file revision.
+        """
+        self._n_files += 1
+        if self.max_files and self._n_files >= self.max_files:
+            self.stop()
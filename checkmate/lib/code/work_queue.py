@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+import os
+import json
+import time
+import zlib
+import socket
+import sqlite3
+import hashlib
+import logging
+import threading
+import traceback
+import contextlib
+
+from checkmate.lib.models import MockFileRevision
+
+logger = logging.getLogger(__name__)
+
+"""
+A work queue for distributing the analysis of file revisions over several processes and hosts.
+
+A coordinator (`checkmate analyze --queue ...`) submits one task per (blob, analyzer, analyzer
+settings), which contains everything needed to run the analyzer (the content of the file, its
+path and language and the project settings). Workers (`checkmate worker --queue ...`) claim
+tasks with a lease, run the analyzer and write the results back. Tasks whose lease expired
+(e.g. because the worker died) are claimed again by the next worker.
+
+The queue is an SQLite database, which can be shared between hosts through a network file
+system. Since tasks are identified by the content they analyze, projects that share files
+(e.g. forks of the same repository) also share the tasks and results.
+"""
+
+def get_task_key(blob_sha,analyzer_name,settings_hash):
+    return hashlib.sha1(json.dumps([blob_sha,analyzer_name,settings_hash])
+                        .encode('utf-8')).hexdigest()
+
+def get_worker_name():
+    return "%s:%d" % (socket.gethostname(),os.getpid())
+
+class WorkQueue(object):
+
+    def __init__(self,path,lease_time = 300,max_attempts = 3,timeout = 60):
+        self.path = os.path.abspath(path)
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._local = threading.local()
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS tasks (
+                                    key TEXT PRIMARY KEY,
+                                    analyzer TEXT,
+                                    settings_hash TEXT,
+                                    state TEXT,
+                                    owner TEXT,
+                                    lease_expires REAL,
+                                    attempts INTEGER DEFAULT 0,
+                                    data BLOB,
+                                    results TEXT,
+                                    updated_at REAL)""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state,lease_expires)")
+
+    @property
+    def connection(self):
+        #SQLite connections can't be shared between threads
+        if not hasattr(self._local,'connection'):
+            #we manage transactions ourselves
+            self._local.connection = sqlite3.connect(self.path,timeout = self.timeout,
+                                                     isolation_level = None)
+        return self._local.connection
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Runs the enclosed statements in a transaction that locks the database for writing,
+        so that e.g. no two workers can claim the same task.
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.connection
+        except:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def submit(self,tasks):
+        """
+        Adds (key,analyzer name,settings hash,data) tasks to the queue. Tasks that are
+        already in the queue (with the same key) are not added again, unless they failed.
+        """
+        now = time.time()
+        rows = [(key,analyzer_name,settings_hash,
+                 sqlite3.Binary(zlib.compress(json.dumps(data).encode('utf-8'))),now)
+                for key,analyzer_name,settings_hash,data in tasks]
+        with self.transaction() as connection:
+            #failed tasks are queued again, as the failure might have been temporary
+            connection.executemany("""INSERT INTO tasks
+                                      (key,analyzer,settings_hash,state,data,updated_at)
+                                      VALUES (?,?,?,'queued',?,?)
+                                      ON CONFLICT (key) DO UPDATE SET
+                                      state = 'queued',attempts = 0,data = excluded.data,
+                                      updated_at = excluded.updated_at
+                                      WHERE state = 'failed'""",rows)
+
+    def claim(self,owner,keys = None,analyzers = None):
+        """
+        Claims the next task that is queued or whose lease expired and returns its key,
+        analyzer name, settings hash and data (or `None` if there is no such task).
+
+        Tasks whose lease expired `max_attempts` times are marked as failed.
+        """
+        now = time.time()
+        conditions = ["(state = 'queued' OR (state = 'leased' AND lease_expires < ?))"]
+        params = [now]
+        if keys is not None:
+            conditions.append("key IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(keys)))
+        if analyzers is not None:
+            conditions.append("analyzer IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(analyzers)))
+        with self.transaction() as connection:
+            while True:
+                row = connection.execute("SELECT key,analyzer,settings_hash,data,attempts FROM tasks "
+                                         "WHERE %s ORDER BY updated_at LIMIT 1" % " AND ".join(conditions),
+                                         params).fetchone()
+                if row is None:
+                    return None
+                key,analyzer_name,settings_hash,data,attempts = row
+                if attempts >= self.max_attempts:
+                    logger.warning("Task %s (%s) failed %d times, giving up" % (key,analyzer_name,attempts))
+                    connection.execute("UPDATE tasks SET state = 'failed',data = NULL,updated_at = ? "
+                                       "WHERE key = ?",(now,key))
+                    continue
+                connection.execute("UPDATE tasks SET state = 'leased',owner = ?,lease_expires = ?,"
+                                   "attempts = attempts+1,updated_at = ? WHERE key = ?",
+                                   (owner,now+self.lease_time,now,key))
+                return key,analyzer_name,settings_hash,json.loads(zlib.decompress(data).decode('utf-8'))
+
+    def renew(self,key,owner):
+        """
+        Extends the lease of a task that is still held by the given owner.
+        """
+        self.connection.execute("UPDATE tasks SET lease_expires = ? WHERE key = ? AND owner = ? "
+                                "AND state = 'leased'",(time.time()+self.lease_time,key,owner))
+
+    def complete(self,key,results,state = 'done'):
+        """
+        Stores the results of a task. If several workers ran the same task (because a lease
+        expired), the first results are kept.
+        """
+        self.connection.execute("UPDATE tasks SET state = ?,results = ?,data = NULL,updated_at = ? "
+                                "WHERE key = ? AND state NOT IN ('done','failed')",
+                                (state,json.dumps(results),time.time(),key))
+
+    def fail(self,key,error):
+        self.complete(key,{'error' : error},state = 'failed')
+
+    def get_results(self,keys):
+        """
+        Returns a dictionary with the state and results of all given tasks that are done
+        or failed.
+        """
+        results = {}
+        for key,state,task_results in self.connection.execute(
+                "SELECT key,state,results FROM tasks WHERE state IN ('done','failed') "
+                "AND key IN (SELECT value FROM json_each(?))",(json.dumps(list(keys)),)):
+            results[key] = (state,json.loads(task_results) if task_results else None)
+        return results
+
+    def get_counts(self):
+        return dict(self.connection.execute("SELECT state,count(*) FROM tasks GROUP BY state"))
+
+    def purge(self,max_age):
+        """
+        Removes finished tasks that were last updated more than `max_age` seconds ago.
+        """
+        cursor = self.connection.execute("DELETE FROM tasks WHERE state IN ('done','failed') "
+                                         "AND updated_at < ?",(time.time()-max_age,))
+        return cursor.rowcount
+
+class AnalysisWorker(object):
+
+    """
+    Claims tasks from a work queue and runs them with a code environment for the settings
+    of each task. Code environments (and their initialized analyzers) are kept between tasks.
+    """
+
+    def __init__(self,queue,name = None,code_environment = None):
+        self.queue = queue
+        self.name = name or get_worker_name()
+        self.code_environments = {}
+        if code_environment is not None:
+            self.code_environments[code_environment.settings_hash] = code_environment
+
+    def get_code_environment(self,settings_hash,settings):
+        from checkmate.lib.code.environment import CodeEnvironment
+        if not settings_hash in self.code_environments:
+            self.code_environments[settings_hash] = CodeEnvironment([],settings = settings)
+        return self.code_environments[settings_hash]
+
+    def run_task(self,key,analyzer_name,settings_hash,data):
+        code_environment = self.get_code_environment(settings_hash,data['settings'])
+        if code_environment.settings_hash != settings_hash:
+            #the analyzers on this host differ from the ones of the coordinator
+            self.queue.fail(key,"The analyzers of worker %s don't match the settings hash." %
+                            self.name)
+            return
+        if not analyzer_name in code_environment.analyzers:
+            self.queue.fail(key,"Analyzer %s is not available on worker %s." % (analyzer_name,
+                                                                               self.name))
+            return
+        file_revision = MockFileRevision({'path' : data['path'],
+                                          'language' : data['language'],
+                                          'sha' : data['sha'],
+                                          'code' : data['code'].encode('latin-1')})
+        stop = threading.Event()
+        def renew_lease():
+            while not stop.wait(self.queue.lease_time/3.0):
+                self.queue.renew(key,self.name)
+        heartbeat = threading.Thread(target = renew_lease)
+        heartbeat.daemon = True
+        heartbeat.start()
+        try:
+            results = code_environment.analyze_file_revision(file_revision,
+                {analyzer_name : code_environment.analyzers[analyzer_name]})
+        except Exception:
+            self.queue.fail(key,traceback.format_exc())
+            return
+        finally:
+            stop.set()
+            heartbeat.join()
+        self.queue.complete(key,results)
+
+    def work(self,keys = None,analyzers = None):
+        """
+        Claims and runs a single task. Returns `False` if there was no task to run.
+        """
+        task = self.queue.claim(self.name,keys = keys,analyzers = analyzers)
+        if task is None:
+            return False
+        logger.info("Running %s on %s" % (task[1],task[3]['path']))
+        self.run_task(*task)
+        return True
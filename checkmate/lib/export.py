@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import csv
+import json
+import six
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+Writers that export records (dictionaries) one by one to a binary output stream, so that
+exports of any size can be written with constant memory.
+"""
+
+def to_json(value):
+    return json.dumps(value,sort_keys = True,default = six.text_type)
+
+class BaseWriter(object):
+
+    def __init__(self,output,fields = None):
+        self.output = output
+        self.fields = fields
+
+    def write(self,record):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class JSONLWriter(BaseWriter):
+
+    """
+    Writes one JSON document per line.
+    """
+
+    def write(self,record):
+        self.output.write(to_json(record).encode('utf-8'))
+        self.output.write(b"\n")
+
+class CSVWriter(BaseWriter):
+
+    """
+    Writes the given `fields` of each record as a CSV row. Values that are not
+    strings or numbers are written as JSON.
+    """
+
+    def __init__(self,output,fields = None):
+        super(CSVWriter,self).__init__(output,fields)
+        self.writer = None
+
+    def encode(self,value):
+        if value is None:
+            return b''
+        if isinstance(value,(list,tuple,dict)):
+            value = to_json(value)
+        return six.text_type(value).encode('utf-8')
+
+    def write(self,record):
+        if self.writer is None:
+            if self.fields is None:
+                self.fields = sorted(record.keys())
+            self.writer = csv.writer(self.output)
+            self.writer.writerow([self.encode(field) for field in self.fields])
+        self.writer.writerow([self.encode(record.get(field)) for field in self.fields])
+
+class SARIFWriter(BaseWriter):
+
+    """
+    Writes issue records as a SARIF 2.1.0 log with a single run.
+
+    The results are streamed as they come. The rules of the tool are written after
+    them, which is valid since the order of keys in a JSON object is not significant.
+    """
+
+    schema = "https://json.schemastore.org/sarif-2.1.0.json"
+
+    #maps the severity of an issue (1 = most severe) to a SARIF level
+    levels = {1 : 'error',2 : 'warning'}
+
+    def __init__(self,output,fields = None):
+        super(SARIFWriter,self).__init__(output,fields)
+        self.rules = {}
+        self.n_results = 0
+        self.output.write(('{"$schema": %s, "version": "2.1.0", "runs": [{"results": [' %
+                           to_json(self.schema)).encode('utf-8'))
+
+    def write(self,record):
+        rule_id = "%s/%s" % (record['analyzer'],record['code'])
+        if not rule_id in self.rules:
+            self.rules[rule_id] = {
+                'id' : rule_id,
+                'name' : record['code'],
+                'shortDescription' : {'text' : record.get('title') or record['code']},
+            }
+        result = {
+            'ruleId' : rule_id,
+            'level' : self.levels.get(record.get('severity'),'note'),
+            'message' : {'text' : record.get('message') or record.get('title') or rule_id},
+            'locations' : [{
+                'physicalLocation' : {
+                    'artifactLocation' : {'uri' : record['path']},
+                }
+            }],
+        }
+        if record.get('line'):
+            region = {'startLine' : record['line']}
+            if record.get('column') is not None:
+                #SARIF columns are 1-based
+                region['startColumn'] = record['column']+1
+            if record.get('end_line'):
+                region['endLine'] = max(record['end_line'],record['line'])
+            result['locations'][0]['physicalLocation']['region'] = region
+        if record.get('fingerprint'):
+            result['partialFingerprints'] = {'checkmate/v1' : record['fingerprint']}
+        if self.n_results:
+            self.output.write(b",")
+        self.output.write(to_json(result).encode('utf-8'))
+        self.n_results += 1
+
+    def close(self):
+        tool = {'driver' : {'name' : 'checkmate',
+                            'informationUri' : 'https://github.com/quantifiedcode/checkmate',
+                            'rules' : [self.rules[rule_id] for rule_id in sorted(self.rules)]}}
+        self.output.write(('], "tool": %s}]}\n' % to_json(tool)).encode('utf-8'))
+
+writers = {
+    'jsonl' : JSONLWriter,
+    'csv' : CSVWriter,
+    'sarif' : SARIFWriter,
+}
+
+def flatten(value,prefix = ''):
+    """
+    Yields (dotted key,value) pairs for all scalar values in a nested dictionary.
+    """
+    if isinstance(value,dict):
+        for key in sorted(value.keys()):
+            for item in flatten(value[key],prefix+"."+six.text_type(key) if prefix
+                                           else six.text_type(key)):
+                yield item
+    else:
+        yield prefix,value
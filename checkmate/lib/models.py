@@ -29,6 +29,8 @@ import datetime
 import logging
 
 from checkmate.helpers.checkmate import parse_checkmate_settings
+from checkmate.lib.analysis.occurences import decode_occurences
+from checkmate.helpers.content import read_file_buffer,get_bytes
 
 logger = logging.getLogger(__name__)
 
@@ -63,7 +65,25 @@ class Issue(BaseDocument):
     An `Issue` object represents an issue or problem with the code. 
     It can be associated with one or multiple file revisions, code objects etc.
     """
-    pass
+
+    def get_occurences(self):
+        """
+        Returns the occurences of the issue, decoding them if they are stored in
+        compact form (see `checkmate.lib.analysis.occurences`).
+        """
+        if not 'occurences' in self:
+            return []
+        return decode_occurences(self.occurences)
+
+def get_analysis_pk(file_revision):
+    """
+    Returns the primary key of the file revision that holds the analysis results and issues
+    for the given one. File revisions with content that was already analyzed (e.g. the same
+    blob at another path) reuse that analysis instead of storing their own copy.
+    """
+    if 'analysis_pk' in file_revision:
+        return file_revision.analysis_pk
+    return file_revision.pk
 
 class Summary(BaseDocument):
     """
@@ -71,23 +91,89 @@ class Summary(BaseDocument):
     """
     pass
 
-class MockFileRevision(BaseDocument):
+class Trend(BaseDocument):
+    """
+    Time series of the statistics of a directory across the snapshots of a project
+    (see `checkmate.lib.stats.trends`).
+    """
+
+    class Meta(Document.Meta):
+        dbref_includes = ['directory']
+
+class StatsIndex(BaseDocument):
+    """
+    Index of the per-directory statistics of a snapshot (see `checkmate.lib.stats.index`).
+    """
+
+    class Meta(Document.Meta):
+        collection = "stats_index"
+
+class FileContentMixin(object):
+
+    """
+    Content access for file revisions, which implement `read_content_buffer`.
+
+    `get_content_buffer` returns a read-only buffer (large files are memory-mapped). While
+    a file revision is held (e.g. during its analysis), all callers share the same buffer
+    instead of reading the content again. `get_file_content` returns a bytes copy.
+    """
+
+    def get_content_buffer(self):
+        content = getattr(self,'_content_buffer',None)
+        if content is not None:
+            return content
+        return self.read_content_buffer()
 
     def get_file_content(self):
+        return get_bytes(self.get_content_buffer())
+
+    def get_content_size(self):
+        return len(self.get_content_buffer())
+
+    @classmethod
+    def prefetch_content_sizes(cls,file_revisions):
+        """
+        Makes `get_content_size` fast for the given file revisions (e.g. by fetching the
+        sizes of all of them at once).
+        """
+        pass
+
+    @classmethod
+    def prefetch_contents(cls,file_revisions,max_size = None):
+        """
+        Makes `get_content_buffer` fast for the given file revisions that are not larger
+        than `max_size` (e.g. by reading all of them at once).
+        """
+        pass
+
+    def hold_content(self):
+        self._content_buffer = self.get_content_buffer()
+
+    def release_content(self):
+        #memory maps get closed when the last reference to them is gone
+        self._content_buffer = None
+
+class MockFileRevision(FileContentMixin,BaseDocument):
+
+    def read_content_buffer(self):
         return self.code
 
-class DiskFileRevision(BaseDocument):
+class DiskFileRevision(FileContentMixin,BaseDocument):
 
     class Meta(Document.Meta):
         dbref_includes = ['path','language']
         collection = "disk_file_revision"
 
-    def get_file_content(self):
+    def get_content_size(self):
+        if 'file_stats' in self and 'size' in self.file_stats:
+            return self.file_stats['size']
+        return super(DiskFileRevision,self).get_content_size()
+
+    def read_content_buffer(self):
         project_path = self.project.eager.path
         file_path = os.path.join(project_path,self.path)
         if os.path.exists(file_path) and os.path.isfile(file_path):
-            with open(file_path,"rb") as input_file:
-                return input_file.read()
+            return read_file_buffer(file_path)
         else:
             raise IOError("File does not exist: %s" % file_path)
 
@@ -105,6 +191,10 @@ class DiskSnapshot(BaseDocument):
 
         pass
 
+    def get_file_revisions(self,backend):
+        file_revisions = list(backend.filter(self.FileRevision,{'pk' : {'$in' : self.file_revisions}}))
+        return file_revisions
+
     def get_diffs(self,my_file_revisions,other_file_revisions = None):
         if not other_file_revisions:
             return [('A',fr.path) for fr in my_file_revisions]
@@ -129,9 +219,12 @@ class DiskSnapshot(BaseDocument):
 class DiskProject(BaseDocument):
 
     DiskSnapshot = DiskSnapshot
+    Snapshot = DiskSnapshot
     CodeObject = CodeObject
     Summary = Summary
     Issue = Issue
+    Trend = Trend
+    StatsIndex = StatsIndex
 
     class Meta(Document.Meta):
         collection = "project"
@@ -186,27 +279,36 @@ class DiskProject(BaseDocument):
 
         file_revisions = []
         for filename in all_filenames:
-            file_revision = self.DiskSnapshot.FileRevision()
-            file_path = os.path.join(self.path,filename)
-            try:
-                file_revision.file_stats = dict(zip(('mode',
-                                                     'inode',
-                                                     'device',
-                                                     'nlink',
-                                                     'uid',
-                                                     'gid',
-                                                     'size',
-                                                     'atime',
-                                                     'mtime',
-                                                     'ctime')
-                                                    ,os.stat(file_path)))
-            except:
-                logger.warning("Cannot stat %s, skipping..." % file_path)
-                continue
-            file_revision.path = filename.decode("utf-8")
-            file_revision.fr_pk = file_revision.path+u":"+u"%d" % file_revision.file_stats['mtime']
-            file_revision.pk = uuid.uuid4().hex
-            file_revision.project = self
-            file_revisions.append(file_revision)
+            file_revision = self.get_disk_file_revision(filename)
+            if file_revision is not None:
+                file_revisions.append(file_revision)
 
         return file_revisions
+
+    def get_disk_file_revision(self,filename):
+        """
+        Returns a file revision for the given path (relative to the project path),
+        or `None` if the file cannot be accessed.
+        """
+        file_revision = self.DiskSnapshot.FileRevision()
+        file_path = os.path.join(self.path,filename)
+        try:
+            file_revision.file_stats = dict(zip(('mode',
+                                                 'inode',
+                                                 'device',
+                                                 'nlink',
+                                                 'uid',
+                                                 'gid',
+                                                 'size',
+                                                 'atime',
+                                                 'mtime',
+                                                 'ctime')
+                                                ,os.stat(file_path)))
+        except:
+            logger.warning("Cannot stat %s, skipping..." % file_path)
+            return None
+        file_revision.path = filename.decode("utf-8") if isinstance(filename,bytes) else filename
+        file_revision.fr_pk = file_revision.path+u":"+u"%d" % file_revision.file_stats['mtime']
+        file_revision.pk = uuid.uuid4().hex
+        file_revision.project = self
+        return file_revision
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+import os
+import errno
+import socket
+import logging
+import traceback
+
+from checkmate.helpers.ipc import send_message,receive_message
+
+logger = logging.getLogger(__name__)
+
+class ServerError(Exception):
+    pass
+
+class RequestServer(object):
+
+    """
+    Answers requests on a Unix socket (see `checkmate.helpers.ipc` for the protocol).
+
+    Each request is passed to the handler for its `command`, which returns a dictionary
+    with the results. Requests are answered one after the other, so handlers don't need
+    to be thread-safe. A handler can stop the server by calling `stop`.
+
+    Since a client blocks all others while it is connected, clients that don't send their
+    request (or read the response) within `connection_timeout` seconds are dropped.
+    """
+
+    def __init__(self,socket_path,handlers,idle_timeout = None,connection_timeout = 5.0):
+        self.socket_path = socket_path
+        self.handlers = handlers
+        self.idle_timeout = idle_timeout
+        self.connection_timeout = connection_timeout
+        self.n_requests = 0
+        self._socket = None
+        self._stopped = False
+
+    def bind(self):
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except socket.error:
+                #a server that didn't shut down cleanly left its socket behind
+                os.remove(self.socket_path)
+            else:
+                raise ServerError("Another server is listening on %s" % self.socket_path)
+            finally:
+                probe.close()
+        self._socket = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+        #only the user who started the server may connect to it
+        old_umask = os.umask(0o077)
+        try:
+            self._socket.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        self._socket.listen(16)
+        self._socket.settimeout(self.idle_timeout)
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+
+    def stop(self):
+        self._stopped = True
+
+    def serve(self):
+        """
+        Answers requests until `stop` is called or no request arrived for `idle_timeout`
+        seconds.
+        """
+        if self._socket is None:
+            self.bind()
+        try:
+            while not self._stopped:
+                try:
+                    connection,address = self._socket.accept()
+                except socket.timeout:
+                    logger.info("No requests for %d seconds, stopping" % self.idle_timeout)
+                    break
+                except socket.error as e:
+                    if e.errno == errno.EINTR:
+                        continue
+                    raise
+                try:
+                    #the listening socket's timeout is inherited on some platforms
+                    connection.settimeout(self.connection_timeout)
+                    self.handle_connection(connection)
+                finally:
+                    connection.close()
+        finally:
+            self.close()
+
+    def handle_connection(self,connection):
+        try:
+            request = receive_message(connection)
+        except socket.timeout:
+            logger.warning("No request received within %s seconds, dropping the client" %
+                           self.connection_timeout)
+            return
+        except (ValueError,socket.error) as e:
+            logger.warning("Invalid request: %s" % e)
+            return
+        if request is None:
+            return
+        self.n_requests += 1
+        response = self.handle_request(request)
+        try:
+            send_message(connection,response)
+        except socket.timeout:
+            logger.warning("The client did not read the response within %s seconds, "
+                           "dropping it" % self.connection_timeout)
+        except socket.error as e:
+            #the client went away
+            logger.warning("Cannot send response: %s" % e)
+
+    def handle_request(self,request):
+        command = request.get('command') if isinstance(request,dict) else None
+        if not command in self.handlers:
+            return {'status' : 'error','error' : "Unknown command: %s" % command}
+        kwargs = dict([(str(key),value) for key,value in request.items() if key != 'command'])
+        try:
+            results = self.handlers[command](**kwargs)
+        except ServerError as e:
+            return {'status' : 'error','error' : "%s" % e}
+        except Exception as e:
+            logger.error(traceback.format_exc())
+            return {'status' : 'error','error' : "%s: %s" % (e.__class__.__name__,e)}
+        response = {'status' : 'ok'}
+        if results:
+            response.update(results)
+        return response
@@ -20,6 +20,8 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import unicode_literals
 
+import math
+
 def directory_splitter(path,include_filename = False):
     if include_filename:
         path_hierarchy = path.split("/")
@@ -36,3 +38,13 @@ def directory_splitter(path,include_filename = False):
         current_path+=partial_path
     paths.append(current_path)
     return paths
+
+def percentile(values,p):
+    """
+    Returns the `p`-th percentile (0-100) of a list of values, using the nearest-rank method.
+    """
+    if not values:
+        return None
+    sorted_values = sorted(values)
+    rank = int(math.ceil(p/100.0*len(sorted_values)))
+    return sorted_values[max(0,rank-1)]
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import bisect
+import logging
+
+from checkmate.lib.stats.trends import get_snapshot_scalars,get_directory_depth
+
+logger = logging.getLogger(__name__)
+
+"""
+A columnar index of the per-directory statistics of a snapshot:
+
+    directories : ['','src','src/core',...]          (sorted)
+    columns     : {'issues' : [...],'metrics.total_number_of_lines' : [...],...}
+
+Since the directory aggregator summarizes each directory together with all its
+subdirectories, the statistics of a subtree are a single row, and the directories
+below it are a contiguous range of the sorted list that we find by bisection.
+"""
+
+def build_stats_index(snapshot):
+    """
+    Returns the directories and columns of the index for the given (analyzed) snapshot.
+    """
+    scalars = get_snapshot_scalars(snapshot)
+    directories = sorted(scalars.keys())
+    names = set()
+    for values in scalars.values():
+        names.update(values.keys())
+    columns = dict([(name,[scalars[directory].get(name) for directory in directories])
+                    for name in names])
+    return {'directories' : directories,'columns' : columns}
+
+def get_row(index,directory):
+    """
+    Returns the position of a directory in the index, or None.
+    """
+    directories = index['directories']
+    i = bisect.bisect_left(directories,directory)
+    if i < len(directories) and directories[i] == directory:
+        return i
+    return None
+
+def get_subtree_range(index,directory):
+    """
+    Returns the (start,stop) positions of all directories below the given one.
+    """
+    directories = index['directories']
+    if directory == '':
+        return (1 if directories and directories[0] == '' else 0),len(directories)
+    #'0' is the character following '/'
+    return (bisect.bisect_left(directories,directory+'/'),
+            bisect.bisect_left(directories,directory+'0'))
+
+def get_subtree(index,directory,max_depth = None):
+    """
+    Returns the positions of the directories below the given one, down to `max_depth`
+    levels below it.
+    """
+    start,stop = get_subtree_range(index,directory)
+    if max_depth is None:
+        return range(start,stop)
+    depth = get_directory_depth(directory)+max_depth
+    directories = index['directories']
+    return [i for i in range(start,stop) if get_directory_depth(directories[i]) <= depth]
+
+def get_top(index,column,directory = '',n = 10,max_depth = None):
+    """
+    Returns the positions of the `n` directories below the given one with the highest
+    values in the given column.
+    """
+    values = index['columns'].get(column)
+    if values is None:
+        return []
+    rows = [i for i in get_subtree(index,directory,max_depth) if values[i] is not None]
+    return sorted(rows,key = lambda i:-values[i])[:n]
+
+def match_columns(index,patterns):
+    """
+    Returns the columns that match the given patterns. A pattern matches a column if it
+    is equal to it or a prefix of it (e.g. `metrics` matches `metrics.number_of_files`).
+    Patterns of the form `language:analyzer` are accepted for compatibility.
+    """
+    columns = sorted(index['columns'].keys())
+    if not patterns:
+        return columns
+    matched = []
+    for pattern in patterns:
+        if ':' in pattern:
+            pattern = pattern.split(':',1)[1]
+        for column in columns:
+            if (column == pattern or column.startswith(pattern+'.')) and not column in matched:
+                matched.append(column)
+    return matched
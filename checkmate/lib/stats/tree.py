@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+The summary of a snapshot as a tree of directories, e.g. for the keys '', 'src' and
+'src/core':
+
+    '' -> 'src' -> 'core'
+
+Each path segment is stored once, instead of once per key and analyzer as in the nested
+dictionaries {language : {analyzer : {key : summary}}} of older versions. The names of the
+statistics are stored once per (language,analyzer) column as well: each column has a table
+of names, and each node stores the values of a summary as a tuple in the order of this table.
+A value that is not a dictionary is stored under the name `None` (missing statistics and
+statistics with the value `None` are not stored).
+
+Serialized, the nodes are a flat list in depth-first order, where each node gives its depth,
+its path segment and the value tuples of all columns:
+
+    {'format' : 'tree',
+     'columns' : [['python','pylint'],['python','metrics'],...],
+     'keys' : [['n_errors','n_warnings'],['number_of_files',...],...],
+     'nodes' : [[0,'',[[3,5],[12,...]]],[1,'src',[...]],[2,'core',[...]],...]}
+"""
+
+#path segments are shared between all trees
+_segments = {}
+
+def intern_segment(segment):
+    return _segments.setdefault(segment,segment)
+
+class SummaryNode(object):
+
+    __slots__ = ('segment','children','values')
+
+    def __init__(self,segment):
+        self.segment = segment
+        self.children = None
+        self.values = None
+
+    def get_child(self,segment,create = False):
+        if self.children is None:
+            if not create:
+                return None
+            self.children = {}
+        child = self.children.get(segment)
+        if child is None and create:
+            segment = intern_segment(segment)
+            child = self.children[segment] = SummaryNode(segment)
+        return child
+
+    def get_value(self,i):
+        if self.values is None or i >= len(self.values):
+            return None
+        return self.values[i]
+
+    def set_value(self,i,value):
+        if self.values is None:
+            self.values = []
+        if i >= len(self.values):
+            self.values.extend([None]*(i+1-len(self.values)))
+        self.values[i] = value
+
+class SummaryTree(object):
+
+    """
+    Stores a summary for each (language,analyzer,key) with '/'-separated keys.
+    """
+
+    __slots__ = ('columns','column_index','keys','key_indexes','root')
+
+    def __init__(self):
+        self.columns = []
+        self.column_index = {}
+        #the names of the statistics of each column
+        self.keys = []
+        self.key_indexes = []
+        self.root = SummaryNode('')
+
+    @classmethod
+    def load(cls,summary):
+        """
+        Returns the tree for a (serialized or nested dictionary) summary of a snapshot.
+        """
+        if isinstance(summary,SummaryTree):
+            return summary
+        if summary and summary.get('format') == 'tree':
+            return cls.deserialize(summary)
+        return cls.from_dict(summary or {})
+
+    @classmethod
+    def from_dict(cls,summary):
+        tree = cls()
+        for language,analyzers in summary.items():
+            for analyzer_name,keys in analyzers.items():
+                if not isinstance(keys,dict):
+                    continue
+                for key,value in keys.items():
+                    tree.set(language,analyzer_name,key,value)
+        return tree
+
+    def to_dict(self):
+        summary = {}
+        for key,node in self.items():
+            for (language,analyzer_name),value in self.get_node_values(node):
+                summary.setdefault(language,{}).setdefault(analyzer_name,{})[key] = value
+        return summary
+
+    def get_column(self,language,analyzer_name,create = False):
+        column = (language,analyzer_name)
+        if not column in self.column_index and create:
+            self.column_index[column] = len(self.columns)
+            self.columns.append(column)
+            self.keys.append([])
+            self.key_indexes.append({})
+        return self.column_index.get(column)
+
+    def get_key_index(self,i,name):
+        key_index = self.key_indexes[i]
+        if not name in key_index:
+            key_index[name] = len(self.keys[i])
+            self.keys[i].append(name)
+        return key_index[name]
+
+    def encode_value(self,i,value):
+        """
+        Returns the values of a summary as a tuple in the order of the names of column `i`.
+        """
+        if value is None:
+            return None
+        if not isinstance(value,dict):
+            value = {None : value}
+        indexes = [(self.get_key_index(i,name),v) for name,v in value.items() if v is not None]
+        row = [None]*(max([j for j,v in indexes])+1 if indexes else 0)
+        for j,v in indexes:
+            row[j] = v
+        return tuple(row)
+
+    def decode_value(self,i,row):
+        if row is None:
+            return None
+        value = dict([(name,v) for name,v in zip(self.keys[i],row) if v is not None])
+        if None in value:
+            return value[None]
+        return value
+
+    def get_node(self,key,create = False):
+        node = self.root
+        if key == '':
+            return node
+        for segment in key.split('/'):
+            node = node.get_child(segment,create = create)
+            if node is None:
+                return None
+        return node
+
+    def get_node_values(self,node):
+        """
+        Returns the ((language,analyzer),summary) pairs of all columns that have a value
+        for the given node.
+        """
+        values = []
+        for i,row in enumerate(node.values or []):
+            if row is not None:
+                values.append((self.columns[i],self.decode_value(i,row)))
+        return values
+
+    def get(self,language,analyzer_name,key):
+        i = self.get_column(language,analyzer_name)
+        node = self.get_node(key)
+        if i is None or node is None:
+            return None
+        return self.decode_value(i,node.get_value(i))
+
+    def set(self,language,analyzer_name,key,value):
+        i = self.get_column(language,analyzer_name,create = True)
+        self.get_node(key,create = True).set_value(i,self.encode_value(i,value))
+
+    def items(self):
+        """
+        Yields the (key,node) pairs of all nodes that have values, in depth-first order.
+        """
+        stack = [('',self.root)]
+        while stack:
+            key,node = stack.pop()
+            if node.values:
+                yield key,node
+            if node.children:
+                for segment,child in sorted(node.children.items(),reverse = True):
+                    stack.append((key+'/'+segment if key else segment,child))
+
+    def get_values(self,language,analyzer_name):
+        """
+        Returns a {key : summary} dictionary for the given language and analyzer.
+        """
+        i = self.get_column(language,analyzer_name)
+        if i is None:
+            return {}
+        return dict([(key,self.decode_value(i,node.get_value(i))) for key,node in self.items()
+                     if node.get_value(i) is not None])
+
+    def get_analyzers(self):
+        """
+        Returns a {language : [analyzer name,...]} dictionary.
+        """
+        analyzers = {}
+        for language,analyzer_name in self.columns:
+            analyzers.setdefault(language,[]).append(analyzer_name)
+        return analyzers
+
+    def delete(self,keys):
+        """
+        Removes the values of the given keys (nodes that are still needed for other keys
+        are kept).
+        """
+        for key in keys:
+            node = self.get_node(key)
+            if node is not None:
+                node.values = None
+
+    def update(self,other):
+        """
+        Sets all values of another tree in this one.
+        """
+        for key,node in other.items():
+            for (language,analyzer_name),value in other.get_node_values(node):
+                self.set(language,analyzer_name,key,value)
+
+    def rollup(self,language,analyzer_name,merge):
+        """
+        Calculates the value of each node that has none from the values of its children,
+        using `merge(values)` (e.g. `sum` for counts). Returns the value of the root.
+        """
+        i = self.get_column(language,analyzer_name,create = True)
+
+        def rollup_node(node):
+            value = self.decode_value(i,node.get_value(i))
+            if value is not None:
+                return value
+            values = [rollup_node(child) for child in (node.children or {}).values()]
+            values = [value for value in values if value is not None]
+            if not values:
+                return None
+            value = merge(values)
+            node.set_value(i,self.encode_value(i,value))
+            return value
+
+        return rollup_node(self.root)
+
+    def serialize(self):
+        nodes = []
+        stack = [(0,self.root)]
+        while stack:
+            depth,node = stack.pop()
+            values = [list(row) if row is not None else None for row in node.values or []]
+            while values and values[-1] is None:
+                values.pop()
+            nodes.append([depth,node.segment,values])
+            if node.children:
+                for segment,child in sorted(node.children.items(),reverse = True):
+                    stack.append((depth+1,child))
+        return {'format' : 'tree',
+                'columns' : [list(column) for column in self.columns],
+                'keys' : [list(keys) for keys in self.keys],
+                'nodes' : nodes}
+
+    @classmethod
+    def deserialize(cls,data):
+        tree = cls()
+        for language,analyzer_name in data['columns']:
+            tree.get_column(language,analyzer_name,create = True)
+        #trees of older versions store the summaries as dictionaries
+        keys = data.get('keys')
+        if keys is not None:
+            for i,names in enumerate(keys):
+                for name in names:
+                    tree.get_key_index(i,name)
+        #the path from the root to the current node
+        path = []
+        for depth,segment,values in data['nodes']:
+            if depth == 0:
+                node = tree.root
+            else:
+                node = path[depth-1].get_child(segment,create = True)
+            del path[depth:]
+            path.append(node)
+            if not values:
+                continue
+            if keys is not None:
+                node.values = [tuple(row) if row is not None else None for row in values]
+            else:
+                for i,value in enumerate(values):
+                    node.set_value(i,tree.encode_value(i,value))
+        return tree
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import time
+import bisect
+import hashlib
+import datetime
+import numbers
+import logging
+
+from collections import defaultdict
+
+from checkmate.lib.stats.tree import SummaryTree
+
+logger = logging.getLogger(__name__)
+
+"""
+Time series of snapshot statistics, rolled up per directory when a snapshot is analyzed.
+
+Each `Trend` document holds the series of one directory as parallel arrays:
+
+    timestamps : [t0,t1,...]               (sorted)
+    snapshots  : [pk0,pk1,...]
+    series     : {'issues' : [12,10,...],
+                  'issues.pylint' : [...],
+                  'issues.pylint.C0301' : [...],
+                  'metrics.total_number_of_lines' : [...],
+                  'pylint.average_global_note' : [...],
+                  ...}
+
+so that the trend of a directory over any time range can be read from a single document.
+"""
+
+#summary entries that are not statistics of the code
+ignored_summary_keys = set(['analysis_time'])
+
+def get_snapshot_timestamp(snapshot):
+    if 'committer_date_ts' in snapshot:
+        return snapshot.committer_date_ts
+    created_at = snapshot.get('created_at')
+    if isinstance(created_at,datetime.datetime):
+        return time.mktime(created_at.timetuple())
+    if created_at is not None:
+        return created_at
+    return time.time()
+
+def get_directory_depth(directory):
+    return len(directory.split("/")) if directory else 0
+
+def get_snapshot_scalars(snapshot,max_depth = None):
+    """
+    Returns {directory : {series name : value}} for the given (analyzed) snapshot, based on
+    its `issues_summary` and `summary`.
+    """
+    scalars = defaultdict(lambda : defaultdict(int))
+
+    def include(directory):
+        return max_depth is None or get_directory_depth(directory) <= max_depth
+
+    for directory,languages in snapshot.get('issues_summary',{}).items():
+        if not include(directory):
+            continue
+        values = scalars[directory]
+        values['issues'] += 0
+        for language,analyzers in languages.items():
+            for analyzer_name,codes in analyzers.items():
+                for code,count in codes.items():
+                    values['issues'] += count
+                    values['issues.'+analyzer_name] += count
+                    values['issues.'+analyzer_name+'.'+code] += count
+
+    summary_tree = SummaryTree.load(snapshot.get('summary'))
+    for directory,node in summary_tree.items():
+        if not include(directory):
+            continue
+        for (language,analyzer_name),summary in summary_tree.get_node_values(node):
+            if analyzer_name in ignored_summary_keys or not isinstance(summary,dict):
+                continue
+            for key,value in summary.items():
+                if isinstance(value,numbers.Number) and not isinstance(value,bool):
+                    scalars[directory][analyzer_name+'.'+key] += value
+
+    return dict([(directory,dict(values)) for directory,values in scalars.items()])
+
+def add_point(trend,timestamp,snapshot_pk,values):
+    """
+    Adds the values of a snapshot to the series of a trend, keeping them sorted by time.
+    The values of a snapshot that is already part of the trend are replaced.
+    """
+    if snapshot_pk in trend.snapshots:
+        i = trend.snapshots.index(snapshot_pk)
+        for series in trend.series.values():
+            series[i] = None
+    else:
+        i = bisect.bisect_right(trend.timestamps,timestamp)
+        trend.timestamps.insert(i,timestamp)
+        trend.snapshots.insert(i,snapshot_pk)
+        for series in trend.series.values():
+            series.insert(i,None)
+    for name,value in values.items():
+        if not name in trend.series:
+            trend.series[name] = [None]*len(trend.timestamps)
+        trend.series[name][i] = value
+
+def get_range(trend,start = None,end = None):
+    """
+    Returns the (start,stop) indexes of the points of the trend between `start` and `end`
+    (inclusive), found by bisection.
+    """
+    i = bisect.bisect_left(trend.timestamps,start) if start is not None else 0
+    j = bisect.bisect_right(trend.timestamps,end) if end is not None else len(trend.timestamps)
+    return i,j
+
+def get_series(trend,name,start = None,end = None,resolution = None,origin = 0):
+    """
+    Returns a list of (timestamp,value) pairs of the given series between `start` and `end`.
+
+    If a `resolution` (in seconds) is given, the points are grouped into buckets of this
+    size (starting at `origin`) and the last value in each bucket is returned, with the
+    start of the bucket as timestamp.
+    """
+    if not name in trend.series:
+        return []
+    i,j = get_range(trend,start,end)
+    points = [(timestamp,value) for timestamp,value in zip(trend.timestamps[i:j],
+                                                            trend.series[name][i:j])
+              if value is not None]
+    if not resolution:
+        return points
+    buckets = []
+    for timestamp,value in points:
+        bucket = timestamp-(timestamp-origin) % resolution
+        if buckets and buckets[-1][0] == bucket:
+            buckets[-1] = (bucket,value)
+        else:
+            buckets.append((bucket,value))
+    return buckets
+
+class TrendStore(object):
+
+    """
+    Reads and updates the `Trend` documents of a project.
+    """
+
+    def __init__(self,backend,project,max_depth = 3):
+        self.backend = backend
+        self.project = project
+        self.max_depth = max_depth
+
+    def get_trend_pk(self,directory):
+        return hashlib.sha1(("%s:%s" % (self.project.pk,directory)).encode('utf-8')).hexdigest()
+
+    def get_trend(self,directory,create = False):
+        Trend = self.project.Trend
+        try:
+            return self.backend.get(Trend,{'pk' : self.get_trend_pk(directory)})
+        except Trend.DoesNotExist:
+            if not create:
+                return None
+            return Trend({'pk' : self.get_trend_pk(directory),
+                          'project' : self.project,
+                          'directory' : directory,
+                          'timestamps' : [],
+                          'snapshots' : [],
+                          'series' : {}})
+
+    def update(self,snapshot):
+        """
+        Adds the statistics of the given snapshot to the trends of all its directories.
+        """
+        timestamp = get_snapshot_timestamp(snapshot)
+        scalars = get_snapshot_scalars(snapshot,max_depth = self.max_depth)
+        for directory,values in scalars.items():
+            trend = self.get_trend(directory,create = True)
+            add_point(trend,timestamp,snapshot.pk,values)
+            self.backend.save(trend)
+        self.backend.commit()
+        return len(scalars)
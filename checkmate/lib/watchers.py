@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import time
+import logging
+
+try:
+    import pyinotify
+    inotify_support = True
+except ImportError:
+    inotify_support = False
+
+logger = logging.getLogger(__name__)
+
+class BaseWatcher(object):
+
+    """
+    Watches a directory tree and reports the (relative) paths of files that were
+    created, modified or deleted.
+
+    :param path:                The directory to watch.
+    :param exclude_directories: Names of directories that should be ignored (e.g. the
+                                directory in which checkmate stores its data).
+    """
+
+    def __init__(self,path,exclude_directories = ('.checkmate','.git')):
+        self.path = os.path.abspath(path)
+        self.exclude_directories = exclude_directories
+
+    def is_excluded(self,rel_path):
+        return any([part in self.exclude_directories for part in rel_path.split(os.path.sep)])
+
+    def poll(self,timeout = None):
+        """
+        Returns a set of changed paths, waiting at most `timeout` seconds for changes.
+        """
+        raise NotImplementedError
+
+    def wait_for_changes(self,debounce = 0.2):
+        """
+        Blocks until files have changed and returns the set of changed paths.
+
+        Editors often generate bursts of events when saving a file (e.g. write to a
+        temporary file, rename, change attributes), so we keep collecting changes until
+        no new events arrived for `debounce` seconds.
+        """
+        changed_paths = set()
+        while not changed_paths:
+            changed_paths |= self.poll()
+        while True:
+            new_paths = self.poll(timeout = debounce)
+            if not new_paths:
+                break
+            changed_paths |= new_paths
+        return changed_paths
+
+    def close(self):
+        pass
+
+class PollingWatcher(BaseWatcher):
+
+    """
+    Detects changes by periodically comparing the modification times of all files.
+    """
+
+    def __init__(self,path,interval = 1.0,**kwargs):
+        super(PollingWatcher,self).__init__(path,**kwargs)
+        self.interval = interval
+        self._mtimes = self.scan()
+
+    def scan(self):
+        mtimes = {}
+        for dirpath,dirnames,filenames in os.walk(self.path):
+            dirnames[:] = [dirname for dirname in dirnames
+                           if not dirname in self.exclude_directories]
+            for filename in filenames:
+                full_path = os.path.join(dirpath,filename)
+                try:
+                    mtimes[os.path.relpath(full_path,self.path)] = os.stat(full_path).st_mtime
+                except OSError:
+                    continue
+        return mtimes
+
+    def poll(self,timeout = None):
+        start = time.time()
+        while True:
+            time.sleep(self.interval if timeout is None else min(self.interval,timeout))
+            mtimes = self.scan()
+            changed_paths = set([path for path,mtime in mtimes.items()
+                                 if self._mtimes.get(path) != mtime])
+            changed_paths |= set(self._mtimes.keys()) - set(mtimes.keys())
+            self._mtimes = mtimes
+            if changed_paths or (timeout is not None and time.time()-start >= timeout):
+                return changed_paths
+
+class InotifyWatcher(BaseWatcher):
+
+    """
+    Receives change events from the kernel through inotify (requires `pyinotify`).
+    """
+
+    def __init__(self,path,**kwargs):
+        super(InotifyWatcher,self).__init__(path,**kwargs)
+        self._changed_paths = set()
+        self._watch_manager = pyinotify.WatchManager()
+        self._notifier = pyinotify.Notifier(self._watch_manager,self._process_event)
+        mask = pyinotify.IN_CLOSE_WRITE | pyinotify.IN_CREATE | pyinotify.IN_DELETE \
+             | pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO | pyinotify.IN_MODIFY
+        self._watch_manager.add_watch(self.path,
+                                      mask,
+                                      rec = True,
+                                      auto_add = True,
+                                      exclude_filter = self._exclude_filter)
+
+    def _exclude_filter(self,path):
+        return self.is_excluded(os.path.relpath(path,self.path))
+
+    def _process_event(self,event):
+        if event.dir:
+            return
+        rel_path = os.path.relpath(event.pathname,self.path)
+        if not self.is_excluded(rel_path):
+            self._changed_paths.add(rel_path)
+
+    def poll(self,timeout = None):
+        if self._notifier.check_events(timeout = None if timeout is None else timeout*1000):
+            self._notifier.read_events()
+            self._notifier.process_events()
+        changed_paths = self._changed_paths
+        self._changed_paths = set()
+        return changed_paths
+
+    def close(self):
+        self._notifier.stop()
+
+def get_watcher(path,polling = False,**kwargs):
+    """
+    Returns an inotify-based watcher if possible, and a polling watcher otherwise.
+    """
+    if inotify_support and not polling:
+        try:
+            return InotifyWatcher(path)
+        except (OSError,pyinotify.WatchManagerError):
+            logger.warning("Cannot use inotify, falling back to polling.")
+    return PollingWatcher(path,**kwargs)
@@ -34,11 +34,19 @@ import time
 import pprint
 import hashlib
 import logging
+import traceback
 
 logger = logging.getLogger(__name__)
 
 from checkmate.management.helpers import filter_filenames_by_checkignore
 from checkmate.lib.code import CodeEnvironment
+from checkmate.lib.analysis.fingerprint import IssueFingerprinter
+from checkmate.lib.analysis.occurences import encode_occurences
+from checkmate.lib.models import get_analysis_pk
+from checkmate.lib.stats.trends import TrendStore
+from checkmate.lib.stats.tree import SummaryTree
+from checkmate.lib.stats.index import build_stats_index
+from checkmate.lib.code.work_queue import WorkQueue
 
 
 def diff_objects(objects_a,objects_b,key,comparator,with_unchanged = False):
@@ -75,8 +83,55 @@ def diff_objects(objects_a,objects_b,key,comparator,with_unchanged = False):
 
     return result
 
+def merge_counts(counts_a,counts_b):
+    """
+    Adds up two (nested) dictionaries of counts, e.g. issue summaries of two sets of issues.
+    """
+    merged = dict(counts_a)
+    for key,value in counts_b.items():
+        if isinstance(value,dict):
+            merged[key] = merge_counts(merged.get(key,{}),value)
+        else:
+            merged[key] = merged.get(key,0)+value
+    return merged
+
+def get_issue_key(issue):
+    """
+    Identifies an issue by its path, analyzer, code and (if available) its fingerprint,
+    so that issues can be matched between snapshots even if their line numbers changed.
+    """
+    path = getattr(issue,'_path',None) or issue.file_revision.path
+    try:
+        return path+":"+issue.analyzer+":"+issue.code+":"+issue.fingerprint
+    except AttributeError:
+        return path+":"+issue.analyzer+":"+issue.code
+
+def compare_issues(issue_a,issue_b):
+    if get_issue_key(issue_a) == get_issue_key(issue_b):
+        return 0
+    return -1
+
 class Command(BaseCommand):
 
+    options = BaseCommand.options + [
+        {
+        'name'        : '--queue',
+        'action'      : 'store',
+        'dest'        : 'queue',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'Distribute the analysis to workers through this work queue (an SQLite file).'
+        },
+        {
+        'name'        : '--lease',
+        'action'      : 'store',
+        'dest'        : 'lease',
+        'type'        : float,
+        'default'     : 300,
+        'help'        : 'The time (in seconds) after which unfinished tasks are given to another worker.'
+        },
+        ]
+
     def diff_snapshots(self,code_environment,snapshot_a,snapshot_b):
  
         diff = {'snapshot_a' : snapshot_a,'snapshot_b' : snapshot_b,'project' : self.project}
@@ -95,17 +150,6 @@ class Command(BaseCommand):
             res = 0 if file_revision_a.fr_pk == file_revision_b.fr_pk else -1
             return res
 
-        def issue_key(issue):
-            try:
-                return issue.file_revision.path+":"+issue.analyzer+\
-                       ":"+issue.code+":"+issue.fingerprint
-            except AttributeError:
-                return issue.file_revision.path+":"+issue.analyzer+":"+issue.code
-
-        def issue_comparator(issue_a,issue_b):
-            if issue_key(issue_a) == issue_key(issue_b):
-                return 0
-            return -1
 
         file_revisions_a = snapshot_a.get_file_revisions(self.backend)
         file_revisions_b = snapshot_b.get_file_revisions(self.backend)
@@ -132,19 +176,19 @@ class Command(BaseCommand):
         modified_file_revisions_b = [fr for fr in file_revisions_b 
                                      if fr.path in modified_file_revisions_by_path]
 
-        issues_a = self.backend.filter(self.project.Issue,
-                                     {'project.pk' : self.project.pk,
-                                        'file_revision.pk' : {'$in' : [fr.pk 
-                                            for fr in modified_file_revisions_a]}
-                                     })
-        issues_b = self.backend.filter(self.project.Issue,
-                                       {'project.pk' : self.project.pk,
-                                        'file_revision.pk' : {'$in' : [fr.pk 
-                                            for fr in modified_file_revisions_b]}
-                                        })
+        issues_a = self.get_issues(modified_file_revisions_a)
+        issues_b = self.get_issues(modified_file_revisions_b)
+
+        #issues can be shared between file revisions with identical content, so we
+        #determine the path of each issue from the file revisions of its snapshot.
+        for issues,file_revisions in ((issues_a,modified_file_revisions_a),
+                                      (issues_b,modified_file_revisions_b)):
+            paths = dict([(get_analysis_pk(fr),fr.path) for fr in file_revisions])
+            for issue in issues:
+                issue._path = paths.get(issue.file_revision.pk,issue.file_revision.path)
 
         logger.info("Diffing issues (%d in A, %d in B)" % (len(issues_a),len(issues_b)))
-        diff['issues'] = diff_objects(issues_a,issues_b,issue_key,issue_comparator)
+        diff['issues'] = diff_objects(issues_a,issues_b,get_issue_key,compare_issues)
 
         logger.info("Diffing summary...")
         diff['summary'] = code_environment.diff_summaries(snapshot_a,snapshot_b)
@@ -203,15 +247,14 @@ class Command(BaseCommand):
 
         return diffs
 
+    @property
+    def fingerprinter(self):
+        if not hasattr(self,'_fingerprinter'):
+            self._fingerprinter = IssueFingerprinter()
+        return self._fingerprinter
+
     def fingerprint_issues(self,file_revision,issues):
-        content = file_revision.get_file_content()
-        lines = content.split("\n")
-        for issue in issues:
-            lines = "\n".join([line for loc in issue.location 
-                                    for line in lines[loc[0][0]:loc[1][0]]])
-            sha = hashlib.sha1()
-            sha.update(lines)
-            issue.fingerprint = sha.hexdigest()
+        self.fingerprinter.fingerprint_issues(file_revision,issues)
 
     def annotate_file_revisions(self,snapshot,file_revisions):
         """
@@ -228,15 +271,11 @@ class Command(BaseCommand):
             issues_for_code = {}
             for issue in issues:
                 if not issue['code'] in issues_for_code:
-                    issues_for_code[issue['code']] = copy.deepcopy(issue)
-                    code_issue = issues_for_code[issue['code']]
-
-                    if 'location' in code_issue:
-                        del code_issue['location']
-                    if 'data' in code_issue:
-                        del code_issue['data']
-
+                    #the location and data go into the occurences, so we don't copy them
+                    code_issue = dict([(key,value) for key,value in issue.items()
+                                       if not key in ('location','data')])
                     code_issue['occurences'] = []
+                    issues_for_code[issue['code']] = code_issue
 
                 code_issue = issues_for_code[issue['code']]
                 issue_data = {}
@@ -273,11 +312,95 @@ class Command(BaseCommand):
                         document.analyzer = analyzer_name
                         documents.append(document)
 
+                    self.fingerprint_issues(file_revision,documents)
+                    for document in documents:
+                        document.occurences = encode_occurences(document.occurences)
                     annotations['issues'].extend(documents)
                     del results['issues']
 
         return annotations
 
+    def update_trends(self,snapshot,code_environment):
+        """
+        Adds the statistics of the snapshot to the time series of the project, which
+        are used by the `trend` command.
+        """
+        trends_settings = code_environment.settings.get('trends',{})
+        try:
+            trend_store = TrendStore(self.backend,self.project,
+                                     max_depth = trends_settings.get('max_depth',3))
+            n_directories = trend_store.update(snapshot)
+            logger.info("Updated trends for %d directories" % n_directories)
+        except Exception:
+            logger.error("Could not update trends:\n%s" % traceback.format_exc())
+
+    def update_stats_index(self,snapshot):
+        """
+        Stores the per-directory statistics of the snapshot in an index, which is used
+        by the `stats` command. Returns `None` if the index could not be updated.
+        """
+        try:
+            stats_index = self.project.StatsIndex(build_stats_index(snapshot))
+            stats_index.pk = snapshot.pk
+            self.backend.save(stats_index)
+            self.backend.commit()
+        except Exception:
+            logger.error("Could not update the stats index:\n%s" % traceback.format_exc())
+            return None
+        return stats_index
+
+    def reuse_analyzed_blobs(self,file_revisions,code_environment):
+        """
+        Looks for already analyzed file revisions with the same content (blob sha), language
+        and analyzer settings as the given ones. Matching file revisions reuse the results and
+        issues of the existing analysis instead of being analyzed again, so that renamed or
+        copied files don't produce new issues. Returns the file revisions that were matched.
+
+        Only works for file revisions that have a `sha` (e.g. git file revisions).
+        """
+        file_revisions = [fr for fr in file_revisions if 'sha' in fr and fr.sha]
+        if not file_revisions:
+            return []
+        analyzed_blobs = {}
+        for fr in self.backend.filter(file_revisions[0].__class__,{
+                'project.pk' : self.project.pk,
+                'sha' : {'$in' : list(set([fr.sha for fr in file_revisions]))},
+                'settings_hash' : code_environment.settings_hash,
+                }):
+            if 'results' in fr:
+                analyzed_blobs[(fr.sha,fr.language)] = fr
+
+        reused_file_revisions = []
+        for file_revision in file_revisions:
+            file_revision.language = code_environment.get_language(file_revision)
+            key = (file_revision.sha,file_revision.language)
+            if not key in analyzed_blobs:
+                continue
+            analyzed_file_revision = analyzed_blobs[key]
+            file_revision.results = copy.deepcopy(analyzed_file_revision.results)
+            file_revision.analysis_pk = get_analysis_pk(analyzed_file_revision)
+            if 'skipped' in analyzed_file_revision:
+                file_revision.skipped = analyzed_file_revision.skipped
+            reused_file_revisions.append(file_revision)
+        return reused_file_revisions
+
+    def get_duplicate_blobs(self,file_revisions):
+        """
+        Returns (file revision, original) pairs for all file revisions that have the same
+        content (blob sha) and language as a preceding file revision in the list.
+        """
+        originals = {}
+        duplicates = []
+        for file_revision in file_revisions:
+            if not 'sha' in file_revision or not file_revision.sha:
+                continue
+            key = (file_revision.sha,file_revision.get('language'))
+            if key in originals:
+                duplicates.append((file_revision,originals[key]))
+            else:
+                originals[key] = file_revision
+        return duplicates
+
     def analyze_snapshot(self,snapshot,code_environment,save_if_empty = False):
 
         logger.info("Analyzing snapshot...")
@@ -319,68 +442,225 @@ class Command(BaseCommand):
             file_revisions = file_revisions_by_pk.values()
 
 
-        existing_file_revisions = list(self.backend.filter(snapshot.FileRevision,{
+        settings_hash = code_environment.settings_hash
+
+        #File revisions analyzed with different analyzer settings can't be reused.
+        #(file revisions from older versions don't have a settings hash, we reuse them)
+        existing_file_revisions_by_pk = {}
+        for fr in self.backend.filter(snapshot.FileRevision,{
                 'project.pk' : self.project.pk,
                 'fr_pk' : {'$in' : file_revisions_by_pk.keys()}
-                }))
-        existing_file_revisions_by_pk = dict([(fr.fr_pk,fr) for fr in existing_file_revisions])
+                }):
+            if fr.get('settings_hash',settings_hash) != settings_hash:
+                continue
+            if fr.fr_pk in existing_file_revisions_by_pk and not 'settings_hash' in fr:
+                continue
+            existing_file_revisions_by_pk[fr.fr_pk] = fr
+        existing_file_revisions = existing_file_revisions_by_pk.values()
         new_file_revisions = [file_revision for file_revision in file_revisions
                                 if not file_revision.fr_pk in existing_file_revisions_by_pk]
 
+        for file_revision in new_file_revisions:
+            file_revision.settings_hash = settings_hash
+
+        reused_file_revisions = self.reuse_analyzed_blobs(new_file_revisions,code_environment)
+        if reused_file_revisions:
+            for file_revision in reused_file_revisions:
+                self.backend.save(file_revision)
+            self.backend.commit()
+            existing_file_revisions = existing_file_revisions+reused_file_revisions
+            new_file_revisions = [file_revision for file_revision in new_file_revisions
+                                  if not 'analysis_pk' in file_revision]
+
         file_revisions_dict = {}
 
         for file_revision in existing_file_revisions+new_file_revisions:
             file_revisions_dict[file_revision.path] = file_revision
 
-        logger.info("Analyzing %d new file revisions (%d are already analyzed)" % (
+        #new file revisions with identical content are only analyzed once
+        duplicate_file_revisions = self.get_duplicate_blobs(new_file_revisions)
+        if duplicate_file_revisions:
+            duplicate_paths = set([fr.path for fr,analyzed_fr in duplicate_file_revisions])
+            new_file_revisions = [file_revision for file_revision in new_file_revisions
+                                  if not file_revision.path in duplicate_paths]
+
+        if self.opts.get('queue') and code_environment.work_queue is None:
+            code_environment.work_queue = WorkQueue(self.opts['queue'],
+                                                    lease_time = self.opts['lease'])
+        if code_environment.work_queue is not None:
+            #the workers can start with all file revisions while we process the first ones
+            code_environment.submit_file_revisions(new_file_revisions)
+
+        logger.info("Analyzing %d new file revisions (%d are already analyzed, "
+                    "%d of them with identical content at another path)" % (
                 len(new_file_revisions),
-                len(existing_file_revisions)
+                len(existing_file_revisions),
+                len(reused_file_revisions),
                 ))
-        i = 0
-
-        snapshot_issues = list(self.backend.filter(self.project.Issue,
-                            {'file_revision.pk' : {'$in' : [fr.pk 
-                                for fr in existing_file_revisions]  }
-                            }))
-        logger.info("Found %d existing issues..." % len(snapshot_issues))
 
         #We set the project information in the snapshot.
         snapshot.project = self.project
         snapshot.file_revisions = [fr.pk for fr in file_revisions_dict.values()]
+
+        #We process the file revisions in a fixed order and save the progress after each
+        #chunk, so that an interrupted analysis can be resumed where it stopped.
+        new_file_revision_pks = set([fr.fr_pk for fr in new_file_revisions])
+        duplicate_file_revision_pks = set([fr.fr_pk for fr,analyzed_fr in duplicate_file_revisions])
+        original_file_revision_pks = set([analyzed_fr.fr_pk
+                                          for fr,analyzed_fr in duplicate_file_revisions])
+        ordered_file_revisions = sorted(file_revisions_dict.values(),key = lambda fr:fr.fr_pk)
+        checkpoint = self.load_checkpoint(snapshot,ordered_file_revisions,settings_hash)
+        if checkpoint['cursor']:
+            logger.info("Resuming the analysis after %d of %d file revisions" % (
+                checkpoint['cursor'],len(ordered_file_revisions)))
+        #the issues and results of each file revision are counted once, even if the
+        #analysis is resumed
+        counted_file_revision_pks = set(checkpoint['file_revision_pks'])
+        summary = SummaryTree.load(checkpoint['summary'])
+
         code_environment.env['snapshot'] = snapshot
 
         try:
-            while i < len(new_file_revisions):
-                j = i+10 if i+10 < len(new_file_revisions) else len(new_file_revisions)
-                logger.info("Analyzing and saving: %d - %d (%d remaining)" % 
-                    (i, j, len(new_file_revisions) - i ))
-                file_revisions_slice = new_file_revisions[i:j]
-                analyzed_file_revisions = code_environment.analyze_file_revisions(file_revisions_slice)
-                logger.info("Annotating and saving file revisions...")
-                annotations = self.annotate_file_revisions(snapshot,analyzed_file_revisions)
-                if 'issues' in annotations:
-                    snapshot_issues.extend(annotations['issues'])
-                for file_revision in analyzed_file_revisions:
-                    self.backend.save(file_revision)
-                self.backend.commit()
-                for issue in annotations['issues']:
-                    self.backend.save(issue)
-                self.backend.commit()
-                i+=10
-            logger.info("Summarizing file revisions...")
-            snapshot.summary = code_environment.summarize(file_revisions_dict.values())
-            logger.info("Summarizing issues...")
-            snapshot.issues_summary = code_environment.summarize_issues(snapshot_issues)
+            for i,j in self.get_chunks(ordered_file_revisions,new_file_revision_pks,
+                                       start = checkpoint['cursor']):
+                chunk = ordered_file_revisions[i:j]
+                file_revisions_slice = [fr for fr in chunk if fr.fr_pk in new_file_revision_pks]
+                #duplicates get the results of their original after it has been analyzed
+                counted_file_revisions = [fr for fr in chunk
+                                          if not fr.fr_pk in duplicate_file_revision_pks
+                                          and not fr.fr_pk in counted_file_revision_pks]
+                chunk_issues = self.get_issues([fr for fr in counted_file_revisions
+                                                if not fr.fr_pk in new_file_revision_pks])
+                if file_revisions_slice:
+                    logger.info("Analyzing and saving: %d - %d (%d remaining)" % 
+                        (i, j, len(ordered_file_revisions) - i ))
+                    analyzed_file_revisions = code_environment.analyze_file_revisions(file_revisions_slice)
+                    logger.info("Annotating and saving file revisions...")
+                    annotations = self.annotate_file_revisions(snapshot,analyzed_file_revisions)
+                    #file revisions and their issues are committed together with the checkpoint
+                    for file_revision in analyzed_file_revisions:
+                        self.backend.save(file_revision)
+                    for issue in annotations['issues']:
+                        self.backend.save(issue)
+                    chunk_issues.extend(annotations['issues'])
+                checkpoint['issues_summary'] = merge_counts(checkpoint['issues_summary'],
+                    code_environment.summarize_issues(
+                        self.get_file_revision_issues(counted_file_revisions,chunk_issues)))
+                code_environment.merge_summaries(summary,
+                    code_environment.summarize(counted_file_revisions))
+                counted_file_revision_pks.update([fr.fr_pk for fr in counted_file_revisions])
+                checkpoint['file_revision_pks'] = sorted(counted_file_revision_pks)
+                checkpoint['summary'] = summary.serialize()
+                checkpoint['cursor'] = j
+                self.save_checkpoint(snapshot,checkpoint)
+                #the results are saved and summarized, we only keep the ones that
+                #we copy to duplicates
+                for file_revision in counted_file_revisions:
+                    if 'results' in file_revision and \
+                      not file_revision.fr_pk in original_file_revision_pks:
+                        del file_revision.results
+            for file_revision,analyzed_file_revision in duplicate_file_revisions:
+                if not 'results' in analyzed_file_revision:
+                    continue
+                file_revision.results = copy.deepcopy(analyzed_file_revision.results)
+                file_revision.analysis_pk = get_analysis_pk(analyzed_file_revision)
+                if 'skipped' in analyzed_file_revision:
+                    file_revision.skipped = analyzed_file_revision.skipped
+                self.backend.save(file_revision)
+            self.backend.commit()
+            #we count the duplicates and the file revisions that were skipped when resuming
+            #(e.g. copies of file revisions that the interrupted analysis has saved)
+            counted_file_revisions = [fr for fr in ordered_file_revisions
+                                      if not fr.fr_pk in counted_file_revision_pks]
+            checkpoint['issues_summary'] = merge_counts(checkpoint['issues_summary'],
+                code_environment.summarize_issues(
+                    self.get_file_revision_issues(counted_file_revisions)))
+            code_environment.merge_summaries(summary,
+                code_environment.summarize(counted_file_revisions))
+            #file revisions that the classifier skipped are listed with their reason code
+            skipped_file_revisions = dict([(fr.path,fr.skipped['code'])
+                                           for fr in file_revisions_dict.values() if 'skipped' in fr])
+            if skipped_file_revisions:
+                logger.info("Skipped %d binary, minified, generated or large file revisions" %
+                            len(skipped_file_revisions))
+                snapshot.skipped_file_revisions = skipped_file_revisions
+            snapshot.summary = summary.serialize()
+            snapshot.issues_summary = checkpoint['issues_summary']
         finally:
             del code_environment.env['snapshot']
+            #the worker pools of the executor are shared by all chunks of the snapshot
+            code_environment.close()
 
         snapshot.analyzed = True
+        if 'checkpoint' in snapshot:
+            del snapshot.checkpoint
 
         logger.info("Saving snapshot...")
 
         self.backend.save(snapshot)
         self.backend.commit()
 
+        self.update_trends(snapshot,code_environment)
+        self.update_stats_index(snapshot)
+
         logger.info("Done analyzing snapshot %s" % snapshot.pk)
 
         return snapshot
+
+    def get_chunks(self,file_revisions,new_file_revision_pks,start = 0,
+                   max_new_file_revisions = 10,max_file_revisions = 1000):
+        """
+        Returns the (start,end) indexes of chunks of the given file revisions, each of which
+        contains at most `max_new_file_revisions` file revisions that need to be analyzed.
+        """
+        chunks = []
+        i = start
+        n_new = 0
+        for j in range(start,len(file_revisions)):
+            if file_revisions[j].fr_pk in new_file_revision_pks:
+                n_new += 1
+            if n_new >= max_new_file_revisions or j+1-i >= max_file_revisions:
+                chunks.append((i,j+1))
+                i = j+1
+                n_new = 0
+        if i < len(file_revisions):
+            chunks.append((i,len(file_revisions)))
+        return chunks
+
+    def get_checkpoint_key(self,file_revisions,settings_hash):
+        return hashlib.sha1(json.dumps([settings_hash,sorted([fr.fr_pk for fr in file_revisions])])
+                            .encode('utf-8')).hexdigest()
+
+    def load_checkpoint(self,snapshot,file_revisions,settings_hash):
+        """
+        Returns the checkpoint of an interrupted analysis of the same file revisions with
+        the same settings (the snapshot takes over its primary key), or a new checkpoint.
+        """
+        key = self.get_checkpoint_key(file_revisions,settings_hash)
+        for partial_snapshot in self.backend.filter(snapshot.__class__,{'project.pk' : self.project.pk,
+                                                                         'analyzed' : False}):
+            if partial_snapshot.get('checkpoint',{}).get('key') == key:
+                snapshot.pk = partial_snapshot.pk
+                checkpoint = partial_snapshot.checkpoint
+                if not 'summary' in checkpoint:
+                    #checkpoints of older versions don't contain the summary, so we count
+                    #all file revisions again (the saved ones are not analyzed again)
+                    checkpoint.update({'issues_summary' : {},
+                                       'file_revision_pks' : [],
+                                       'summary' : None})
+                return checkpoint
+        return {'key' : key,
+                'cursor' : 0,
+                'issues_summary' : {},
+                'file_revision_pks' : [],
+                'summary' : None}
+
+    def save_checkpoint(self,snapshot,checkpoint):
+        """
+        Saves the snapshot as a partial snapshot (which is not shown as the latest snapshot)
+        together with the given checkpoint.
+        """
+        snapshot.analyzed = False
+        snapshot.checkpoint = checkpoint
+        self.backend.save(snapshot)
+        self.backend.commit()
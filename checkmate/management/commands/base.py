@@ -20,8 +20,13 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from __future__ import unicode_literals
 import argparse
+import logging
 import copy
 
+from checkmate.lib.models import get_analysis_pk
+
+logger = logging.getLogger(__name__)
+
 class CommandException(BaseException):
     pass
 
@@ -71,4 +76,63 @@ class BaseCommand(object):
     def help_message(self):
         parser = self._get_parser()
         return parser.format_help()
-        
\ No newline at end of file
+
+    def get_snapshot(self,snapshot_pk = None):
+        """
+        Returns the snapshot whose primary key starts with `snapshot_pk`, or the most
+        recent completely analyzed snapshot of the project if no key is given. Returns
+        `None` if no matching snapshot exists.
+        """
+        Snapshot = self.project.Snapshot
+        if snapshot_pk:
+            try:
+                return self.backend.get(Snapshot,{'pk' : {'$regex' : r'^'+snapshot_pk}})
+            except Snapshot.DoesNotExist:
+                logger.error("Snapshot %s does not exist!" % snapshot_pk)
+            except Snapshot.MultipleDocumentsReturned:
+                logger.error("Ambiguous key %s!" % snapshot_pk)
+        else:
+            try:
+                #snapshots of interrupted analyses are not complete yet
+                return self.backend.filter(Snapshot,{'project.pk' : self.project.pk,
+                                                     'analyzed' : True})\
+                                   .sort('created_at',-1)[0]
+            except IndexError:
+                logger.error("No snapshots in this project.")
+        return None
+
+    def get_issues(self,file_revisions):
+        """
+        Returns the issues of the given file revisions.
+        """
+        if not file_revisions:
+            return []
+        analysis_pks = list(set([get_analysis_pk(fr) for fr in file_revisions]))
+        return list(self.backend.filter(self.project.Issue,
+                                        {'file_revision.pk' : {'$in' : analysis_pks}}))
+
+    def get_file_revision_issues(self,file_revisions,issues = None):
+        """
+        Returns one item per file revision and issue for summarizing the issues of the given
+        file revisions, with the path and language of the file revision. Issues are shared
+        between file revisions with identical content, so an issue is counted for each of them
+        (and not only at the path of the file revision that was analyzed).
+        """
+        if issues is None:
+            issues = self.get_issues(file_revisions)
+        issues_by_analysis_pk = {}
+        for issue in issues:
+            issues_by_analysis_pk.setdefault(issue.file_revision.pk,[]).append(issue)
+        items = []
+        for file_revision in file_revisions:
+            file_revision_issues = issues_by_analysis_pk.get(get_analysis_pk(file_revision),[])
+            if not file_revision_issues:
+                continue
+            file_revision_item = {'path' : file_revision.path}
+            if 'language' in file_revision:
+                file_revision_item['language'] = file_revision.language
+            for issue in file_revision_issues:
+                items.append({'file_revision' : file_revision_item,
+                              'analyzer' : issue.analyzer,
+                              'code' : issue.code})
+        return items
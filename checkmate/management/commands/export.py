@@ -1,3 +1,4 @@
+# -*- coding: utf-8 -*-
 """
 This file is part of checkmate, a meta code checker written in Python.
 
@@ -17,3 +18,229 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+from __future__ import unicode_literals
+from base import BaseCommand
+
+from checkmate.lib.export import writers,flatten
+from checkmate.lib.models import get_analysis_pk
+from checkmate.lib.analysis.occurences import get_ranges
+from checkmate.lib.stats.tree import SummaryTree
+import checkmate.settings as settings
+
+from collections import defaultdict
+
+import sys
+import gzip
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+$ checkmate export issues [snapshot pk] --format csv --output issues.csv.gz
+$ checkmate export file_revisions [snapshot pk] --format jsonl
+$ checkmate export summary [snapshot pk]
+"""
+
+issue_fields = ['path','language','analyzer','code','severity','title','line','column',
+                'end_line','end_column','fingerprint','message','data']
+
+file_revision_fields = ['path','language','sha','fr_pk','results']
+
+summary_fields = ['key','value']
+
+class Command(BaseCommand):
+
+    options = BaseCommand.options + [
+        {
+        'name'        : '--format',
+        'action'      : 'store',
+        'dest'        : 'format',
+        'type'        : str,
+        'default'     : 'jsonl',
+        'choices'     : sorted(writers.keys()),
+        'help'        : 'The output format (jsonl, csv or sarif).'
+        },
+        {
+        'name'        : '--output',
+        'action'      : 'store',
+        'dest'        : 'output',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'The output file (default: standard output).'
+        },
+        {
+        'name'        : '--gzip',
+        'action'      : 'store_true',
+        'dest'        : 'gzip',
+        'default'     : False,
+        'help'        : 'Compress the output with gzip (default for output files ending with .gz).'
+        },
+        {
+        'name'        : '--analyzer',
+        'action'      : 'store',
+        'dest'        : 'analyzer',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'Only export issues of this analyzer.'
+        },
+        {
+        'name'        : '--code',
+        'action'      : 'store',
+        'dest'        : 'code',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'Only export issues with this code.'
+        },
+        {
+        'name'        : '--path',
+        'action'      : 'store',
+        'dest'        : 'path',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'Only export files whose path starts with this prefix.'
+        },
+        {
+        'name'        : '--batch-size',
+        'action'      : 'store',
+        'dest'        : 'batch_size',
+        'type'        : int,
+        'default'     : 100,
+        'help'        : 'The number of file revisions to load from the backend at once.'
+        },
+        ]
+
+    description = """
+    Exports the issues, file revisions or summary of a snapshot.
+    """
+
+    def run(self):
+
+        if not self.extra_args or not self.extra_args[0] in ('issues','file_revisions','summary'):
+            sys.stderr.write("Usage: checkmate export [issues|file_revisions|summary] "
+                             "[snapshot pk] [options]\n")
+            return -1
+
+        what = self.extra_args[0]
+        if what != 'issues' and self.opts['format'] == 'sarif':
+            sys.stderr.write("SARIF output is only supported for issues.\n")
+            return -1
+
+        snapshot = self.get_snapshot(self.extra_args[1] if len(self.extra_args) > 1 else None)
+        if snapshot is None:
+            return -1
+
+        output = self.open_output()
+        try:
+            if what == 'issues':
+                writer = writers[self.opts['format']](output,issue_fields)
+                records = self.get_issue_records(snapshot)
+            elif what == 'file_revisions':
+                writer = writers[self.opts['format']](output,file_revision_fields)
+                records = self.get_file_revision_records(snapshot)
+            else:
+                writer = writers[self.opts['format']](output,summary_fields)
+                records = self.get_summary_records(snapshot)
+            n = 0
+            for record in records:
+                writer.write(record)
+                n += 1
+            writer.close()
+        finally:
+            if output is not self.get_stdout():
+                output.close()
+        if self.opts['output']:
+            logger.info("Exported %d records to %s" % (n,self.opts['output']))
+        return 0
+
+    def get_stdout(self):
+        return getattr(sys.stdout,'buffer',sys.stdout)
+
+    def open_output(self):
+        filename = self.opts['output']
+        use_gzip = self.opts['gzip'] or (filename is not None and filename.endswith('.gz'))
+        if filename is None:
+            if use_gzip:
+                return gzip.GzipFile(fileobj = self.get_stdout(),mode = 'wb')
+            return self.get_stdout()
+        if use_gzip:
+            return gzip.open(filename,'wb')
+        return open(filename,'wb')
+
+    def iterate_file_revisions(self,snapshot):
+        """
+        Yields batches of the file revisions of the snapshot, so that we never have more
+        than one batch in memory.
+        """
+        FileRevision = snapshot.FileRevision
+        pks = snapshot.file_revisions
+        batch_size = self.opts['batch_size']
+        for i in range(0,len(pks),batch_size):
+            file_revisions = list(self.backend.filter(FileRevision,
+                                                      {'pk' : {'$in' : pks[i:i+batch_size]}}))
+            if self.opts['path']:
+                file_revisions = [fr for fr in file_revisions
+                                  if fr.path.startswith(self.opts['path'])]
+            if file_revisions:
+                yield file_revisions
+
+    def get_issue_records(self,snapshot):
+        """
+        Yields a record for each occurence of each issue in the snapshot.
+        """
+        query = {}
+        if self.opts['analyzer']:
+            query['analyzer'] = self.opts['analyzer']
+        if self.opts['code']:
+            query['code'] = self.opts['code']
+
+        for file_revisions in self.iterate_file_revisions(snapshot):
+            #issues can be shared between file revisions with identical content
+            file_revisions_by_analysis_pk = defaultdict(list)
+            for file_revision in file_revisions:
+                file_revisions_by_analysis_pk[get_analysis_pk(file_revision)].append(file_revision)
+            query['file_revision.pk'] = {'$in' : file_revisions_by_analysis_pk.keys()}
+            for issue in self.backend.filter(self.project.Issue,query):
+                issue_data = settings.analyzers.get(issue.analyzer,{})\
+                                               .get('issues_data',{})\
+                                               .get(issue.code,{})
+                for file_revision in file_revisions_by_analysis_pk[issue.file_revision.pk]:
+                    for occurence in issue.get_occurences() or [{}]:
+                        yield self.get_issue_record(file_revision,issue,issue_data,occurence)
+
+    def get_issue_record(self,file_revision,issue,issue_data,occurence):
+        record = {
+            'path' : file_revision.path,
+            'language' : file_revision.get('language'),
+            'analyzer' : issue.analyzer,
+            'code' : issue.code,
+            'severity' : issue_data.get('severity'),
+            'title' : issue_data.get('title'),
+            'fingerprint' : issue.get('fingerprint'),
+            'data' : occurence.get('data'),
+        }
+        ranges = get_ranges(occurence.get('location'))
+        if ranges:
+            (record['line'],record['column']),(record['end_line'],record['end_column']) = ranges[0]
+        data = occurence.get('data')
+        if isinstance(data,dict) and 'description' in data:
+            record['message'] = data['description']
+        return record
+
+    def get_file_revision_records(self,snapshot):
+        for file_revisions in self.iterate_file_revisions(snapshot):
+            for file_revision in file_revisions:
+                yield {
+                    'path' : file_revision.path,
+                    'language' : file_revision.get('language'),
+                    'sha' : file_revision.get('sha'),
+                    'fr_pk' : file_revision.fr_pk,
+                    'results' : file_revision.get('results'),
+                }
+
+    def get_summary_records(self,snapshot):
+        summary = SummaryTree.load(snapshot.get('summary')).to_dict()
+        if self.opts['format'] == 'jsonl':
+            yield {'key' : None,'value' : summary}
+            return
+        for key,value in flatten(summary):
+            yield {'key' : key,'value' : value}
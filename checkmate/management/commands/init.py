@@ -50,7 +50,7 @@ class Command(BaseCommand):
         'dest'        : 'backend',
         'type'        : str,
         'default'     : 'file',
-        'help'        : 'The backend to use.'
+        'help'        : 'The backend to use (file, sqlite or mongo).'
         },
         {
         'name'        : '--backend-opts',
@@ -102,8 +102,8 @@ class Command(BaseCommand):
             logger.error("Found another project with the same path, aborting.")
             return -1
 
-        if not self.opts['backend'] in ('file','mongo'):
-            logger.error("Unknown backend: %s" % args.backend)
+        if not self.opts['backend'] in ('file','mongo','sqlite'):
+            logger.error("Unknown backend: %s" % self.opts['backend'])
             return -1
 
         config = {
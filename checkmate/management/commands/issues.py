@@ -28,6 +28,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 from checkmate.management.commands.base import BaseCommand
+from checkmate.lib.analysis.occurences import get_ranges
 
 class Command(BaseCommand):
 
@@ -47,27 +48,18 @@ class Command(BaseCommand):
                 snapshot_pk,filenames = self.extra_args[0],self.extra_args[1:]
         print snapshot_pk,filenames
 
-        if snapshot_pk:
-            try:
-                snapshot = self.backend.get(self.project.DiskSnapshot,
-                                            {'pk' : {'$regex' : r'^'+snapshot_pk}})
-            except self.project.DiskSnapshot.DoesNotExist:
-                logger.error("Snapshot %s does not exist!" % snapshot_pk)
-                return -1
-            except self.project.DiskSnapshot.MultipleDocumentsReturned:
-                logger.error("Ambiguous key %s!" % snapshot_pk)
-                return -1
-        else:
-            try:
-                snapshot = self.backend.filter(self.project.DiskSnapshot,{})\
-                                       .sort('created_at',-1)[0]
-            except IndexError:
-                logger.error("No snapshots in this project.")
-                return -1
-        issues = self.backend.filter(self.project.Issue,
-                                     {'file_revision.pk' : {'$in' : snapshot.file_revisions}})\
-                             .sort('analyzer',1)
+        snapshot = self.get_snapshot(snapshot_pk)
+        if snapshot is None:
+            return -1
+        issues = sorted(self.get_issues(snapshot.get_file_revisions(self.backend)),
+                        key = lambda issue:issue['analyzer'])
         
         for issue in issues:
-            print "%(analyzer)s\t%(code)s\t" % {'analyzer' : issue['analyzer'],
-                                                'code' : issue['code']}
\ No newline at end of file
+            #the occurences are stored in compact form and only decoded here
+            lines = sorted(set([start_line
+                                for occurence in issue.get_occurences()
+                                for (start_line,start_column),end in get_ranges(occurence.get('location'))
+                                if start_line is not None]))
+            print "%(analyzer)s\t%(code)s\t%(lines)s" % {'analyzer' : issue['analyzer'],
+                                                          'code' : issue['code'],
+                                                          'lines' : ",".join(map(str,lines))}
\ No newline at end of file
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+from base import BaseCommand
+
+from checkmate.lib.code import CodeEnvironment
+from checkmate.lib.models import get_analysis_pk
+from checkmate.lib.stats.helpers import percentile
+
+from collections import defaultdict
+
+import sys
+import pstats
+import cProfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+$ checkmate profile [snapshot pk]
+$ checkmate profile [snapshot pk] --analyzer pylint --file foo/bar.py [--output pylint.prof]
+"""
+
+class Command(BaseCommand):
+
+    options = BaseCommand.options + [
+        {
+        'name'        : '--top',
+        'action'      : 'store',
+        'dest'        : 'top',
+        'type'        : int,
+        'default'     : 5,
+        'help'        : 'The number of slowest files to show for each analyzer.'
+        },
+        {
+        'name'        : '--analyzer',
+        'action'      : 'store',
+        'dest'        : 'analyzer',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'Only show results for this analyzer.'
+        },
+        {
+        'name'        : '--file',
+        'action'      : 'store',
+        'dest'        : 'file',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'Run the given analyzer on this file under cProfile.'
+        },
+        {
+        'name'        : '--output',
+        'action'      : 'store',
+        'dest'        : 'output',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'Write the cProfile results to this file (in pstats format).'
+        },
+        ]
+
+    description = """
+    Shows the time spent by each analyzer on the files of a snapshot, and by how much
+    the analyzers increased the peak memory usage.
+    """
+
+    def run(self):
+
+        snapshot = self.get_snapshot(self.extra_args[0] if self.extra_args else None)
+        if snapshot is None:
+            return -1
+
+        file_revisions = snapshot.get_file_revisions(self.backend)
+
+        if self.opts['file']:
+            if not self.opts['analyzer']:
+                sys.stderr.write("Please specify the analyzer to profile with --analyzer.\n")
+                return -1
+            file_revisions_by_path = dict([(fr.path,fr) for fr in file_revisions])
+            if not self.opts['file'] in file_revisions_by_path:
+                sys.stderr.write("File %s is not part of snapshot %s.\n" % (self.opts['file'],
+                                                                            snapshot.pk))
+                return -1
+            return self.profile_file_revision(file_revisions_by_path[self.opts['file']],
+                                              self.opts['analyzer'])
+
+        self.print_report(self.get_report(file_revisions))
+        return 0
+
+    def get_report(self,file_revisions):
+        """
+        Returns the timings and peak RSS increases of each analyzer, together with a list
+        of the slowest files.
+
+        File revisions that reuse the results of another analysis (copies of a file, or
+        results from the blob cache) are left out, since their timings are the ones of
+        the original analysis.
+        """
+        times = defaultdict(list)
+        rss_increases = defaultdict(list)
+
+        n_reused = 0
+        for file_revision in file_revisions:
+            if not 'results' in file_revision:
+                continue
+            if get_analysis_pk(file_revision) != file_revision.pk or \
+              file_revision.get('from_blob_cache'):
+                n_reused += 1
+                continue
+            results = file_revision.results
+            for analyzer_name,duration in results.get('analysis_time',{}).items():
+                times[analyzer_name].append((duration,file_revision.path))
+            #the peak RSS of the process only grows if an analysis needs more memory than
+            #any analysis before it, so this is not the memory used by the analyzer
+            for analyzer_name,rss_increase in results.get('analysis_memory',{}).items():
+                rss_increases[analyzer_name].append(rss_increase)
+        if n_reused:
+            logger.info("Leaving out %d file revisions that reuse the results of another analysis"
+                        % n_reused)
+
+        report = {}
+
+        for analyzer_name,analyzer_times in times.items():
+            if self.opts['analyzer'] and analyzer_name != self.opts['analyzer']:
+                continue
+            durations = [duration for duration,path in analyzer_times]
+            report[analyzer_name] = {
+                'n_files' : len(durations),
+                'total' : sum(durations),
+                'p50' : percentile(durations,50),
+                'p95' : percentile(durations,95),
+                'p99' : percentile(durations,99),
+                'max_peak_rss_increase' : max(rss_increases[analyzer_name])
+                                          if rss_increases[analyzer_name] else None,
+                'slowest' : sorted(analyzer_times,key = lambda x:-x[0])[:self.opts['top']],
+            }
+
+        return report
+
+    def print_report(self,report):
+        for analyzer_name,stats in sorted(report.items(),key = lambda x:-x[1]['total']):
+            print "%s: %d files, %.2f s total" % (analyzer_name,stats['n_files'],stats['total'])
+            print "  p50: %.3f s, p95: %.3f s, p99: %.3f s" % (stats['p50'],
+                                                              stats['p95'],
+                                                              stats['p99'])
+            if stats['max_peak_rss_increase'] is not None:
+                print "  largest increase of the peak RSS: %d kB" % stats['max_peak_rss_increase']
+            for duration,path in stats['slowest']:
+                print "  %8.3f s  %s" % (duration,path)
+
+    def profile_file_revision(self,file_revision,analyzer_name):
+        settings = self.project.get_settings(self.backend)
+        code_environment = CodeEnvironment([file_revision],settings = settings)
+
+        if not analyzer_name in code_environment.analyzers:
+            sys.stderr.write("Unknown analyzer: %s\n" % analyzer_name)
+            return -1
+
+        file_revision.project = self.project
+        analyzer = code_environment.init_analyzer(analyzer_name,
+                                                  code_environment.analyzers[analyzer_name])
+
+        profiler = cProfile.Profile()
+        profiler.runcall(analyzer.analyze,file_revision)
+
+        if self.opts['output']:
+            profiler.dump_stats(self.opts['output'])
+            logger.info("Profile written to %s" % self.opts['output'])
+        else:
+            pstats.Stats(profiler,stream = sys.stdout).sort_stats('cumulative').print_stats(30)
+        return 0
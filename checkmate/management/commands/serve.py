@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+from base import BaseCommand
+
+from collections import OrderedDict,defaultdict
+
+import os
+import json
+import time
+import signal
+import logging
+
+from blitzdb import FileBackend
+from checkmate.management.helpers import filter_filenames_by_checkignore
+from checkmate.helpers.ipc import get_socket_path
+from checkmate.lib.code import CodeEnvironment
+from checkmate.lib.code.blob_cache import get_blob_sha
+from checkmate.lib.analysis.pool import analyzer_pool
+from checkmate.lib.analysis.occurences import get_ranges
+from checkmate.lib.models import MockFileRevision,get_analysis_pk
+from checkmate.lib.server import RequestServer,ServerError
+
+logger = logging.getLogger(__name__)
+
+"""
+$ checkmate serve &
+$ checkmate-client analyze foo/bar.py foo/baz.py
+$ checkmate-client issues foo/bar.py
+$ checkmate-client shutdown
+"""
+
+def get_issue_records(path,analyzer_name,code,occurences):
+    """
+    Returns one record per line range of the given issue occurences.
+    """
+    records = []
+    for occurence in occurences:
+        data = occurence.get('data') or {}
+        ranges = get_ranges(occurence.get('location')) or [((None,None),(None,None))]
+        for (start_line,start_column),end in ranges:
+            records.append({'path' : path,
+                            'analyzer' : analyzer_name,
+                            'code' : code,
+                            'line' : start_line,
+                            'column' : start_column,
+                            'data' : data})
+    return records
+
+class Command(BaseCommand):
+
+    options = BaseCommand.options + [
+        {
+        'name'        : '--socket',
+        'action'      : 'store',
+        'dest'        : 'socket',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'The Unix socket to listen on (default: .checkmate/serve.sock).'
+        },
+        {
+        'name'        : '--idle-timeout',
+        'action'      : 'store',
+        'dest'        : 'idle_timeout',
+        'type'        : float,
+        'default'     : 0,
+        'help'        : 'Stop after this many seconds without requests (0: never stop).'
+        },
+        {
+        'name'        : '--cache-size',
+        'action'      : 'store',
+        'dest'        : 'cache_size',
+        'type'        : int,
+        'default'     : 1000,
+        'help'        : 'The number of analysis results to keep in memory.'
+        },
+        ]
+
+    description = """
+    Runs a daemon that keeps the analyzers and the project database loaded and answers
+    analyze and issues requests from `checkmate-client` over a Unix socket.
+    """
+
+    error_codes = ('AnalysisError','AnalysisTimeout','AnalysisMemoryExceeded')
+
+    def run(self):
+
+        self.started_at = time.time()
+        self.results_cache = OrderedDict()
+        self._settings_key = None
+        self.code_environment = None
+        self._index_signature = None
+
+        socket_path = self.opts['socket'] or get_socket_path(self.project.path)
+        self.server = RequestServer(socket_path,{
+                'ping' : self.ping,
+                'analyze' : self.analyze,
+                'issues' : self.issues,
+                'reload' : self.reload,
+                'shutdown' : self.shutdown,
+            },idle_timeout = self.opts['idle_timeout'] or None)
+
+        try:
+            self.server.bind()
+        except ServerError as e:
+            logger.error(e)
+            return -1
+
+        #we stop cleanly (and remove the socket) when we get terminated
+        def terminate(signum,frame):
+            raise KeyboardInterrupt
+        signal.signal(signal.SIGTERM,terminate)
+
+        #analyzers are loaded now, so that the first request is fast as well
+        self.get_code_environment().analyzers
+        self.refresh_backend()
+
+        logger.info("Listening on %s (press CTRL-C to stop)..." % socket_path)
+        try:
+            self.server.serve()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.close()
+            if self.code_environment is not None:
+                self.code_environment.close()
+        logger.info("Answered %d requests" % self.server.n_requests)
+
+    def get_code_environment(self):
+        """
+        Returns the code environment for the current project settings. The environment
+        (and the analyzers it initialized) is kept until the settings change.
+        """
+        settings = self.project.get_settings(self.backend)
+        settings_key = json.dumps(settings,sort_keys = True,default = unicode)
+        if self.code_environment is None or settings_key != self._settings_key:
+            if self.code_environment is not None:
+                logger.info("Settings changed, reloading analyzers...")
+                self.code_environment.close()
+            self.code_environment = CodeEnvironment([],settings = settings)
+            self._settings_key = settings_key
+            checkignore = settings.get('ignore',[])
+            self.checkignore_filter = lambda filenames : filter_filenames_by_checkignore(filenames,
+                                                                                         checkignore)
+        return self.code_environment
+
+    def get_index_signature(self):
+        signature = []
+        for dirpath,dirnames,filenames in os.walk(os.path.join(self.project.path,'.checkmate')):
+            if os.path.basename(os.path.dirname(dirpath)) != 'indexes':
+                continue
+            for filename in filenames:
+                try:
+                    signature.append((filename,os.path.getmtime(os.path.join(dirpath,filename))))
+                except OSError:
+                    pass
+        return sorted(signature)
+
+    def refresh_backend(self):
+        """
+        The file backend loads its indexes only once, so we reopen it when another process
+        (e.g. `checkmate analyze`) changed them. Other backends always return current data.
+        """
+        if not isinstance(self.backend,FileBackend):
+            return
+        signature = self.get_index_signature()
+        if self._index_signature is not None and signature != self._index_signature:
+            logger.info("The database changed, reopening it...")
+            self.backend = FileBackend(os.path.join(self.project.path,'.checkmate'),
+                                       autoload_embedded = False)
+        self._index_signature = signature
+
+    def get_cached_results(self,key):
+        if not key in self.results_cache:
+            return None
+        results = self.results_cache.pop(key)
+        self.results_cache[key] = results
+        return results
+
+    def cache_results(self,key,results):
+        if any([issue.get('code') in self.error_codes
+                for analyzer_results in results.values() if isinstance(analyzer_results,dict)
+                for issue in analyzer_results.get('issues',[])]):
+            return
+        self.results_cache[key] = results
+        while len(self.results_cache) > self.opts['cache_size']:
+            self.results_cache.popitem(last = False)
+
+    def ping(self):
+        return {'pid' : os.getpid(),
+                'project' : self.project.path,
+                'uptime' : time.time()-self.started_at,
+                'requests' : self.server.n_requests}
+
+    def analyze(self,paths,content = None):
+        """
+        Analyzes the given files (relative to the project directory) and returns their
+        issues without storing them. `content` can contain the (unsaved) content of files.
+        """
+        content = dict([(os.path.normpath(path),code) for path,code in (content or {}).items()])
+        code_environment = self.get_code_environment()
+
+        paths = [os.path.normpath(path) for path in paths]
+        file_revisions = []
+        for path in self.checkignore_filter(paths):
+            if path in content:
+                code = content[path].encode('utf-8')
+            else:
+                try:
+                    with open(os.path.join(self.project.path,path),'rb') as input_file:
+                        code = input_file.read()
+                except IOError:
+                    raise ServerError("Cannot read %s" % path)
+            file_revisions.append(MockFileRevision({'path' : path,
+                                                    'sha' : get_blob_sha(code),
+                                                    'code' : code}))
+        file_revisions = code_environment.filter_file_revisions(file_revisions)
+
+        uncached_file_revisions = []
+        for file_revision in file_revisions:
+            file_revision.language = code_environment.get_language(file_revision)
+            key = (file_revision.sha,file_revision.language,code_environment.settings_hash)
+            results = self.get_cached_results(key)
+            if results is None:
+                uncached_file_revisions.append(file_revision)
+            else:
+                file_revision.results = results
+
+        code_environment.analyze_file_revisions(uncached_file_revisions)
+        analyzed = set([id(file_revision) for file_revision in uncached_file_revisions])
+
+        issues = []
+        for file_revision in file_revisions:
+            if id(file_revision) in analyzed:
+                self.cache_results((file_revision.sha,file_revision.language,
+                                    code_environment.settings_hash),file_revision.results)
+            for analyzer_name,results in sorted(file_revision.results.items()):
+                if not isinstance(results,dict):
+                    continue
+                for issue in results.get('issues',[]):
+                    issues.extend(get_issue_records(file_revision.path,analyzer_name,
+                                                    issue['code'],[issue]))
+
+        return {'issues' : issues,
+                'files' : [file_revision.path for file_revision in file_revisions],
+                'analyzed' : len(uncached_file_revisions)}
+
+    def issues(self,paths = None,snapshot = None):
+        """
+        Returns the stored issues of the given files in the given (or the latest) snapshot.
+        """
+        self.refresh_backend()
+        snapshot = self.get_snapshot(snapshot)
+        if snapshot is None:
+            raise ServerError("No matching snapshot.")
+        file_revisions = snapshot.get_file_revisions(self.backend)
+        if paths is not None:
+            paths = set([os.path.normpath(path) for path in paths])
+            file_revisions = [fr for fr in file_revisions if fr.path in paths]
+
+        #issues are shared between file revisions with identical content
+        paths_by_pk = defaultdict(list)
+        for file_revision in file_revisions:
+            paths_by_pk[get_analysis_pk(file_revision)].append(file_revision.path)
+
+        issues = []
+        for issue in self.get_issues(file_revisions):
+            occurences = issue.get_occurences()
+            for path in paths_by_pk[issue.file_revision.pk]:
+                issues.extend(get_issue_records(path,issue.analyzer,issue.code,occurences))
+        issues.sort(key = lambda record:(record['path'],record['line'],record['analyzer']))
+
+        return {'issues' : issues,
+                'snapshot' : snapshot.pk}
+
+    def reload(self):
+        """
+        Drops the analyzers and cached results, e.g. after an analyzer plugin was updated.
+        """
+        if self.code_environment is not None:
+            self.code_environment.close()
+        self.code_environment = None
+        self.results_cache.clear()
+        analyzer_pool.clear()
+        self.get_code_environment().analyzers
+
+    def shutdown(self):
+        self.server.stop()
@@ -38,4 +38,7 @@ class Command(BaseCommand):
     def run(self):
         snapshots = self.backend.filter(self.project.DiskSnapshot,{}).sort('created_at',-1)
         for snapshot in snapshots:
-            print snapshot.pk
+            if snapshot.get('analyzed',True):
+                print snapshot.pk
+            else:
+                print "%s (incomplete, resumed by the next `checkmate analyze`)" % snapshot.pk
@@ -21,19 +21,142 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 from __future__ import unicode_literals
 from base import BaseCommand
 
+from checkmate.lib.stats.index import (build_stats_index,
+                                       get_row,
+                                       get_subtree,
+                                       get_top,
+                                       match_columns)
+
 import sys
 import os
 import os.path
 import json
 import time
+import logging
 
-"""
-$ checkmate stats python:metrics -- --hierarchy
+logger = logging.getLogger(__name__)
 
 """
+$ checkmate stats python:metrics --hierarchy
+$ checkmate stats metrics.total_number_of_lines issues --directory src --hierarchy --depth 1
+$ checkmate stats --top 10 --by pylint.n_errors
+"""
 
 
 class Command(BaseCommand):
 
+    options = BaseCommand.options + [
+        {
+        'name'        : '--snapshot',
+        'action'      : 'store',
+        'dest'        : 'snapshot',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'The snapshot to show statistics for (default: the latest one).'
+        },
+        {
+        'name'        : '--directory',
+        'action'      : 'store',
+        'dest'        : 'directory',
+        'type'        : str,
+        'default'     : '',
+        'help'        : 'The directory to show statistics for (default: the whole project).'
+        },
+        {
+        'name'        : '--hierarchy',
+        'action'      : 'store_true',
+        'dest'        : 'hierarchy',
+        'default'     : False,
+        'help'        : 'Show the statistics of all subdirectories.'
+        },
+        {
+        'name'        : '--depth',
+        'action'      : 'store',
+        'dest'        : 'depth',
+        'type'        : int,
+        'default'     : None,
+        'help'        : 'Only show subdirectories up to this many levels below the directory.'
+        },
+        {
+        'name'        : '--top',
+        'action'      : 'store',
+        'dest'        : 'top',
+        'type'        : int,
+        'default'     : None,
+        'help'        : 'Show the N subdirectories with the highest value of the --by statistic.'
+        },
+        {
+        'name'        : '--by',
+        'action'      : 'store',
+        'dest'        : 'by',
+        'type'        : str,
+        'default'     : 'issues',
+        'help'        : 'The statistic to rank directories by (default: issues).'
+        },
+        ]
+
+    description = """
+    Shows statistics (e.g. line counts, warnings and errors) for a directory and its subdirectories.
+    """
+
     def run(self):
-        pass
+
+        snapshot = self.get_snapshot(self.opts['snapshot'])
+        if snapshot is None:
+            return -1
+
+        index = self.get_stats_index(snapshot)
+        directory = self.opts['directory'].strip('/')
+
+        i = get_row(index,directory)
+        if i is None:
+            sys.stderr.write("No statistics for directory '%s'.\n" % directory)
+            return -1
+
+        columns = match_columns(index,self.extra_args)
+        if self.opts['top']:
+            if not self.opts['by'] in index['columns']:
+                sys.stderr.write("Unknown statistic: %s\n" % self.opts['by'])
+                return -1
+            if not self.extra_args:
+                columns = [self.opts['by']]
+            elif not self.opts['by'] in columns:
+                columns = [self.opts['by']]+columns
+            rows = get_top(index,self.opts['by'],directory,
+                           n = self.opts['top'],max_depth = self.opts['depth'])
+        elif self.opts['hierarchy']:
+            rows = [i]+list(get_subtree(index,directory,max_depth = self.opts['depth']))
+        else:
+            for column in columns:
+                print "%s\t%s" % (column,self.format_value(index['columns'][column][i]))
+            return 0
+
+        self.print_table(index,rows,columns)
+        return 0
+
+    def get_stats_index(self,snapshot):
+        StatsIndex = self.project.StatsIndex
+        try:
+            return self.backend.get(StatsIndex,{'pk' : snapshot.pk})
+        except StatsIndex.DoesNotExist:
+            #snapshots analyzed before the index existed
+            logger.info("Building statistics index for snapshot %s..." % snapshot.pk)
+            stats_index = StatsIndex(build_stats_index(snapshot))
+            stats_index.pk = snapshot.pk
+            self.backend.save(stats_index)
+            self.backend.commit()
+            return stats_index
+
+    def format_value(self,value):
+        if value is None:
+            return '-'
+        if isinstance(value,float):
+            return "%.2f" % value
+        return "%s" % value
+
+    def print_table(self,index,rows,columns):
+        print "\t".join(['directory']+columns)
+        for i in rows:
+            print "\t".join([index['directories'][i] or '.']+
+                            [self.format_value(index['columns'][column][i])
+                             for column in columns])
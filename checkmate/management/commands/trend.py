@@ -18,3 +18,135 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+from __future__ import unicode_literals
+from base import BaseCommand
+
+from checkmate.lib.stats.trends import TrendStore,get_series
+
+import sys
+import time
+import datetime
+import calendar
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+$ checkmate trend issues --directory src/core --since 2013-01-01 --resolution week
+$ checkmate trend --list --directory src/core
+$ checkmate trend --rebuild
+"""
+
+day = 24*60*60
+
+resolutions = {
+    'day' : (day,0),
+    #1970-01-05 was a Monday
+    'week' : (7*day,4*day),
+    'month' : (30*day,0),
+}
+
+def parse_date(date_str):
+    return calendar.timegm(datetime.datetime.strptime(date_str,"%Y-%m-%d").timetuple())
+
+def format_timestamp(timestamp):
+    return datetime.datetime.utcfromtimestamp(timestamp).strftime("%Y-%m-%d")
+
+class Command(BaseCommand):
+
+    options = BaseCommand.options + [
+        {
+        'name'        : '--directory',
+        'action'      : 'store',
+        'dest'        : 'directory',
+        'type'        : str,
+        'default'     : '',
+        'help'        : 'The directory to show the trend for (default: the whole project).'
+        },
+        {
+        'name'        : '--since',
+        'action'      : 'store',
+        'dest'        : 'since',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'Only show values since this date (YYYY-MM-DD).'
+        },
+        {
+        'name'        : '--until',
+        'action'      : 'store',
+        'dest'        : 'until',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'Only show values until this date (YYYY-MM-DD).'
+        },
+        {
+        'name'        : '--resolution',
+        'action'      : 'store',
+        'dest'        : 'resolution',
+        'type'        : str,
+        'default'     : None,
+        'choices'     : sorted(resolutions.keys()),
+        'help'        : 'Show the last value per day, week or month.'
+        },
+        {
+        'name'        : '--list',
+        'action'      : 'store_true',
+        'dest'        : 'list',
+        'default'     : False,
+        'help'        : 'List the available series for the directory.'
+        },
+        {
+        'name'        : '--rebuild',
+        'action'      : 'store_true',
+        'dest'        : 'rebuild',
+        'default'     : False,
+        'help'        : 'Rebuild the trends from all analyzed snapshots of the project.'
+        },
+        ]
+
+    description = """
+    Shows how a statistic (e.g. the number of issues) of a directory changed over time.
+    """
+
+    def run(self):
+
+        settings = self.project.get_settings(self.backend)
+        trend_store = TrendStore(self.backend,self.project,
+                                 max_depth = settings.get('trends',{}).get('max_depth',3))
+
+        if self.opts['rebuild']:
+            return self.rebuild(trend_store)
+
+        trend = trend_store.get_trend(self.opts['directory'].strip('/'))
+        if trend is None:
+            sys.stderr.write("No trends for directory '%s' (use --rebuild to generate them).\n" %
+                             self.opts['directory'])
+            return -1
+
+        if self.opts['list']:
+            for name in sorted(trend.series.keys()):
+                print name
+            return 0
+
+        name = self.extra_args[0] if self.extra_args else 'issues'
+        resolution,origin = resolutions.get(self.opts['resolution'],(None,0))
+        points = get_series(trend,name,
+                            start = parse_date(self.opts['since']) if self.opts['since'] else None,
+                            end = parse_date(self.opts['until'])+day-1 if self.opts['until'] else None,
+                            resolution = resolution,
+                            origin = origin)
+        for timestamp,value in points:
+            print "%s\t%s" % (format_timestamp(timestamp),value)
+        return 0
+
+    def rebuild(self,trend_store,batch_size = 50):
+        snapshots = self.backend.filter(self.project.Snapshot,{'project.pk' : self.project.pk,
+                                                              'analyzed' : True})
+        #we load the snapshots in batches, since each of them contains a full summary
+        n = 0
+        for i in range(0,len(snapshots),batch_size):
+            for snapshot in snapshots[i:i+batch_size]:
+                trend_store.update(snapshot)
+                n += 1
+        logger.info("Added %d snapshots to the trends" % n)
+        return 0
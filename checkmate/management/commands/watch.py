@@ -18,6 +18,7 @@ You should have received a copy of the GNU Affero General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
+
 from __future__ import unicode_literals
 
 from base import BaseCommand
@@ -37,11 +38,185 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+from checkmate.management.helpers import filter_filenames_by_checkignore
 from checkmate.lib.code import CodeEnvironment
-from .analze import Command as AnalyzeCommand
+from checkmate.lib.watchers import get_watcher
+from checkmate.lib.stats.tree import SummaryTree
+from .analyze import Command as AnalyzeCommand
 
 class Command(AnalyzeCommand):
 
     """
     Continuously watches a project for changes and analyzes modified file revisions
     """
+
+    options = AnalyzeCommand.options + [
+        {
+        'name'        : '--polling',
+        'action'      : 'store_true',
+        'dest'        : 'polling',
+        'default'     : False,
+        'help'        : 'Poll the file system instead of using inotify.'
+        },
+        {
+        'name'        : '--interval',
+        'action'      : 'store',
+        'dest'        : 'interval',
+        'type'        : float,
+        'default'     : 1.0,
+        'help'        : 'The polling interval in seconds.'
+        },
+        {
+        'name'        : '--debounce',
+        'action'      : 'store',
+        'dest'        : 'debounce',
+        'type'        : float,
+        'default'     : 0.2,
+        'help'        : 'Wait until no changes occured for this many seconds before analyzing.'
+        },
+        ]
+
+    description = """
+    Watches the project directory and incrementally updates the current snapshot
+    whenever files are modified.
+    """
+
+    def run(self):
+
+        settings = self.project.get_settings(self.backend)
+
+        if 'ignore' in settings:
+            checkignore = settings['ignore']
+        else:
+            checkignore = []
+
+        self.checkignore_filter = lambda filenames : filter_filenames_by_checkignore(filenames,
+                                                                                     checkignore)
+
+        logger.info("Getting file revisions...")
+        file_revisions = self.project.get_disk_file_revisions(file_filters = [self.checkignore_filter],
+                                                              path_filters = [self.checkignore_filter])
+
+        snapshot = self.project.DiskSnapshot({'created_at' : time.time()})
+        code_environment = CodeEnvironment(file_revisions,settings = settings)
+        snapshot = self.analyze_snapshot(snapshot,
+                                         code_environment,
+                                         save_if_empty = True)
+
+        #We keep all file revisions and issues of the snapshot in memory,
+        #so that we can update the summaries without going back to the database.
+        self.file_revisions_by_path = dict([(fr.path,fr) 
+                                            for fr in snapshot.get_file_revisions(self.backend)])
+        self.issues_by_path = defaultdict(list)
+        for issue in self.get_file_revision_issues(self.file_revisions_by_path.values()):
+            self.issues_by_path[issue['file_revision']['path']].append(issue)
+
+        watcher = get_watcher(self.project.path,
+                              polling = self.opts['polling'],
+                              interval = self.opts['interval'])
+
+        logger.info("Watching %s for changes (press CTRL-C to stop)..." % self.project.path)
+
+        try:
+            while True:
+                changed_paths = watcher.wait_for_changes(debounce = self.opts['debounce'])
+                start = time.time()
+                if self.update_snapshot(snapshot,code_environment,changed_paths):
+                    logger.info("Updated snapshot %s in %.2f seconds" % (snapshot.pk,
+                                                                         time.time()-start))
+        finally:
+            watcher.close()
+            code_environment.close()
+
+    def update_snapshot(self,snapshot,code_environment,changed_paths):
+        """
+        Analyzes the modified files and updates the given snapshot.
+
+        Only the summaries of directories containing a modified file are recalculated,
+        file revisions that have been analyzed before are reused.
+        """
+        changed_paths = self.checkignore_filter(list(changed_paths))
+
+        file_revisions = []
+        deleted_paths = []
+
+        for path in changed_paths:
+            if os.path.isfile(os.path.join(self.project.path,path)):
+                file_revision = self.project.get_disk_file_revision(path)
+                if file_revision is not None:
+                    file_revisions.append(file_revision)
+            elif path in self.file_revisions_by_path:
+                deleted_paths.append(path)
+
+        file_revisions = code_environment.filter_file_revisions(file_revisions)
+
+        if not file_revisions and not deleted_paths:
+            return False
+
+        existing_file_revisions = list(self.backend.filter(snapshot.FileRevision,{
+                'project.pk' : self.project.pk,
+                'fr_pk' : {'$in' : [fr.fr_pk for fr in file_revisions]}
+                }))
+        existing_file_revisions_by_pk = dict([(fr.fr_pk,fr) for fr in existing_file_revisions])
+        new_file_revisions = [fr for fr in file_revisions 
+                              if not fr.fr_pk in existing_file_revisions_by_pk]
+
+        logger.info("Analyzing %d modified file revisions (%d deleted)" % (len(new_file_revisions),
+                                                                           len(deleted_paths)))
+
+        code_environment.env['snapshot'] = snapshot
+        try:
+            analyzed_file_revisions = code_environment.analyze_file_revisions(new_file_revisions)
+            annotations = self.annotate_file_revisions(snapshot,analyzed_file_revisions)
+        finally:
+            del code_environment.env['snapshot']
+
+        for file_revision in analyzed_file_revisions:
+            self.backend.save(file_revision)
+        self.backend.commit()
+        for issue in annotations['issues']:
+            self.backend.save(issue)
+        self.backend.commit()
+
+        for path in deleted_paths:
+            del self.file_revisions_by_path[path]
+            if path in self.issues_by_path:
+                del self.issues_by_path[path]
+
+        for file_revision in existing_file_revisions+analyzed_file_revisions:
+            self.file_revisions_by_path[file_revision.path] = file_revision
+            self.issues_by_path[file_revision.path] = []
+
+        for issue in self.get_file_revision_issues(existing_file_revisions)+\
+                     self.get_file_revision_issues(analyzed_file_revisions,annotations['issues']):
+            self.issues_by_path[issue['file_revision']['path']].append(issue)
+
+        modified_paths = [fr.path for fr in file_revisions]+deleted_paths
+        keys = set([key for aggregator in code_environment.aggregators.values()
+                        for path in modified_paths
+                        for key in aggregator['mapper']({'path' : path})])
+
+        self.update_summary(snapshot,code_environment.summarize(self.file_revisions_by_path.values(),
+                                                                keys = keys),keys)
+
+        snapshot.issues_summary = code_environment.summarize_issues([issue
+            for issues in self.issues_by_path.values() for issue in issues])
+        snapshot.file_revisions = [fr.pk for fr in self.file_revisions_by_path.values()]
+
+        self.backend.save(snapshot)
+        self.backend.commit()
+
+        #the trends and the stats index show the updated summaries, as after `analyze`
+        self.update_trends(snapshot,code_environment)
+        self.update_stats_index(snapshot)
+
+        return True
+
+    def update_summary(self,snapshot,summary,keys):
+        """
+        Replaces the summaries for the given keys in the snapshot with the new ones.
+        """
+        tree = SummaryTree.load(snapshot.get('summary'))
+        tree.delete(keys)
+        tree.update(summary)
+        snapshot.summary = tree.serialize()
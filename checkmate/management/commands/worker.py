@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+from base import BaseCommand
+
+from checkmate.lib.code.work_queue import WorkQueue,AnalysisWorker
+
+import sys
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+"""
+$ checkmate analyze --queue /shared/checkmate-queue.sqlite
+$ checkmate worker --queue /shared/checkmate-queue.sqlite
+"""
+
+class Command(BaseCommand):
+
+    requires_valid_project = False
+
+    options = BaseCommand.options + [
+        {
+        'name'        : '--queue',
+        'action'      : 'store',
+        'dest'        : 'queue',
+        'type'        : str,
+        'default'     : None,
+        'help'        : 'The work queue (an SQLite file) to take tasks from.'
+        },
+        {
+        'name'        : '--lease',
+        'action'      : 'store',
+        'dest'        : 'lease',
+        'type'        : float,
+        'default'     : 300,
+        'help'        : 'The time (in seconds) after which unfinished tasks are given to another worker.'
+        },
+        {
+        'name'        : '--interval',
+        'action'      : 'store',
+        'dest'        : 'interval',
+        'type'        : float,
+        'default'     : 1.0,
+        'help'        : 'The polling interval in seconds when the queue is empty.'
+        },
+        {
+        'name'        : '--analyzers',
+        'action'      : 'store',
+        'dest'        : 'analyzers',
+        'type'        : str,
+        'default'     : '',
+        'help'        : 'Only run tasks for these analyzers (comma-separated).'
+        },
+        {
+        'name'        : '--exit-when-empty',
+        'action'      : 'store_true',
+        'dest'        : 'exit_when_empty',
+        'default'     : False,
+        'help'        : 'Stop when there are no more tasks in the queue.'
+        },
+        {
+        'name'        : '--purge',
+        'action'      : 'store',
+        'dest'        : 'purge',
+        'type'        : float,
+        'default'     : None,
+        'help'        : 'Remove finished tasks older than this many hours and exit.'
+        },
+        ]
+
+    description = """
+    Runs analysis tasks from a work queue that is shared with `checkmate analyze --queue`.
+    Any number of workers can take tasks from the same queue.
+    """
+
+    def run(self):
+
+        if not self.opts['queue']:
+            sys.stderr.write("Please specify a work queue with --queue.\n")
+            return -1
+
+        queue = WorkQueue(self.opts['queue'],lease_time = self.opts['lease'])
+
+        if self.opts['purge'] is not None:
+            n_purged = queue.purge(self.opts['purge']*60*60)
+            logger.info("Removed %d finished tasks" % n_purged)
+            return
+
+        analyzers = self.opts['analyzers'].split(",") if self.opts['analyzers'] else None
+        worker = AnalysisWorker(queue)
+
+        logger.info("Worker %s waiting for tasks (press CTRL-C to stop)..." % worker.name)
+
+        n_tasks = 0
+        try:
+            while True:
+                if worker.work(analyzers = analyzers):
+                    n_tasks += 1
+                    continue
+                if self.opts['exit_when_empty']:
+                    break
+                time.sleep(self.opts['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        logger.info("Worker %s ran %d tasks" % (worker.name,n_tasks))
@@ -24,7 +24,6 @@ import os
 import re
 import imp
 import json
-import yaml
 import hashlib
 import fnmatch
 
@@ -95,6 +94,7 @@ def parse_checkmate_settings(content):
     Basically a simple .yml parser that returns a simple Python dict to be used later on.
     """
 
+    import yaml
     return yaml.load(content)
 
 def parse_checkignore(content):
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from __future__ import unicode_literals
+import os
+import sys
+import json
+import socket
+import argparse
+
+#We only import lightweight modules here, the client should start in a few milliseconds.
+from checkmate.helpers.ipc import get_socket_path,send_request
+from checkmate.management.helpers import get_project_path
+
+"""
+checkmate-client analyze [filename] [...]             Analyze the given files with the running daemon
+checkmate-client issues [filename] [...]              Show the stored issues of the given files
+checkmate-client ping                                 Check if the daemon is running
+checkmate-client reload                               Reload the analyzers
+checkmate-client shutdown                             Stop the daemon
+
+The daemon is started with `checkmate serve`.
+"""
+
+def get_parser():
+    parser = argparse.ArgumentParser('checkmate-client',
+                                     description = 'Sends requests to a running `checkmate serve` daemon.')
+    parser.add_argument('command',choices = ['analyze','issues','ping','reload','shutdown'])
+    parser.add_argument('filenames',nargs = '*')
+    parser.add_argument('--socket',dest = 'socket',default = None,
+                        help = 'The socket of the daemon (default: .checkmate/serve.sock).')
+    parser.add_argument('--stdin',dest = 'stdin',default = None,metavar = 'FILENAME',
+                        help = 'Read the content of FILENAME from standard input (analyze only).')
+    parser.add_argument('--snapshot',dest = 'snapshot',default = None,
+                        help = 'The snapshot to show issues for (issues only).')
+    parser.add_argument('--timeout',dest = 'timeout',type = float,default = None,
+                        help = 'Give up after this many seconds.')
+    parser.add_argument('--json',dest = 'json',action = 'store_true',default = False,
+                        help = 'Print the response as JSON.')
+    return parser
+
+def format_issue(issue):
+    description = issue['data'].get('description','') if isinstance(issue['data'],dict) else ''
+    location = issue['path'] if issue['line'] is None else "%s:%d" % (issue['path'],issue['line'])
+    return "%s\t%s\t%s\t%s" % (location,issue['analyzer'],issue['code'],description)
+
+def main(args = None):
+
+    parser = get_parser()
+    #filenames can come before and after the options
+    opts,extra_args = parser.parse_known_args(args)
+    for arg in extra_args:
+        if arg.startswith('-'):
+            parser.error("unrecognized argument: %s" % arg)
+        opts.filenames.append(arg)
+
+    project_path = get_project_path()
+    if project_path is None and opts.socket is None:
+        sys.stderr.write("Cannot find a checkmate project in the current directory tree, aborting.\n")
+        return 2
+
+    def relative_path(filename):
+        return os.path.relpath(os.path.abspath(filename),project_path) if project_path else filename
+
+    request = {'command' : opts.command}
+    if opts.command == 'analyze':
+        filenames = list(opts.filenames)
+        if opts.stdin:
+            filenames.append(opts.stdin)
+            content = sys.stdin.read()
+            if isinstance(content,bytes):
+                content = content.decode('utf-8','replace')
+            request['content'] = {relative_path(opts.stdin) : content}
+        request['paths'] = [relative_path(filename) for filename in filenames]
+    elif opts.command == 'issues':
+        if opts.filenames:
+            request['paths'] = [relative_path(filename) for filename in opts.filenames]
+        if opts.snapshot:
+            request['snapshot'] = opts.snapshot
+
+    socket_path = opts.socket or get_socket_path(project_path)
+    try:
+        response = send_request(socket_path,request,timeout = opts.timeout)
+    except socket.error as e:
+        sys.stderr.write("Cannot connect to the checkmate daemon at %s (%s).\n"
+                         "Start it with `checkmate serve`.\n" % (socket_path,e))
+        return 2
+
+    if opts.json:
+        print json.dumps(response,indent = 2)
+    elif response['status'] != 'ok':
+        sys.stderr.write("Error: %s\n" % response.get('error'))
+    elif 'issues' in response:
+        for issue in response['issues']:
+            print format_issue(issue)
+    elif opts.command == 'ping':
+        print "checkmate daemon (pid %(pid)d) serving %(project)s, %(requests)d requests" % response
+
+    if response['status'] != 'ok':
+        return 2
+    #like a linter, we signal found issues in the exit code (e.g. for pre-commit hooks)
+    if opts.command == 'analyze' and response['issues']:
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -26,10 +26,6 @@ import time
 import six
 import importlib
 from blitzdb import FileBackend
-try:
-    from blitzdb import MongoBackend
-except ImportError:
-    pass
 
 import logging
 
@@ -45,13 +41,9 @@ root.addHandler(ch)
 from types import ModuleType
 
 import checkmate
-try:
-    import pymongo
-    pymongo_support = True
-except ImportError:
-    pymongo_support = False
 from checkmate.management import helpers,commands
 from checkmate.management.helpers import get_project_path,get_project_config,save_project_config
+from checkmate.helpers.checkmate import load_class
 
 import checkmate.settings as settings
 
@@ -107,12 +99,8 @@ def load_command_class():
             sys.stderr.write("Unknown command: %s\n" % " ".join(command_chain))
             exit(-1)
         if not isinstance(current_commands[cmd],dict):
-            if isinstance(current_commands[cmd],six.string_types):#it is a module/class string
-                command_module_name,command_class_name = current_commands[cmd].rsplit(".",1)
-                command_module = importlib.import_module(command_module_name)
-                return getattr(command_module,command_class_name),command_chain
-            else:#it is a class
-                return current_commands[cmd],command_chain
+            #it is either a module/class string or a class
+            return load_class(current_commands[cmd]),command_chain
         current_commands = current_commands[cmd]
 
 
@@ -130,23 +118,34 @@ def get_project_and_backend(path):
         exit(-1)
     ProjectClass = settings.models[project_class]
     if backend_config['driver'] == 'mongo':
-        if not pymongo_support:
+        #pymongo is slow to import, so we only load it when a project actually uses it.
+        try:
+            import pymongo
+            from blitzdb import MongoBackend
+        except ImportError:
             sys.stderr.write("Encountered pymongo backend, but pymongo is not installed!")
             exit(-1)
         pymongo_db = pymongo.MongoClient()[backend_config['db']]
         backend = MongoBackend(pymongo_db,autoload_embedded = False,allow_documents_in_query = False)
     elif backend_config['driver'] == 'file':
         backend = FileBackend(path+"/.checkmate",autoload_embedded = False)
+    elif backend_config['driver'] == 'sqlite':
+        from checkmate.lib.backends.sqlite import SqliteBackend
+        backend = SqliteBackend(backend_config.get('path',path+"/.checkmate/checkmate.sqlite"),
+                                autoload_embedded = False)
     else:
-        sys.stdout.write("Unknown backend driver: %s" % backend_config['driver'])
+        sys.stderr.write("Unknown backend driver: %s\n" % backend_config['driver'])
+        exit(-1)
     try:
         project = backend.get(ProjectClass,{'pk' : project_config['project_id']})
     except ProjectClass.DoesNotExist:
         project = ProjectClass({'pk' : project_config['project_id']})
+    #We only write the project back if it is new or has been moved, so that read-only
+    #commands do not touch the database.
+    if not 'path' in project or project.path != path:
+        project.path = path
         backend.save(project)
-    project.path = path
-    backend.save(project)
-    backend.commit()
+        backend.commit()
     return project,backend
 
 def main():
@@ -156,26 +155,26 @@ def main():
     settings.update_config(settings.load_config())
     settings.load_plugins()
 
-    if project_path:
-        project,backend = get_project_and_backend(project_path)
-    else:
-        project = None
-        backend = None
-
     CommandClass,command_chain = load_command_class()
 
-    if CommandClass.requires_valid_project and project is None:
+    if CommandClass.requires_valid_project and project_path is None:
         sys.stderr.write("Cannot find a checkmate project in the current directory tree, aborting.\n")
         exit(-1)
 
-    command = CommandClass(project,backend,
+    command = CommandClass(None,None,
                            prog = sys.argv[0]+" "+" ".join(command_chain),
                            args = sys.argv[1+len(command_chain):])
     try:
         if 'help' in command.opts and command.opts['help']:
             print command.help_message()
             exit(0)
-        command.run()
+        #We only open the backend for commands that operate on a project.
+        if CommandClass.requires_valid_project:
+            command.project,command.backend = get_project_and_backend(project_path)
+        #commands can signal failures (or e.g. found issues) through their return value
+        return_code = command.run()
+        if return_code:
+            exit(return_code)
     except KeyboardInterrupt:
         print "[CTRL-C pressed, aborting]"
         exit(-1)
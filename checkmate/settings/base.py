@@ -25,7 +25,9 @@ from checkmate.lib.models import (DiskProject,
                                   DiskFileRevision,
                                   Issue,
                                   IssueClass,
-                                  CodeObject)
+                                  CodeObject,
+                                  Trend,
+                                  StatsIndex)
 
 import logging
 import sys
@@ -62,6 +64,13 @@ commands = {
     'summary' : 'checkmate.management.commands.summary.Command',
     'snapshots' : 'checkmate.management.commands.snapshots.Command',
     'issues' : 'checkmate.management.commands.issues.Command',
+    'watch' : 'checkmate.management.commands.watch.Command',
+    'profile' : 'checkmate.management.commands.profile.Command',
+    'export' : 'checkmate.management.commands.export.Command',
+    'trend' : 'checkmate.management.commands.trend.Command',
+    'stats' : 'checkmate.management.commands.stats.Command',
+    'worker' : 'checkmate.management.commands.worker.Command',
+    'serve' : 'checkmate.management.commands.serve.Command',
 }
 
 models = {
@@ -71,6 +80,8 @@ models = {
     'Issue' : Issue,
     'IssueClass' : IssueClass,
     'CodeObject' : CodeObject,
+    'Trend' : Trend,
+    'StatsIndex' : StatsIndex,
 }
 
 plugins = {
@@ -82,6 +93,9 @@ plugins = {
            'git' : 'checkmate.contrib.plugins.git',
            }
 
+#host-wide result cache, configured in the `.checkmate-rc` file (see BlobCache)
+blob_cache = {}
+
 aggregators = {
     'directory' :
         {
@@ -106,7 +120,7 @@ default_checkignore = """*/site-packages/*
 import importlib
 import logging
 import os
-import yaml
+import pkgutil
 
 logger = logging.getLogger(__name__)
 
@@ -119,6 +133,8 @@ def update_config(config):
         plugins.update(config['commands'])
     if 'language_patterns' in config:
         language_patterns.update(config['language_patterns'])
+    if 'blob_cache' in config:
+        blob_cache.update(config['blob_cache'])
 
 def load_config(project = None):
     home = os.path.expanduser('~')
@@ -128,14 +144,36 @@ def load_config(project = None):
     for possible_config_path in possible_config_paths:
         possible_config_filename = os.path.join(possible_config_path,'.checkmate-rc')
         if os.path.exists(possible_config_filename) and os.path.isfile(possible_config_filename):
+            import yaml
             with open(possible_config_filename,'r') as config_file:
                 return yaml.load(config_file.read())
     return None
 
+def has_requirements(params):
+    """
+    Checks if the modules listed in the `requires` entry of an analyzer can be found,
+    without importing them.
+    """
+    for module_name in params.get('requires',[]):
+        if pkgutil.find_loader(module_name) is None:
+            return False
+    return True
+
 def load_plugin(module,name = None):
+    """
+    Registers the analyzers, commands and models of a plugin.
+
+    Analyzer and command classes can be given as dotted paths, in which case their
+    modules are only imported when the analyzer or command is actually used.
+    """
     logger.debug("Loading plugin: %s" % name)
     if hasattr(module,'analyzers'):
-        analyzers.update(module.analyzers)
+        for analyzer_name,params in module.analyzers.items():
+            if not has_requirements(params):
+                logger.debug("Skipping analyzer %s, requirements not met: %s" % 
+                             (analyzer_name,", ".join(params['requires'])))
+                continue
+            analyzers[analyzer_name] = params
     if hasattr(module,'commands'):
         if name is None:
             raise AttributeError("You must specify a name for your plugin if you defined new commands!")
@@ -198,4 +236,16 @@ def get_issues_data(settings = None):
                     'description' : 'An analysis error occured: \n %(occurence.data.exception)s',
                     'categories' : ['correctness'],
                 }
+                analyzers_data[name]['codes']['AnalysisTimeout'] = {
+                    'severity' : 2,
+                    'title' : 'Analysis timeout',
+                    'description' : 'The analysis of this file took longer than %(occurence.data.timeout)s seconds.',
+                    'categories' : ['correctness'],
+                }
+                analyzers_data[name]['codes']['AnalysisMemoryExceeded'] = {
+                    'severity' : 2,
+                    'title' : 'Analysis memory limit exceeded',
+                    'description' : 'The analysis of this file used more than %(occurence.data.memory_limit)s MB of memory.',
+                    'categories' : ['correctness'],
+                }
     return issues_data
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import hashlib
+
+import pytest
+
+from blitzdb import FileBackend
+
+from checkmate.lib.models import DiskProject
+from checkmate.lib.backends.sqlite import SqliteBackend
+from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.lib.code.environment import CodeEnvironment
+from checkmate.lib.stats.tree import SummaryTree
+from checkmate.management.commands.analyze import Command as AnalyzeCommand
+
+class CountingAnalyzer(BaseAnalyzer):
+
+    n_analyzed = 0
+
+    def analyze(self,file_revision):
+        CountingAnalyzer.n_analyzed += 1
+        return {'issues' : [{'code' : 'Found','location' : (((1,None),(1,None)),)}]}
+
+    def summarize(self,items):
+        return {'number_of_files' : len(items)}
+
+analyzers = {'counting' : {'class' : CountingAnalyzer,'language' : 'python'}}
+
+def analyze(command,project,settings = None):
+    file_revisions = project.get_disk_file_revisions()
+    for file_revision in file_revisions:
+        #we simulate the blob hashes of a version control system
+        file_revision.sha = hashlib.sha1(file_revision.get_file_content()).hexdigest()
+    code_environment = CodeEnvironment(file_revisions,analyzers = analyzers,
+                                       settings = settings or {})
+    return command.analyze_snapshot(project.DiskSnapshot({}),code_environment)
+
+@pytest.fixture(params = ['file','sqlite'])
+def backend(request,tmpdir):
+    if request.param == 'sqlite':
+        return SqliteBackend(str(tmpdir.join("checkmate.sqlite")))
+    return FileBackend(str(tmpdir.mkdir("backend")))
+
+def test_reuse_analyzed_blobs(tmpdir,backend):
+    project_path = str(tmpdir.mkdir("project"))
+    project = DiskProject({'pk' : 'test','path' : project_path})
+    backend.save(project)
+    backend.commit()
+    command = AnalyzeCommand(project,backend)
+
+    with open(os.path.join(project_path,"a.py"),"w") as output_file:
+        output_file.write("foo = bar\n")
+
+    CountingAnalyzer.n_analyzed = 0
+    first_snapshot = analyze(command,project)
+    assert CountingAnalyzer.n_analyzed == 1
+    n_issues = len(backend.filter(project.Issue,{}))
+
+    #a copy of the file reuses the existing analysis and issues
+    with open(os.path.join(project_path,"b.py"),"w") as output_file:
+        output_file.write("foo = bar\n")
+
+    snapshot = analyze(command,project)
+    assert CountingAnalyzer.n_analyzed == 1
+    assert len(backend.filter(project.Issue,{})) == n_issues
+    file_revisions = snapshot.get_file_revisions(backend)
+    assert len(file_revisions) == 2
+    assert len(command.get_issues(file_revisions)) == n_issues
+    #the shared issues are counted for each copy of the file
+    assert count_issues(snapshot.issues_summary) == 2*count_issues(first_snapshot.issues_summary)
+
+    #changing the analyzer settings invalidates the existing analysis
+    snapshot = analyze(command,project,settings = {'analyzers' : {'counting' : {}}})
+    assert CountingAnalyzer.n_analyzed == 2
+
+def count_issues(issues_summary):
+    if isinstance(issues_summary,dict):
+        return sum([count_issues(value) for value in issues_summary.values()])
+    return issues_summary
+
+def test_count_duplicate_blobs(tmpdir,backend):
+    project_path = str(tmpdir.mkdir("project"))
+    project = DiskProject({'pk' : 'test','path' : project_path})
+    backend.save(project)
+    backend.commit()
+    command = AnalyzeCommand(project,backend)
+
+    #identical files are analyzed once, but their issues are counted in each directory
+    for directory in ('a','b'):
+        os.mkdir(os.path.join(project_path,directory))
+        with open(os.path.join(project_path,directory,"f.py"),"w") as output_file:
+            output_file.write("foo = bar\n")
+
+    CountingAnalyzer.n_analyzed = 0
+    snapshot = analyze(command,project)
+    assert CountingAnalyzer.n_analyzed == 1
+    assert count_issues(snapshot.issues_summary['a']) == 1
+    assert count_issues(snapshot.issues_summary['b']) == 1
+
+def test_resume_interrupted_analysis(tmpdir,backend):
+    project_path = str(tmpdir.mkdir("project"))
+    project = DiskProject({'pk' : 'test','path' : project_path})
+    backend.save(project)
+    backend.commit()
+    command = AnalyzeCommand(project,backend)
+
+    for i in range(25):
+        with open(os.path.join(project_path,"f%d.py" % i),"w") as output_file:
+            output_file.write("foo = %d\n" % i)
+    #copies of files share the analysis of the original
+    for i in range(25):
+        with open(os.path.join(project_path,"g%d.py" % i),"w") as output_file:
+            output_file.write("foo = %d\n" % i)
+
+    #the analysis gets interrupted after the first chunk of file revisions
+    annotate_file_revisions = command.annotate_file_revisions
+    calls = []
+    def interrupt(snapshot,file_revisions):
+        calls.append(len(file_revisions))
+        if len(calls) > 1:
+            raise KeyboardInterrupt
+        return annotate_file_revisions(snapshot,file_revisions)
+    command.annotate_file_revisions = interrupt
+
+    CountingAnalyzer.n_analyzed = 0
+    with pytest.raises(KeyboardInterrupt):
+        analyze(command,project)
+    command.annotate_file_revisions = annotate_file_revisions
+
+    assert command.get_snapshot() is None
+    partial_snapshot = backend.get(project.DiskSnapshot,{'analyzed' : False})
+    assert calls[0] <= partial_snapshot.checkpoint['cursor'] < 50
+
+    #the next analysis picks up where the interrupted one stopped
+    n_analyzed = CountingAnalyzer.n_analyzed
+    snapshot = analyze(command,project)
+    assert CountingAnalyzer.n_analyzed == n_analyzed+25-calls[0]
+    assert snapshot.pk == partial_snapshot.pk
+    assert not 'checkpoint' in snapshot
+    assert command.get_snapshot().pk == snapshot.pk
+    assert count_issues(snapshot.issues_summary['']) == 50
+    #the summary is merged from the summaries of the chunks
+    summary = SummaryTree.load(snapshot.summary)
+    assert summary.get('python','counting','') == {'number_of_files' : 50}
+    assert len(backend.filter(project.DiskSnapshot,{})) == 1
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.lib.analysis.pool import AnalyzerPool
+from checkmate.lib.code.environment import CodeEnvironment
+
+class WarmAnalyzer(BaseAnalyzer):
+
+    events = []
+
+    def __init__(self,code_environment,level = 0):
+        super(WarmAnalyzer,self).__init__(code_environment)
+        self.level = level
+
+    def warm_up(self):
+        WarmAnalyzer.events.append(('warm_up',self.level))
+
+    def teardown(self):
+        WarmAnalyzer.events.append(('teardown',self.level))
+
+    def analyze(self,file_revision):
+        return {}
+
+    def summarize(self,items):
+        return {}
+
+analyzers = {
+    'strict' : {'class' : WarmAnalyzer,'language' : 'python','opts' : {'level' : 2}},
+    'lenient' : {'class' : WarmAnalyzer,'language' : 'python'},
+}
+
+def test_analyzer_pool(monkeypatch):
+    pool = AnalyzerPool(max_size = 2)
+    monkeypatch.setattr('checkmate.lib.code.environment.analyzer_pool',pool)
+    WarmAnalyzer.events = []
+
+    env = CodeEnvironment([],analyzers = analyzers)
+    strict = env.init_analyzer('strict',analyzers['strict'])
+    lenient = env.init_analyzer('lenient',analyzers['lenient'])
+    #analyzers of the same class with different settings don't share an instance
+    assert strict is not lenient
+    assert (strict.level,lenient.level) == (2,0)
+    assert not 'level' in analyzers['lenient'].get('opts',{})
+
+    #a new environment gets the warm instances (bound to it)
+    other_env = CodeEnvironment([],analyzers = analyzers)
+    assert other_env.init_analyzer('strict',analyzers['strict']) is strict
+    assert strict.code_environment is other_env
+    assert WarmAnalyzer.events == [('warm_up',2),('warm_up',0)]
+
+    #the least recently used instance is dropped when the pool is full
+    settings = {'analyzers' : {'strict' : {'level' : 3}}}
+    CodeEnvironment([],analyzers = analyzers,settings = settings).init_analyzer('strict',
+                                                                                analyzers['strict'])
+    assert WarmAnalyzer.events[-2:] == [('warm_up',3),('teardown',0)]
+    pool.clear()
+    assert len(pool) == 0
+    assert sorted(WarmAnalyzer.events[-2:]) == [('teardown',2),('teardown',3)]
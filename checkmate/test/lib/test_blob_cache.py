@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from checkmate.lib.models import MockFileRevision
+from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.lib.code.environment import CodeEnvironment
+from checkmate.lib.code.blob_cache import BlobCache,parse_size,get_blob_sha
+from checkmate.contrib.plugins.python.metrics.analyzer import FormatAnalyzer
+
+@pytest.fixture
+def cache_path(request):
+    path = tempfile.mkdtemp()
+    request.addfinalizer(lambda : shutil.rmtree(path))
+    return path
+
+def test_parse_size():
+    assert parse_size(100) == 100
+    assert parse_size('2KB') == 2048
+    assert parse_size('1.5 mb') == 1.5*1024**2
+    with pytest.raises(ValueError):
+        parse_size('ten GB')
+
+def test_blob_sha():
+    #the same sha as `git hash-object`
+    assert get_blob_sha(b"hello\n") == 'ce013625030ba8dba906f756967f9e9ca394464a'
+
+def test_roundtrip(cache_path):
+    cache = BlobCache(cache_path)
+    key = cache.get_key(get_blob_sha(b"import os"),'python','settings')
+    assert cache.get(key) is None
+    results = {'pyflakes' : {'issues' : [{'code' : 'W0611','location' : [[[1,0],[1,9]]]}]}}
+    cache.put(key,results)
+    assert BlobCache(cache_path).get(key) == results
+    assert cache.get(cache.get_key(get_blob_sha(b"import os"),'python','other settings')) is None
+
+def test_eviction(cache_path):
+    cache = BlobCache(cache_path,quota = 10500)
+    keys = [cache.get_key('sha%d' % i,'python','settings') for i in range(10)]
+    for i,key in enumerate(keys):
+        cache.put(key,{'data' : 'x'*1000})
+        #we make sure that the modification times are distinct
+        os.utime(cache.get_filename(key),(i,i))
+    #reading an entry makes it the most recently used one
+    assert cache.get(keys[0]) is not None
+    #this exceeds the quota and evicts entries down to 90 % of it
+    cache.put(cache.get_key('sha10','python','settings'),{'data' : 'x'*1000})
+    assert sum([entry[1] for entry in cache.get_entries()]) <= 10500*0.9
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+
+class VersionedAnalyzer(BaseAnalyzer):
+
+    version = '1.0'
+
+    @classmethod
+    def get_version(cls):
+        return cls.version
+
+    def analyze(self,file_revision):
+        return {}
+
+def test_analyzer_versions(cache_path):
+    #upgrading an analyzer invalidates its cached results
+    env = CodeEnvironment([],analyzers = {'versioned' : {'class' : VersionedAnalyzer,
+                                                         'language' : 'python'}})
+    env._blob_cache = BlobCache(cache_path)
+    file_revision = MockFileRevision({'path' : 'a.py','language' : 'python','code' : b'a = 1'})
+    key = env.get_blob_cache_key(file_revision)
+    assert env.get_blob_cache_key(file_revision) == key
+    VersionedAnalyzer.version = '2.0'
+    upgraded_env = CodeEnvironment([],analyzers = env.analyzers)
+    upgraded_env._blob_cache = env.blob_cache
+    assert upgraded_env.get_blob_cache_key(file_revision) != key
+
+def test_default_analyzer_version():
+    #analyzers without a version of their own are versioned by the hash of their module
+    version = FormatAnalyzer.get_version()
+    assert version is not None
+    assert version != BaseAnalyzer.get_version()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from checkmate.lib.models import MockFileRevision
+from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.lib.code.environment import CodeEnvironment
+from checkmate.lib.code.classifier import FileClassifier
+
+class CheckingAnalyzer(BaseAnalyzer):
+
+    def analyze(self,file_revision):
+        return {'issues' : [{'code' : 'Checked','location' : (((1,None),(1,None)),)}]}
+
+analyzers = {'checking' : {'class' : CheckingAnalyzer,'language' : 'javascript'}}
+
+files = {
+    'app.js' : b"var a = 1;\nfunction foo() {\n    return a;\n}\n",
+    'image.js' : b"GIF89a\0\0\x01",
+    'bundle.min.js' : b"!function(e,t){return e+t}(1,2);"*300,
+    'messages_pb2.js' : b"// Generated by the protocol buffer compiler.  DO NOT EDIT!\nvar a = 1;\n",
+    'large.js' : b"var a = 1;\n"*1000,
+    #markers only count in comment lines
+    'warning.js' : b"var a = 1;\nalert('DO NOT EDIT this file');\n",
+    'generated.js' : b"\n  /*\n   * Auto-generated by a script\n   */\n",
+}
+
+def test_classify():
+    classifier = FileClassifier({'max_size' : '10KB'})
+    reasons = {}
+    for path,code in files.items():
+        reason = classifier.classify(MockFileRevision({'path' : path,'code' : code}))
+        reasons[path] = reason[0] if reason else None
+    assert reasons == {'app.js' : None,
+                       'image.js' : 'BinaryFile',
+                       'bundle.min.js' : 'MinifiedFile',
+                       'messages_pb2.js' : 'GeneratedFile',
+                       'large.js' : 'FileTooLarge',
+                       'warning.js' : None,
+                       'generated.js' : 'GeneratedFile'}
+    assert classifier.classify(MockFileRevision({'path' : 'messages_pb2.js',
+                                                 'code' : files['messages_pb2.js']}))[1] == \
+        {'marker' : 'Generated by the protocol buffer compiler'}
+    assert FileClassifier({'enabled' : False}).classify(MockFileRevision({'path' : 'image.js',
+                                                                          'code' : files['image.js']})) is None
+
+def test_skip_file_revisions():
+    env = CodeEnvironment([],analyzers = analyzers,settings = {'classifier' : {'max_size' : '10KB'}})
+    file_revisions = [MockFileRevision({'path' : path,'code' : code}) for path,code in files.items()]
+    analyzed_file_revisions = env.analyze_file_revisions(file_revisions)
+    assert len(analyzed_file_revisions) == len(files)
+    for file_revision in analyzed_file_revisions:
+        if file_revision.path in ('app.js','warning.js'):
+            assert not 'skipped' in file_revision
+            assert file_revision.results['checking']['issues'][0]['code'] == 'Checked'
+        else:
+            assert 'skipped' in file_revision
+            assert not 'checking' in file_revision.results
+    #the classifier settings decide which files get analyzed, so they are part of the hash
+    assert env.settings_hash != CodeEnvironment([],analyzers = analyzers).settings_hash
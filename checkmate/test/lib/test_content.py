@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import mmap
+
+from checkmate.lib.models import DiskProject
+from checkmate.helpers.content import read_file_buffer,get_bytes,ContentArena
+from checkmate.lib.code.blob_cache import get_blob_sha
+
+def test_read_file_buffer(tmpdir):
+    content = b"foo = bar\n"*1000
+    file_path = str(tmpdir.join("foo.py"))
+    with open(file_path,"wb") as output_file:
+        output_file.write(content)
+
+    assert read_file_buffer(file_path) == content
+    content_buffer = read_file_buffer(file_path,threshold = 1024)
+    assert isinstance(content_buffer,mmap.mmap)
+    assert len(content_buffer) == len(content)
+    assert get_bytes(content_buffer) == content
+    assert get_blob_sha(content_buffer) == get_blob_sha(content)
+
+def test_shared_content(tmpdir):
+    project = DiskProject({'pk' : 'test','path' : str(tmpdir)})
+    with open(str(tmpdir.join("foo.py")),"wb") as output_file:
+        output_file.write(b"foo = bar\n")
+    file_revision = project.get_disk_file_revision("foo.py")
+
+    assert file_revision.get_content_buffer() is not file_revision.get_content_buffer()
+    file_revision.hold_content()
+    assert file_revision.get_content_buffer() is file_revision.get_content_buffer()
+    assert file_revision.get_file_content() == b"foo = bar\n"
+    file_revision.release_content()
+    assert not 'content_buffer' in file_revision.attributes
+
+def test_content_arena():
+    arena = ContentArena(max_size = 10)
+    buffers = arena.add_block(b"foobar",[('a',0,3),('b',3,3)])
+    assert str(buffers['a']) == b"foo"
+    assert str(arena.get('b')) == b"bar"
+    arena.add('c',b"bazbaz")
+    #the oldest block was dropped, buffers in use remain valid
+    assert not 'a' in arena and not 'b' in arena
+    assert str(arena.get('c')) == b"bazbaz"
+    assert str(buffers['b']) == b"bar"
+    assert arena.size == 6
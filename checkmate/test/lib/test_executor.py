@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+
+from checkmate.lib.models import MockFileRevision
+from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.lib.code.environment import CodeEnvironment
+
+class ExternalToolAnalyzer(BaseAnalyzer):
+
+    def analyze(self,file_revision):
+        time.sleep(0.2)
+        return {'issues' : [{'code' : 'Checked','location' : (((1,None),(1,None)),)}]}
+
+class FailingAnalyzer(BaseAnalyzer):
+
+    def analyze(self,file_revision):
+        raise ValueError("failed on %s" % file_revision.path)
+
+analyzers = {
+    'external' : {'class' : ExternalToolAnalyzer,'language' : 'javascript','io_bound' : True},
+    'failing' : {'class' : FailingAnalyzer,'language' : 'javascript'},
+}
+
+def make_file_revisions(n):
+    return [MockFileRevision({'path' : 'file_%d.js' % i,'code' : b'var a = 1;'})
+            for i in range(n)]
+
+def test_concurrent_analysis():
+    env = CodeEnvironment([],analyzers = analyzers,
+                          settings = {'concurrency' : {'io_workers' : 8}})
+    file_revisions = make_file_revisions(8)
+    start = time.time()
+    analyzed_file_revisions = env.analyze_file_revisions(file_revisions)
+    #the external tool runs for all files at the same time
+    assert time.time()-start < 1.0
+    assert len(analyzed_file_revisions) == 8
+    for file_revision in analyzed_file_revisions:
+        assert file_revision.results['external']['issues'][0]['code'] == 'Checked'
+        issue = file_revision.results['failing']['issues'][0]
+        assert issue['code'] == 'AnalysisError'
+        assert file_revision.path in issue['traceback']
+    #the worker pool is kept for further file revisions until the environment is closed
+    thread_pool = env.executor._thread_pool
+    assert thread_pool is not None
+    env.analyze_file_revisions(make_file_revisions(2))
+    assert env.executor._thread_pool is thread_pool
+    env.close()
+    assert env.executor._thread_pool is None
+
+def test_sequential_analysis():
+    env = CodeEnvironment([],analyzers = analyzers,
+                          settings = {'concurrency' : {'io_workers' : 0}})
+    assert env.executor is None
+    analyzed_file_revisions = env.analyze_file_revisions(make_file_revisions(2))
+    for file_revision in analyzed_file_revisions:
+        assert file_revision.results['external']['issues'][0]['code'] == 'Checked'
+        assert file_revision.results['failing']['issues'][0]['code'] == 'AnalysisError'
+
+def test_executor_applies():
+    env = CodeEnvironment([],analyzers = analyzers,
+                          settings = {'concurrency' : {'io_workers' : 8}})
+    file_revisions = make_file_revisions(2)
+    for file_revision in file_revisions:
+        file_revision.language = 'javascript'
+    assert env.executor.applies(file_revisions,lambda fr:analyzers)
+    #without I/O-bound analyzers, the file revisions are analyzed in the current thread
+    cpu_bound_analyzers = {'failing' : analyzers['failing']}
+    assert not env.executor.applies(file_revisions,lambda fr:cpu_bound_analyzers)
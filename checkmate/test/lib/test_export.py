@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import io
+import csv
+import json
+
+from checkmate.lib.export import JSONLWriter,CSVWriter,SARIFWriter,flatten
+
+records = [
+    {'path' : 'foo/bar.py','analyzer' : 'pyflakes','code' : 'UndefinedName','severity' : 1,
+     'line' : 3,'column' : 4,'end_line' : 3,'message' : "undefined name 'x'",
+     'data' : {'description' : "undefined name 'x'"}},
+    {'path' : 'foo/baz.py','analyzer' : 'pep8','code' : 'E501','severity' : 3},
+]
+
+def write(writer_class,fields = None):
+    output = io.BytesIO()
+    writer = writer_class(output,fields)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    return output.getvalue()
+
+def test_jsonl():
+    lines = write(JSONLWriter).splitlines()
+    assert [json.loads(line) for line in lines] == records
+
+def test_csv():
+    rows = list(csv.reader(io.BytesIO(write(CSVWriter,['path','code','line','data']))))
+    assert rows[0] == ['path','code','line','data']
+    assert rows[1][:3] == ['foo/bar.py','UndefinedName','3']
+    assert json.loads(rows[1][3]) == records[0]['data']
+    assert rows[2] == ['foo/baz.py','E501','','']
+
+def test_sarif():
+    log = json.loads(write(SARIFWriter))
+    run = log['runs'][0]
+    assert len(run['results']) == 2
+    assert run['results'][0]['level'] == 'error'
+    assert run['results'][0]['locations'][0]['physicalLocation']['region']['startColumn'] == 5
+    assert sorted([rule['id'] for rule in run['tool']['driver']['rules']]) == \
+        ['pep8/E501','pyflakes/UndefinedName']
+
+def test_flatten():
+    assert list(flatten({'a' : {'b' : 1,'c' : {'d' : 2}}})) == [('a.b',1),('a.c.d',2)]
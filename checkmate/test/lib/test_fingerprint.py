@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from checkmate.lib.models import MockFileRevision,Issue
+from checkmate.lib.analysis.fingerprint import IssueFingerprinter
+
+code = b"""import os
+
+def foo():
+    return bar
+
+def baz():
+    return bar
+"""
+
+def make_issue(*lines):
+    return Issue({'code' : 'UndefinedName',
+                  'occurences' : [{'location' : (((line,4),(line,None)),)} for line in lines]})
+
+@pytest.fixture(scope = "function")
+def fingerprinter(request):
+    return IssueFingerprinter()
+
+def test_fingerprints_survive_line_shifts(fingerprinter):
+    file_revision_a = MockFileRevision({'path' : 'foo.py','code' : code})
+    file_revision_b = MockFileRevision({'path' : 'foo.py','code' : b"#comment\n\n"+code})
+    issue_a = make_issue(4)
+    issue_b = make_issue(6)
+    fingerprinter.fingerprint_issues(file_revision_a,[issue_a])
+    fingerprinter.fingerprint_issues(file_revision_b,[issue_b])
+    assert issue_a.fingerprint == issue_b.fingerprint
+
+def test_fingerprints_use_lines_for_every_issue(fingerprinter):
+    file_revision = MockFileRevision({'path' : 'foo.py','code' : code})
+    issues = [make_issue(1),make_issue(4),make_issue(7)]
+    fingerprinter.fingerprint_issues(file_revision,issues)
+    assert len(set([issue.fingerprint for issue in issues])) == 3
+
+def test_fingerprints_are_cached_by_blob_and_location(fingerprinter):
+    file_revision = MockFileRevision({'path' : 'foo.py','code' : code,'sha' : 'abc'})
+    fingerprinter.fingerprint_issues(file_revision,[make_issue(4),make_issue(4,7)])
+    assert sorted(fingerprinter._cache.keys()) == [('abc',(4,4)),('abc',(7,7))]
+
+def test_fingerprint_cache_is_bounded():
+    fingerprinter = IssueFingerprinter(cache_size = 2)
+    file_revision = MockFileRevision({'path' : 'foo.py','code' : code,'sha' : 'abc'})
+    fingerprinter.fingerprint_issues(file_revision,[make_issue(1),make_issue(4),make_issue(1),
+                                                    make_issue(7)])
+    #the least recently used location is evicted
+    assert list(fingerprinter._cache.keys()) == [('abc',(1,1)),('abc',(7,7))]
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from checkmate.contrib.plugins.python.metrics.analyzer import FormatAnalyzer,get_line_stats
+
+content = u"import os\n\n  # comment\nx = u\"äöü\"  \n   \ndef foo():\n    return 1".encode("utf-8")
+
+def test_line_stats():
+    stats = get_line_stats(content)
+    decoded = content.decode("utf-8")
+    assert stats['number_of_lines'] == len(decoded.split("\n"))
+    assert stats['number_of_characters'] == len(decoded)
+    assert stats['number_of_blank_lines'] == 2
+    assert stats['number_of_comment_lines'] == 1
+    assert stats['longest_line'] == max([len(line) for line in content.split(b"\n")])
+
+def test_line_stats_edge_cases():
+    for c in (b"",b"\n\n",b"# a\n  #b\n\t\n",b"ab\nabcdef\nabc",b"a\n\nabcd"):
+        lines = c.split(b"\n")
+        stats = get_line_stats(c)
+        assert stats['number_of_lines'] == len(lines)
+        assert stats['number_of_blank_lines'] == len([l for l in lines if not l.strip()])
+        assert stats['number_of_comment_lines'] == len([l for l in lines if l.strip().startswith(b"#")])
+        assert stats['longest_line'] == max([len(line) for line in lines])
+
+def test_summarize():
+    fa = FormatAnalyzer.__new__(FormatAnalyzer)
+    items = [{'stats' : dict(get_line_stats(content),number_of_code_lines = 4)},
+             #stats generated by older versions of the analyzer
+             {'stats' : {'number_of_lines' : 10,'number_of_characters' : 100}},
+             {'stats' : {}}]
+    summary = fa.summarize(items)
+    assert summary['number_of_files'] == 2
+    assert summary['total_number_of_lines'] == 17
+    assert summary['total_number_of_code_lines'] == 4
+    assert summary['average_number_of_lines'] == 8.5
+
+def test_merge_summaries():
+    fa = FormatAnalyzer.__new__(FormatAnalyzer)
+    items = [{'stats' : dict(get_line_stats(c),number_of_code_lines = 1)}
+             for c in (content,b"a\nb",b"abcdefghijklmnopqrstuvwxyz")]
+    merged = fa.merge_summaries([fa.summarize(items[:1]),None,fa.summarize(items[1:])])
+    assert merged == fa.summarize(items)
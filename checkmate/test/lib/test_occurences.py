@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+
+from checkmate.lib.models import Issue
+from checkmate.lib.analysis.occurences import (encode_occurences,
+                                               decode_occurences,
+                                               count_occurences)
+
+occurences = [
+    {'location' : (((1,4),(1,None)),),'data' : {'description' : 'undefined name foo'}},
+    {'location' : (((3,0),(5,2)),((7,None),(7,None))),
+     'data' : {'description' : 'undefined name foo'}},
+    {'location' : ((10,1),(10,None)),'data' : {'description' : 'undefined name bar'}},
+    {'location' : (((None,None),(None,None)),)},
+    {},
+]
+
+def test_roundtrip():
+    for compress in (False,True):
+        encoded = encode_occurences(occurences,compress = compress)
+        #the encoded form has to survive the JSON serialization of the file backend
+        encoded = json.loads(json.dumps(encoded))
+        assert count_occurences(encoded) == len(occurences)
+        assert decode_occurences(encoded) == occurences
+        if not compress:
+            assert len(encoded['strings']) == 2
+
+def test_issue_occurences():
+    issue = Issue({'code' : 'UndefinedName','occurences' : encode_occurences(occurences)})
+    assert issue.get_occurences() == occurences
+    assert Issue({'occurences' : occurences}).get_occurences() == occurences
+    assert Issue({}).get_occurences() == []
+
+def test_unencodable_occurences():
+    weird = [{'location' : (('a','b'),('c','d'))}]
+    assert encode_occurences(weird) == weird
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+
+from checkmate.lib.models import MockFileRevision
+from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.lib.code.environment import CodeEnvironment
+
+class SleepAnalyzer(BaseAnalyzer):
+
+    def analyze(self,file_revision):
+        if b'sleep' in file_revision.get_file_content():
+            time.sleep(10)
+        if b'allocate' in file_revision.get_file_content():
+            data = b'x'*(200*1024*1024)
+        if b'crash' in file_revision.get_file_content():
+            os.abort()
+        return {'issues' : [{'code' : 'Checked','location' : (((1,None),(1,None)),)}]}
+
+def make_environment(limits):
+    analyzers = {'sleep' : {'class' : SleepAnalyzer,'language' : 'python'}}
+    return CodeEnvironment([],analyzers = analyzers,settings = {'limits' : limits})
+
+def test_timeout():
+    env = make_environment({'timeout' : 0.5})
+    try:
+        slow = MockFileRevision({'path' : 'slow.py','language' : 'python','code' : b'sleep'})
+        fast = MockFileRevision({'path' : 'fast.py','language' : 'python','code' : b'pass'})
+        start = time.time()
+        results = env.analyze_file_revision(slow,env.analyzers)
+        assert time.time()-start < 5
+        issue = results['sleep']['issues'][0]
+        assert issue['code'] == 'AnalysisTimeout'
+        assert issue['data']['timeout'] == 0.5
+        #the worker gets restarted for the next file
+        results = env.analyze_file_revision(fast,env.analyzers)
+        assert results['sleep']['issues'][0]['code'] == 'Checked'
+        assert 'sleep' in results['analysis_time']
+    finally:
+        env.sandbox.stop()
+
+def test_limits_per_analyzer():
+    env = make_environment({'timeout' : 10,'analyzers' : {'sleep' : {'timeout' : 1}}})
+    assert env.get_limits('sleep') == {'timeout' : 1,'memory_limit' : None}
+    assert env.get_limits('pylint') == {'timeout' : 10,'memory_limit' : None}
+
+def test_memory_limit():
+    env = make_environment({'memory_limit' : 50})
+    try:
+        #the limit applies to the memory that the analysis allocates in the worker
+        for code,issue_code in ((b'pass','Checked'),
+                                (b'allocate','AnalysisMemoryExceeded'),
+                                (b'pass','Checked'),
+                                (b'crash','AnalysisMemoryExceeded')):
+            file_revision = MockFileRevision({'path' : 'a.py','language' : 'python','code' : code})
+            results = env.analyze_file_revision(file_revision,env.analyzers)
+            assert results['sleep']['issues'][0]['code'] == issue_code
+    finally:
+        env.sandbox.stop()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import socket
+import threading
+
+import pytest
+
+from checkmate.helpers.ipc import send_request
+from checkmate.lib.server import RequestServer,ServerError
+
+def test_requests(tmpdir):
+    socket_path = str(tmpdir.join("serve.sock"))
+    calls = []
+
+    def analyze(paths):
+        calls.append(paths)
+        return {'issues' : [{'path' : path} for path in paths]}
+
+    def fail():
+        raise ServerError("Something went wrong")
+
+    server = RequestServer(socket_path,{'analyze' : analyze,
+                                        'fail' : fail,
+                                        'shutdown' : lambda : server.stop()})
+    server.bind()
+    #a second server can't take over the socket of a running one
+    with pytest.raises(ServerError):
+        RequestServer(socket_path,{}).bind()
+
+    thread = threading.Thread(target = server.serve)
+    thread.start()
+    try:
+        response = send_request(socket_path,{'command' : 'analyze','paths' : ['a.py']},timeout = 10)
+        assert response == {'status' : 'ok','issues' : [{'path' : 'a.py'}]}
+        assert send_request(socket_path,{'command' : 'fail'},timeout = 10) == \
+            {'status' : 'error','error' : 'Something went wrong'}
+        assert send_request(socket_path,{'command' : 'foo'},timeout = 10)['status'] == 'error'
+    finally:
+        send_request(socket_path,{'command' : 'shutdown'},timeout = 10)
+        thread.join(10)
+
+    assert calls == [['a.py']]
+    assert server.n_requests == 4
+    assert not os.path.exists(socket_path)
+    with pytest.raises(socket.error):
+        send_request(socket_path,{'command' : 'analyze','paths' : []})
+
+def test_stale_socket(tmpdir):
+    socket_path = str(tmpdir.join("serve.sock"))
+    #a socket that nobody listens on, as left behind by a server that got killed
+    stale_socket = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    stale_socket.bind(socket_path)
+    stale_socket.close()
+    server = RequestServer(socket_path,{},idle_timeout = 0.1)
+    server.serve()
+    assert not os.path.exists(socket_path)
+
+def test_silent_client(tmpdir):
+    socket_path = str(tmpdir.join("serve.sock"))
+    server = RequestServer(socket_path,{'ping' : lambda : {'pong' : True},
+                                        'shutdown' : lambda : server.stop()},
+                           connection_timeout = 0.2)
+    server.bind()
+    thread = threading.Thread(target = server.serve)
+    thread.start()
+    #a client that connects without sending a request is dropped after the timeout
+    silent_client = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    silent_client.connect(socket_path)
+    try:
+        assert send_request(socket_path,{'command' : 'ping'},timeout = 10)['pong']
+        assert silent_client.recv(1) == b''
+    finally:
+        silent_client.close()
+        send_request(socket_path,{'command' : 'shutdown'},timeout = 10)
+        thread.join(10)
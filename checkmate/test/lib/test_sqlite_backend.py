@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import pytest
+
+from checkmate.lib.models import DiskProject
+from checkmate.lib.backends.sqlite import SqliteBackend
+
+@pytest.fixture
+def backend(tmpdir):
+    backend = SqliteBackend(str(tmpdir.join("checkmate.sqlite")),buffer_size = 10)
+    project = DiskProject({'pk' : 'project'})
+    backend.save(project)
+    for i in range(25):
+        backend.save(DiskProject.Issue({'pk' : 'issue%d' % i,
+                                        'project' : project,
+                                        'code' : 'C%d' % (i % 5),
+                                        'analyzer' : 'pyflakes',
+                                        'line' : i,
+                                        'tags' : ['a','b'] if i % 2 else ['a']}))
+    backend.commit()
+    return backend
+
+def test_indexed_queries(backend):
+    project = backend.get(DiskProject,{'pk' : 'project'})
+    assert len(backend.filter(DiskProject.Issue,{'project' : project})) == 25
+    assert len(backend.filter(DiskProject.Issue,{'project.pk' : 'project',
+                                                 'code' : {'$in' : ['C1','C2']}})) == 10
+    issue = backend.get(DiskProject.Issue,{'pk' : 'issue3'})
+    assert issue.line == 3 and issue.project.pk == 'project'
+
+def test_unindexed_queries(backend):
+    assert len(backend.filter(DiskProject.Issue,{'tags' : 'b'})) == 12
+    assert len(backend.filter(DiskProject.Issue,{'line' : {'$gte' : 20}})) == 5
+    assert len(backend.filter(DiskProject.Issue,{'pk' : {'$regex' : r'^issue1'}})) == 11
+    issues = backend.filter(DiskProject.Issue,{'code' : 'C0'}).filter({'line' : {'$lt' : 10}})
+    assert sorted([issue.line for issue in issues]) == [0,5]
+
+def test_sort_and_delete(backend):
+    issues = backend.filter(DiskProject.Issue,{'code' : 'C0'}).sort('line',-1)
+    assert [issue.line for issue in issues] == [20,15,10,5,0]
+    issues.delete()
+    backend.commit()
+    assert len(backend.filter(DiskProject.Issue,{})) == 20
+    with pytest.raises(DiskProject.Issue.DoesNotExist):
+        backend.get(DiskProject.Issue,{'pk' : 'issue0'})
+    #saving a document again replaces it
+    issue = backend.get(DiskProject.Issue,{'pk' : 'issue1'})
+    issue.line = 100
+    backend.save(issue)
+    assert backend.get(DiskProject.Issue,{'line' : 100}).pk == 'issue1'
+    assert len(backend.filter(DiskProject.Issue,{})) == 20
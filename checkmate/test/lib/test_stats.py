@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from checkmate.lib.models import Trend
+from checkmate.lib.stats.helpers import directory_splitter,percentile
+from checkmate.lib.stats.trends import get_snapshot_scalars,add_point,get_series
+from checkmate.lib.stats.tree import SummaryTree
+from checkmate.lib.stats.index import (build_stats_index,get_row,get_subtree,get_top,
+                                       match_columns)
+
+def test_directory_splitter():
+    assert directory_splitter('foo/bar/baz.py') == ['','foo','foo/bar']
+    assert directory_splitter('baz.py') == ['']
+
+def test_percentile():
+    values = [5,1,4,2,3,6,7,8,9,10]
+    assert percentile(values,50) == 5
+    assert percentile(values,95) == 10
+    assert percentile(values,0) == 1
+    assert percentile([],50) is None
+
+def test_snapshot_scalars():
+    snapshot = {
+        'issues_summary' : {
+            '' : {'python' : {'pylint' : {'C0301' : 3,'W0611' : 1}}},
+            'src/core/lib' : {'python' : {'pylint' : {'C0301' : 2}}},
+        },
+        'summary' : {
+            'python' : {
+                'metrics' : {'' : {'total_number_of_lines' : 120}},
+                'analysis_time' : {'' : {'pylint' : 0.5}},
+            }
+        }
+    }
+    scalars = get_snapshot_scalars(snapshot,max_depth = 2)
+    assert scalars.keys() == ['']
+    assert scalars[''] == {'issues' : 4,
+                           'issues.pylint' : 4,
+                           'issues.pylint.C0301' : 3,
+                           'issues.pylint.W0611' : 1,
+                           'metrics.total_number_of_lines' : 120}
+
+def test_summary_tree():
+    summary = {
+        'python' : {
+            'metrics' : {'' : {'number_of_files' : 3},
+                         'src' : {'number_of_files' : 2},
+                         'src/core' : {'number_of_files' : 1}},
+            'pylint' : {'src/core' : {'issues' : 5}},
+        }
+    }
+    tree = SummaryTree.load(summary)
+    assert tree.get('python','metrics','src') == {'number_of_files' : 2}
+    assert tree.get('python','pylint','src') is None
+    assert tree.to_dict() == summary
+    #the serialized tree stores each path segment once
+    data = tree.serialize()
+    assert [node[:2] for node in data['nodes']] == [[0,''],[1,'src'],[2,'core']]
+    assert SummaryTree.load(data).to_dict() == summary
+    #...and the names of the statistics once per column
+    assert data['keys'][data['columns'].index(['python','metrics'])] == ['number_of_files']
+    assert [node[2][data['columns'].index(['python','metrics'])] for node in data['nodes']] == \
+        [[3],[2],[1]]
+    #trees of older versions store the summaries as dictionaries
+    old_data = {'format' : 'tree',
+                'columns' : data['columns'],
+                'nodes' : [[depth,segment,[tree.decode_value(i,row) for i,row in enumerate(values)]]
+                           for depth,segment,values in data['nodes']]}
+    assert SummaryTree.load(old_data).to_dict() == summary
+    #snapshots with either format give the same statistics
+    assert get_snapshot_scalars({'summary' : data}) == get_snapshot_scalars({'summary' : summary})
+
+    assert tree.rollup('python','files',sum) is None
+    tree.set('python','files','src/core',1)
+    tree.set('python','files','src/util',2)
+    tree.set('python','files','docs',4)
+    assert tree.rollup('python','files',sum) == 7
+    assert tree.get('python','files','src') == 3
+
+    tree.delete(['src/core'])
+    assert tree.get('python','metrics','src/core') is None
+    assert tree.get('python','metrics','src') == {'number_of_files' : 2}
+
+def test_trend_series():
+    trend = Trend({'timestamps' : [],'snapshots' : [],'series' : {}})
+    add_point(trend,20,'b',{'issues' : 5})
+    add_point(trend,10,'a',{'issues' : 7,'metrics.total_number_of_lines' : 100})
+    add_point(trend,30,'c',{'issues' : 4})
+    #re-analyzing a snapshot replaces its values
+    add_point(trend,30,'c',{'issues' : 3})
+    assert trend.timestamps == [10,20,30]
+    assert trend.series['metrics.total_number_of_lines'] == [100,None,None]
+    assert get_series(trend,'issues') == [(10,7),(20,5),(30,3)]
+    assert get_series(trend,'issues',start = 15,end = 30) == [(20,5),(30,3)]
+    assert get_series(trend,'issues',resolution = 20) == [(0,7),(20,3)]
+    assert get_series(trend,'unknown') == []
+
+def test_stats_index():
+    snapshot = {
+        'issues_summary' : {
+            '' : {'python' : {'pylint' : {'C0301' : 6}}},
+            'src' : {'python' : {'pylint' : {'C0301' : 6}}},
+            'src/core' : {'python' : {'pylint' : {'C0301' : 4}}},
+            'src/core/lib' : {'python' : {'pylint' : {'C0301' : 1}}},
+            'src/ui' : {'python' : {'pylint' : {'C0301' : 2}}},
+            'src0' : {'python' : {'pylint' : {'C0301' : 0}}},
+        },
+    }
+    index = build_stats_index(snapshot)
+    directories = index['directories']
+    assert directories == ['','src','src/core','src/core/lib','src/ui','src0']
+    assert index['columns']['issues'][get_row(index,'src/core')] == 4
+    assert get_row(index,'src/foo') is None
+    assert [directories[i] for i in get_subtree(index,'src')] == ['src/core','src/core/lib','src/ui']
+    assert [directories[i] for i in get_subtree(index,'src',max_depth = 1)] == ['src/core','src/ui']
+    assert [directories[i] for i in get_top(index,'issues','src',n = 2)] == ['src/core','src/ui']
+    assert match_columns(index,['python:issues']) == ['issues','issues.pylint','issues.pylint.C0301']
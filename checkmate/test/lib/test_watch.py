@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+
+from collections import defaultdict
+
+from blitzdb import FileBackend
+
+from checkmate.lib import watchers
+from checkmate.lib.watchers import BaseWatcher,PollingWatcher,get_watcher
+from checkmate.lib.models import DiskProject
+from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.lib.code.environment import CodeEnvironment
+from checkmate.lib.stats.tree import SummaryTree
+from checkmate.lib.stats.trends import TrendStore
+from checkmate.management.commands.watch import Command as WatchCommand
+
+class QueuedWatcher(BaseWatcher):
+
+    """
+    Returns a given sequence of changes, one per call of `poll`.
+    """
+
+    def __init__(self,changes):
+        self.changes = list(changes)
+        self.timeouts = []
+
+    def poll(self,timeout = None):
+        self.timeouts.append(timeout)
+        return set(self.changes.pop(0)) if self.changes else set()
+
+def test_debounce():
+    #a burst of events is collected until a poll returns no changes
+    watcher = QueuedWatcher([[],['a.py'],['a.py','.a.py.swp'],['b.py'],[],['c.py']])
+    assert watcher.wait_for_changes(debounce = 0.5) == set(['a.py','.a.py.swp','b.py'])
+    #we wait without a timeout for the first change, and for `debounce` seconds afterwards
+    assert watcher.timeouts == [None,None,0.5,0.5,0.5]
+    assert watcher.wait_for_changes() == set(['c.py'])
+
+def test_polling_watcher(tmpdir):
+    project_path = str(tmpdir)
+    os.mkdir(os.path.join(project_path,".checkmate"))
+    for filename in ("a.py","b.py"):
+        with open(os.path.join(project_path,filename),"w") as output_file:
+            output_file.write("a = 1\n")
+    watcher = get_watcher(project_path,polling = True,interval = 0.01)
+    assert isinstance(watcher,PollingWatcher)
+    assert watcher.poll(timeout = 0.05) == set()
+
+    #we set the modification time, since it might have a resolution of a second
+    os.utime(os.path.join(project_path,"a.py"),(1,1))
+    os.remove(os.path.join(project_path,"b.py"))
+    with open(os.path.join(project_path,".checkmate","data"),"w") as output_file:
+        output_file.write("excluded")
+    assert watcher.poll(timeout = 0.05) == set(['a.py','b.py'])
+    assert watcher.poll(timeout = 0.05) == set()
+
+def test_polling_fallback(tmpdir,monkeypatch):
+    #if inotify can't be used (e.g. too many watches), we poll instead
+    def fail(*args,**kwargs):
+        raise OSError("No space left on device")
+    monkeypatch.setattr(watchers,'inotify_support',True)
+    monkeypatch.setattr(watchers,'InotifyWatcher',fail)
+    assert isinstance(get_watcher(str(tmpdir)),PollingWatcher)
+
+class LineAnalyzer(BaseAnalyzer):
+
+    def analyze(self,file_revision):
+        n_lines = len(file_revision.get_file_content().splitlines())
+        return {'stats' : {'n_lines' : n_lines},
+                'issues' : [{'code' : 'Line','location' : (((i+1,None),(i+1,None)),)}
+                            for i in range(n_lines)]}
+
+    def summarize(self,items):
+        return {'n_lines' : sum([item['stats']['n_lines'] for item in items if 'stats' in item])}
+
+def count_issues(issues_summary):
+    if isinstance(issues_summary,dict):
+        return sum([count_issues(value) for value in issues_summary.values()])
+    return issues_summary
+
+def test_update_snapshot(tmpdir):
+    project_path = str(tmpdir.mkdir("project"))
+    backend = FileBackend(str(tmpdir.mkdir("backend")))
+    project = DiskProject({'pk' : 'test','path' : project_path})
+    backend.save(project)
+    backend.commit()
+
+    os.mkdir(os.path.join(project_path,"src"))
+    for filename,content in (("a.py","a = 1\n"),("src/b.py","b = 1\nc = 2\n")):
+        with open(os.path.join(project_path,filename),"w") as output_file:
+            output_file.write(content)
+
+    #we set up the command as its `run` method does before it starts watching
+    command = WatchCommand(project,backend)
+    command.checkignore_filter = lambda filenames : filenames
+    code_environment = CodeEnvironment(project.get_disk_file_revisions(),
+                                       analyzers = {'lines' : {'class' : LineAnalyzer,
+                                                               'language' : 'python'}})
+    snapshot = command.analyze_snapshot(project.DiskSnapshot({'created_at' : time.time()}),
+                                        code_environment)
+    command.file_revisions_by_path = dict([(fr.path,fr)
+                                           for fr in snapshot.get_file_revisions(backend)])
+    command.issues_by_path = defaultdict(list)
+    for issue in command.get_file_revision_issues(command.file_revisions_by_path.values()):
+        command.issues_by_path[issue['file_revision']['path']].append(issue)
+    assert SummaryTree.load(snapshot.summary).get('python','lines','') == {'n_lines' : 3}
+    #the occurences of an issue code in a file are one issue
+    assert count_issues(snapshot.issues_summary['']) == 2
+
+    with open(os.path.join(project_path,"src","b.py"),"w") as output_file:
+        output_file.write("b = 1\nc = 2\nd = 3\ne = 4\n")
+    #file revisions are identified by their path and modification time (in seconds)
+    os.utime(os.path.join(project_path,"src","b.py"),(1,1))
+    os.remove(os.path.join(project_path,"a.py"))
+    assert command.update_snapshot(snapshot,code_environment,set(['src/b.py','a.py']))
+    #nothing to do for files that were not analyzed
+    assert not command.update_snapshot(snapshot,code_environment,set(['README']))
+
+    snapshot = backend.get(project.DiskSnapshot,{'pk' : snapshot.pk})
+    summary = SummaryTree.load(snapshot.summary)
+    assert summary.get('python','lines','') == {'n_lines' : 4}
+    assert summary.get('python','lines','src') == {'n_lines' : 4}
+    assert count_issues(snapshot.issues_summary['']) == 1
+    assert count_issues(snapshot.issues_summary['src']) == 1
+    assert len(snapshot.file_revisions) == 1
+
+    #the trends show the updated snapshot instead of adding a point
+    trend = TrendStore(backend,project).get_trend('')
+    assert trend.snapshots == [snapshot.pk]
+    assert trend.series['lines.n_lines'] == [4]
+    assert trend.series['issues'] == [1]
+    code_environment.close()
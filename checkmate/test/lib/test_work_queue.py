@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+This file is part of checkmate, a meta code checker written in Python.
+
+Copyright (C) 2015 Andreas Dewes, QuantifiedCode UG
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU Affero General Public License as
+published by the Free Software Foundation, either version 3 of the
+License, or (at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU Affero General Public License for more details.
+
+You should have received a copy of the GNU Affero General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+import threading
+
+from checkmate.lib.models import MockFileRevision
+from checkmate.lib.analysis.base import BaseAnalyzer
+from checkmate.lib.code.environment import CodeEnvironment
+from checkmate.lib.code.work_queue import WorkQueue,AnalysisWorker
+
+class ByteCountAnalyzer(BaseAnalyzer):
+
+    def analyze(self,file_revision):
+        return {'stats' : {'bytes' : len(file_revision.get_file_content())},
+                'issues' : [{'code' : 'Counted','location' : (((1,None),(1,None)),)}]}
+
+analyzers = {'bytes' : {'class' : ByteCountAnalyzer,'language' : 'python'}}
+
+def test_leases(tmpdir):
+    queue = WorkQueue(str(tmpdir.join("queue.sqlite")),lease_time = 0.1,max_attempts = 2)
+    queue.submit([('task','bytes','settings',{'path' : 'a.py'})])
+    #submitting the same task again doesn't add it twice
+    queue.submit([('task','bytes','settings',{'path' : 'a.py'})])
+    assert queue.claim('a')[3] == {'path' : 'a.py'}
+    assert queue.claim('b') is None
+    #the lease of worker `a` expires, so worker `b` gets the task
+    time.sleep(0.15)
+    assert queue.claim('b')[0] == 'task'
+    time.sleep(0.15)
+    #the task was leased `max_attempts` times without being completed
+    assert queue.claim('c') is None
+    assert queue.get_results(['task'])['task'][0] == 'failed'
+    #failed tasks are queued again when they get submitted
+    queue.submit([('task','bytes','settings',{'path' : 'a.py'})])
+    assert queue.claim('c')[0] == 'task'
+    queue.complete('task',{'bytes' : {}})
+    assert queue.get_results(['task']) == {'task' : ('done',{'bytes' : {}})}
+    assert queue.purge(0) == 1
+
+def test_analysis_in_queue(tmpdir):
+    queue_path = str(tmpdir.join("queue.sqlite"))
+    env = CodeEnvironment([],analyzers = analyzers)
+    env.work_queue = WorkQueue(queue_path)
+    worker = AnalysisWorker(WorkQueue(queue_path),
+                            code_environment = CodeEnvironment([],analyzers = analyzers))
+    def work():
+        while worker.work():
+            pass
+    file_revisions = [MockFileRevision({'path' : 'file_%d.py' % i,'code' : b'a = %d' % (i % 2)})
+                      for i in range(6)]
+    env.submit_file_revisions(file_revisions)
+    thread = threading.Thread(target = work)
+    thread.start()
+    analyzed_file_revisions = env.analyze_file_revisions(file_revisions)
+    thread.join()
+    #identical files share a task
+    assert sum(env.work_queue.get_counts().values()) == 2
+    for file_revision in analyzed_file_revisions:
+        assert file_revision.results['bytes']['stats']['bytes'] == 5
+        assert 'bytes' in file_revision.results['analysis_time']
+    results = [file_revision.results['bytes'] for file_revision in analyzed_file_revisions]
+    assert results[0] is not results[2]
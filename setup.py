@@ -18,6 +18,7 @@ pyyaml
 entry_points = {
         'console_scripts': [
                'checkmate = checkmate.scripts.manage:main',
+               'checkmate-client = checkmate.scripts.client:main',
         ],
     },
 url='https://github.com/quantifiedcode/checkmate',